@@ -1,28 +1,25 @@
+import asyncio
 import json
 import logging
 import re
+import threading
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable
 
 import telegram
-import wolframalpha
 from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import Tool
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from bujo.analytics.charts import (
-    spending_bar_chart,
-    spending_category_bar_chart,
-    spending_daily_line_chart,
-    spending_period_bar_chart,
-    spending_pie_chart,
-)
-from bujo.base import WOLFRAM_APP_ID, expenses_model, llm
+from bujo.analytics.render import render_chart
+from bujo.base import WOLFRAM_APP_ID, expense_rollups, expense_search_index, expenses_model
+from bujo.expenses.search_index import ExpenseSearchIndex
 from bujo.handlers.utils import send_long
-from bujo.managers import expense_manager, mag_manager, portfolio_manager
+from bujo.models.expenses import SEARCH_FIELDS, search_where
 
 logger = logging.getLogger(__name__)
 
@@ -43,35 +40,60 @@ SYSTEM_PROMPT = [
     "Use emojis wherever appropriate to make the response more friendly and visually appealing.",
 ]
 
-_wolfram_client = wolframalpha.Client(WOLFRAM_APP_ID)
+_wolfram_client = None
 _main_memory = MemorySaver()
 
-_static_tools = [
-    Tool(
-        name="Expenses_Interaction",
-        func=expense_manager.agent_expenses,
-        description="Use this tool to add or list expenses.",
-        return_direct=True,
-    ),
-    Tool(
-        name="MAG_interaction",
-        func=mag_manager.agent_mag,
-        description="Use this tool to manage MAG (calendar).",
-        return_direct=True,
-    ),
-    Tool(
-        name="Portfolio_Tool",
-        func=portfolio_manager.agent_portfolio,
-        description="Use this tool to record or list portfolio transactions (buy/sell stocks, deposit/withdraw cash).",
-        return_direct=True,
-    ),
-    Tool(
-        name="Translation_Tool",
-        func=lambda x: "This tool must be awaited",
-        description="Use this tool to translate from one language to another.",
-        coroutine=lambda x: llm.ainvoke([HumanMessage(x)]),
-    ),
-]
+
+def _get_wolfram_client():
+    global _wolfram_client
+    if _wolfram_client is None:
+        import wolframalpha
+        _wolfram_client = wolframalpha.Client(WOLFRAM_APP_ID)
+    return _wolfram_client
+
+
+def _static_tools(llm) -> list[Tool]:
+    from bujo.managers import expense_manager, mag_manager, portfolio_manager
+
+    return [
+        Tool(
+            name="Expenses_Interaction",
+            func=expense_manager.agent_expenses,
+            coroutine=expense_manager.aagent_expenses,
+            description="Use this tool to add or list expenses.",
+            return_direct=True,
+        ),
+        Tool(
+            name="MAG_interaction",
+            func=mag_manager.agent_mag,
+            coroutine=mag_manager.aagent_mag,
+            description="Use this tool to manage MAG (calendar).",
+            return_direct=True,
+        ),
+        Tool(
+            name="Portfolio_Tool",
+            func=portfolio_manager.agent_portfolio,
+            coroutine=portfolio_manager.aagent_portfolio,
+            description="Use this tool to record or list portfolio transactions (buy/sell stocks, deposit/withdraw cash).",
+            return_direct=True,
+        ),
+        Tool(
+            name="Translation_Tool",
+            func=lambda x: "This tool must be awaited",
+            description="Use this tool to translate from one language to another.",
+            coroutine=lambda x: llm.ainvoke([HumanMessage(x)]),
+        ),
+    ]
+
+
+_CHART_GRAINS = {
+    "category_pie": "item",
+    "category_bar": "item",
+    "daily_bar": "day",
+    "daily_line": "day",
+    "weekly_bar": "week",
+    "monthly_bar": "month",
+}
 
 
 def _loads_tool_json(query: str) -> dict[str, Any]:
@@ -149,7 +171,7 @@ def _extract_included_terms(params: dict[str, Any]) -> list[str]:
 def _expense_search_text(expense: dict[str, Any]) -> str:
     return " ".join(
         str(expense.get(field) or "")
-        for field in ("Item", "Category", "Type", "Note", "Description")
+        for field in SEARCH_FIELDS
     ).lower()
 
 
@@ -159,25 +181,50 @@ def _matches_any(expense: dict[str, Any], terms: list[str]) -> bool:
 
 
 def _apply_expense_filters(
-    expenses: list[dict[str, Any]],
+    expenses: Iterable[dict[str, Any]],
     params: dict[str, Any],
     user_text: str,
 ) -> tuple[list[dict[str, Any]], str]:
+    """Filter in a single pass so ``expenses`` can be a streaming row iterator."""
     include_terms = _extract_included_terms(params)
     exclude_terms = _extract_excluded_terms(user_text, params)
 
-    filtered = expenses
+    seen = included = 0
+    filtered: list[dict[str, Any]] = []
+    for expense in expenses:
+        seen += 1
+        if include_terms and not _matches_any(expense, include_terms):
+            continue
+        included += 1
+        if exclude_terms and _matches_any(expense, exclude_terms):
+            continue
+        filtered.append(expense)
+
+    return filtered, _filter_summary(include_terms, exclude_terms, seen, included, len(filtered))
+
+
+def _indexed_expense_filters(
+    index: ExpenseSearchIndex,
+    include_terms: list[str],
+    exclude_terms: list[str],
+    start: str | None,
+    end: str | None,
+) -> tuple[list[dict[str, Any]], str, int]:
+    """``_apply_expense_filters`` answered from the search index's posting lists instead of a scan."""
+    seen = index.count(start, end)
+    candidates = index.rows(index.match_any(include_terms) if include_terms else None, start, end)
+    excluded = index.match_any(exclude_terms)
+    filtered = [expense for expense in candidates if int(expense["Id"]) not in excluded]
+    return filtered, _filter_summary(include_terms, exclude_terms, seen, len(candidates), len(filtered)), seen
+
+
+def _filter_summary(include_terms: list[str], exclude_terms: list[str], seen: int, included: int, kept: int) -> str:
     filter_notes: list[str] = []
     if include_terms:
-        before = len(filtered)
-        filtered = [expense for expense in filtered if _matches_any(expense, include_terms)]
-        filter_notes.append(f"included {', '.join(include_terms)} ({before} -> {len(filtered)})")
+        filter_notes.append(f"included {', '.join(include_terms)} ({seen} -> {included})")
     if exclude_terms:
-        before = len(filtered)
-        filtered = [expense for expense in filtered if not _matches_any(expense, exclude_terms)]
-        filter_notes.append(f"excluded {', '.join(exclude_terms)} ({before} -> {len(filtered)})")
-
-    return filtered, "; ".join(filter_notes)
+        filter_notes.append(f"excluded {', '.join(exclude_terms)} ({included} -> {kept})")
+    return "; ".join(filter_notes)
 
 def _choose_chart_type(params: dict[str, Any], user_text: str, tool_query: str) -> str:
     requested = " ".join(
@@ -231,11 +278,18 @@ def _choose_chart_type(params: dict[str, Any], user_text: str, tool_query: str)
     return "daily_bar"
 
 
-async def _make_wolfram_tool(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Tool:
-    async def query_tool(query: str) -> str:
+def _run_objects(config: RunnableConfig) -> tuple[Update, ContextTypes.DEFAULT_TYPE, str]:
+    """Per-update objects that agent_engage passes through the run config."""
+    configurable = config.get("configurable") or {}
+    return configurable["update"], configurable["context"], configurable.get("user_text", "")
+
+
+def _make_wolfram_tool() -> Tool:
+    async def query_tool(query: str, config: RunnableConfig) -> str:
+        update, context, _ = _run_objects(config)
         logger.info("Querying Wolfram Alpha for: %s", query)
         try:
-            response = await _wolfram_client.aquery(query)
+            response = await _get_wolfram_client().aquery(query)
             if hasattr(response, "pod"):
                 for pod in response["pod"]:
                     subpod = pod["subpod"]
@@ -265,8 +319,9 @@ async def _make_wolfram_tool(update: Update, context: ContextTypes.DEFAULT_TYPE)
     )
 
 
-async def _make_analytics_tool(update: Update, context: ContextTypes.DEFAULT_TYPE, user_text: str) -> Tool:
-    async def analytics_tool(query: str) -> str:
+def _make_analytics_tool() -> Tool:
+    async def analytics_tool(query: str, config: RunnableConfig) -> str:
+        update, context, user_text = _run_objects(config)
         logger.info("Expense analytics request: %s", query)
         try:
             params = _loads_tool_json(query)
@@ -283,14 +338,53 @@ async def _make_analytics_tool(update: Update, context: ContextTypes.DEFAULT_TYP
         if end:
             filter_parts.append(f"(Date,lt,exactDate,{end})")
 
-        expenses = expenses_model.list(
-            json.dumps({"filters": filter_parts}) if filter_parts else None
-        )
-        if not expenses:
+        original_count = 0
+        include_terms = _extract_included_terms(params)
+        exclude_terms = _extract_excluded_terms(user_text, params)
+        filtered = bool(include_terms or exclude_terms)
+        pushed_down = False
+
+        if expense_rollups is not None and not filtered:
+            # Unfiltered charts read one pre-aggregated row per bucket instead of every expense.
+            await asyncio.to_thread(expense_rollups.ensure_built, expenses_model)
+            expenses = expense_rollups.as_expense_rows(_CHART_GRAINS[chart_type], start, end)
+            original_count = plotted_count = expense_rollups.count(start, end)
+            filter_summary = ""
+        elif expense_search_index is not None:
+            # Include/exclude terms are looked up in the inverted index rather than matched row by row.
+            await asyncio.to_thread(expense_search_index.ensure_built, expenses_model)
+            expenses, filter_summary, original_count = await asyncio.to_thread(
+                _indexed_expense_filters, expense_search_index, include_terms, exclude_terms, start, end
+            )
+            plotted_count = len(expenses)
+        else:
+            fields = None
+            if filtered:
+                # Let NocoDB drop excluded rows and unused columns; the Python pass below stays
+                # authoritative, so a term that cannot be pushed down is still honoured.
+                columns = await asyncio.to_thread(expenses_model.column_titles)
+                if columns:
+                    where = search_where(include_terms, exclude_terms, [f for f in SEARCH_FIELDS if f in columns])
+                    if where:
+                        filter_parts.append(where)
+                        pushed_down = True
+                    fields = [f for f in ("Id", "Date", "Amount", *SEARCH_FIELDS) if f in columns]
+
+            def _stream_expenses():
+                # Rows are filtered page by page instead of materialising the whole window.
+                nonlocal original_count
+                for row in expenses_model.iter_list(
+                    json.dumps({"filters": filter_parts}) if filter_parts else None, fields=fields
+                ):
+                    original_count += 1
+                    yield row
+
+            expenses, filter_summary = _apply_expense_filters(_stream_expenses(), params, user_text)
+            plotted_count = len(expenses)
+        if not original_count and pushed_down:
+            return f"No expenses found for that period after filters ({filter_summary}) - nothing to chart."
+        if not original_count:
             return "No expenses found for that period - nothing to chart."
-
-        original_count = len(expenses)
-        expenses, filter_summary = _apply_expense_filters(expenses, params, user_text)
         if not expenses:
             detail = f" after filters ({filter_summary})" if filter_summary else ""
             return f"No expenses found for that period{detail} - nothing to chart."
@@ -300,44 +394,27 @@ async def _make_analytics_tool(update: Update, context: ContextTypes.DEFAULT_TYP
         filter_line = f"\nFilters: {filter_summary}" if filter_summary else ""
 
         chart_specs = {
-            "category_pie": (
-                lambda: spending_pie_chart(expenses, f"Spending Breakdown - {period_label}"),
-                "Category breakdown",
-            ),
-            "category_bar": (
-                lambda: spending_category_bar_chart(expenses, f"Category Spending - {period_label}"),
-                "Category spending",
-            ),
-            "daily_bar": (
-                lambda: spending_bar_chart(expenses, f"Daily Spending - {period_label}"),
-                "Daily spending",
-            ),
-            "daily_line": (
-                lambda: spending_daily_line_chart(expenses, f"Daily Spending Trend - {period_label}"),
-                "Daily spending trend",
-            ),
-            "weekly_bar": (
-                lambda: spending_period_bar_chart(expenses, "week", f"Weekly Spending - {period_label}"),
-                "Weekly spending",
-            ),
-            "monthly_bar": (
-                lambda: spending_period_bar_chart(expenses, "month", f"Monthly Spending - {period_label}"),
-                "Monthly spending",
-            ),
+            "category_pie": (f"Spending Breakdown - {period_label}", "Category breakdown"),
+            "category_bar": (f"Category Spending - {period_label}", "Category spending"),
+            "daily_bar": (f"Daily Spending - {period_label}", "Daily spending"),
+            "daily_line": (f"Daily Spending Trend - {period_label}", "Daily spending trend"),
+            "weekly_bar": (f"Weekly Spending - {period_label}", "Weekly spending"),
+            "monthly_bar": (f"Monthly Spending - {period_label}", "Monthly spending"),
         }
 
         try:
-            make_chart, label = chart_specs[chart_type]
-            buf = make_chart()
+            # Rendered in a worker process (and cached), so matplotlib never runs on the event loop.
+            title, label = chart_specs[chart_type]
+            png = await render_chart(chart_type, expenses, title, filter_summary)
             await context.bot.send_photo(
                 chat_id=update.effective_chat.id,
-                photo=buf,
+                photo=png,
                 caption=f"*{label}*\nPeriod: {period_label}{filter_line}\nTotal: Rs.{grand_total:,.0f}",
                 parse_mode="markdown",
             )
             return (
                 f"Sent {label.lower()} chart ({chart_type}). "
-                f"{len(expenses)} of {original_count} transactions plotted, totalling Rs.{grand_total:,.0f} "
+                f"{plotted_count} of {original_count} transactions plotted, totalling Rs.{grand_total:,.0f} "
                 f"for {period_label}."
                 + (f" Filters: {filter_summary}." if filter_summary else "")
             )
@@ -359,25 +436,45 @@ async def _make_analytics_tool(update: Update, context: ContextTypes.DEFAULT_TYP
     )
 
 
-async def agent_engage(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
-    tools = _static_tools + [
-        await _make_wolfram_tool(update, context),
-        await _make_analytics_tool(update, context, text),
-    ]
+def _state_modifier(state):
+    today = datetime.now().strftime("%Y-%m-%d %A")
+    content = "\n".join(SYSTEM_PROMPT) + f"\nToday's date is {today}."
+    return [SystemMessage(content=content)] + state["messages"]
+
+
+_agent = None
+_agent_lock = threading.Lock()
+
 
-    def _state_modifier(state):
-        today = datetime.now().strftime("%Y-%m-%d %A")
-        content = "\n".join(SYSTEM_PROMPT) + f"\nToday's date is {today}."
-        return [SystemMessage(content=content)] + state["messages"]
+def _get_agent():
+    """Compile the main agent graph on first use and reuse it for every message.
 
-    agent = create_react_agent(llm, tools, prompt=_state_modifier, checkpointer=_main_memory)
+    Tools that need the Telegram update read it from the run config, so the
+    graph itself carries no per-message state. The sub-agent managers and the
+    LLM client are constructed here too, not at import time.
+    """
+    global _agent
+    with _agent_lock:
+        if _agent is None:
+            from bujo.base import llm
 
+            tools = _static_tools(llm) + [_make_wolfram_tool(), _make_analytics_tool()]
+            _agent = create_react_agent(llm, tools, prompt=_state_modifier, checkpointer=_main_memory)
+    return _agent
+
+
+async def agent_engage(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
     logger.info("Chat from user %s: %s", update.effective_user.id, text)
     try:
         await update.message.reply_chat_action(telegram.constants.ChatAction.TYPING)
-        result = await agent.ainvoke(
+        result = await _get_agent().ainvoke(
             {"messages": [HumanMessage(content=text)]},
-            config={"configurable": {"thread_id": f"user_{update.effective_user.id}"}},
+            config={"configurable": {
+                "thread_id": f"user_{update.effective_user.id}",
+                "update": update,
+                "context": context,
+                "user_text": text,
+            }},
         )
         response_text = result["messages"][-1].content
         logger.info("Agent response: %s", response_text)
@@ -0,0 +1,167 @@
+"""Chart rendering off the event loop, with a PNG cache.
+
+The matplotlib builders in ``charts`` run in a small process pool. Its workers
+import matplotlib once when they start, so a slow render neither stalls the
+bot nor pays the import again. Rendered PNG bytes are kept in an in-memory
+LRU and on disk for ``CHART_CACHE_ENTRIES`` charts. Entries are keyed by
+chart type, title, filters and a fingerprint of the plotted rows, so asking
+for the same breakdown twice skips rendering.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_CHART_CACHE_DIR = Path(tempfile.gettempdir()) / "chart_cache"
+_CHART_CACHE_ENTRIES = int(os.environ.get("CHART_CACHE_ENTRIES", "64"))
+_CHART_RENDER_WORKERS = int(os.environ.get("CHART_RENDER_WORKERS", "1"))
+_ROW_FIELDS = ("Date", "Item", "Category", "Amount")
+
+_BUILDERS = {
+    "category_pie": lambda charts, rows, title: charts.spending_pie_chart(rows, title),
+    "category_bar": lambda charts, rows, title: charts.spending_category_bar_chart(rows, title),
+    "daily_bar": lambda charts, rows, title: charts.spending_bar_chart(rows, title),
+    "daily_line": lambda charts, rows, title: charts.spending_daily_line_chart(rows, title),
+    "weekly_bar": lambda charts, rows, title: charts.spending_period_bar_chart(rows, "week", title),
+    "monthly_bar": lambda charts, rows, title: charts.spending_period_bar_chart(rows, "month", title),
+}
+
+_memory: "OrderedDict[str, bytes]" = OrderedDict()
+_memory_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+# ── Rendering (runs in the worker processes) ─────────────────────────────────
+
+def _warm_worker() -> None:
+    from bujo.analytics import charts  # noqa: F401  (imports matplotlib)
+
+
+def _render_png(chart_type: str, rows: List[Dict[str, Any]], title: str) -> bytes:
+    from bujo.analytics import charts
+
+    return _BUILDERS[chart_type](charts, rows, title).getvalue()
+
+
+# ── Cache ────────────────────────────────────────────────────────────────────
+
+def _slim(expenses: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Only the fields the builders read are shipped to the worker and hashed.
+    return [{field: exp.get(field) for field in _ROW_FIELDS} for exp in expenses]
+
+
+def chart_cache_key(chart_type: str, title: str, filters: str, rows: List[Dict[str, Any]]) -> str:
+    digest = hashlib.sha256(json.dumps([chart_type, title, filters or ""]).encode("utf-8"))
+    for row in rows:
+        digest.update(json.dumps([row.get(f) for f in _ROW_FIELDS], default=str).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def _cache_file(key: str) -> Path:
+    return _CHART_CACHE_DIR / f"{key}.png"
+
+
+def _cache_get(key: str) -> Optional[bytes]:
+    with _memory_lock:
+        png = _memory.get(key)
+        if png is not None:
+            _memory.move_to_end(key)
+            return png
+    try:
+        png = _cache_file(key).read_bytes()
+    except OSError:
+        return None
+    _remember(key, png)
+    return png
+
+
+def _remember(key: str, png: bytes) -> None:
+    with _memory_lock:
+        _memory[key] = png
+        _memory.move_to_end(key)
+        while len(_memory) > _CHART_CACHE_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _cache_put(key: str, png: bytes) -> None:
+    _remember(key, png)
+    try:
+        _CHART_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_file = _cache_file(key)
+        tmp_file = cache_file.with_suffix(".tmp")
+        tmp_file.write_bytes(png)
+        os.replace(tmp_file, cache_file)
+        files = sorted(_CHART_CACHE_DIR.glob("*.png"), key=lambda p: p.stat().st_mtime)
+        for stale in files[:-_CHART_CACHE_ENTRIES]:
+            stale.unlink(missing_ok=True)
+    except Exception as e:
+        logger.debug("Chart cache write failed for %s: %s", key, e)
+
+
+# ── Worker pool ──────────────────────────────────────────────────────────────
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                context = multiprocessing.get_context(method)
+                if method == "forkserver":
+                    context.set_forkserver_preload(["bujo.analytics.charts"])
+                _pool = ProcessPoolExecutor(
+                    max_workers=_CHART_RENDER_WORKERS, mp_context=context, initializer=_warm_worker
+                )
+    return _pool
+
+
+def warm_chart_pool() -> None:
+    """Start the render workers ahead of the first chart request."""
+    if _CHART_RENDER_WORKERS > 0:
+        _get_pool().submit(_warm_worker).result()
+
+
+def shutdown_chart_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def render_chart(chart_type: str, expenses: Iterable[Dict[str, Any]], title: str, filters: str = "") -> bytes:
+    """PNG bytes for one chart, from the cache or rendered in the worker pool."""
+    if chart_type not in _BUILDERS:
+        raise ValueError(f"Unsupported chart type: {chart_type}")
+    rows = _slim(expenses)
+    key = chart_cache_key(chart_type, title, filters, rows)
+    png = _cache_get(key)
+    if png is not None:
+        logger.info("Chart cache hit for %s", chart_type)
+        return png
+
+    if _CHART_RENDER_WORKERS > 0:
+        try:
+            png = await asyncio.get_running_loop().run_in_executor(_get_pool(), _render_png, chart_type, rows, title)
+        except BrokenProcessPool:
+            logger.warning("Chart worker pool died; rendering %s in a thread instead.", chart_type)
+            shutdown_chart_pool()
+            png = await asyncio.to_thread(_render_png, chart_type, rows, title)
+    else:
+        png = await asyncio.to_thread(_render_png, chart_type, rows, title)
+    _cache_put(key, png)
+    return png
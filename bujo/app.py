@@ -1,4 +1,7 @@
+import asyncio
 import logging
+import os
+import time
 
 from telegram.ext import (
     ApplicationBuilder,
@@ -39,13 +42,51 @@ from bujo.handlers.portfolio import (
 )
 from bujo.handlers.system import ddns, genPass, wakeUpThePC
 from bujo.logging_config import configure_logging
+from bujo.models.base import close_async_client
 from bujo.scheduler import setup_scheduler
 
 logger = logging.getLogger(__name__)
 
+# Build the agents in the background once polling starts, so the first message
+# does not pay for importing LangChain; set BOT_WARM_UP=0 to build on demand.
+_WARM_UP = os.environ.get("BOT_WARM_UP", "1") != "0"
+
+
+def _warm_up():
+    from bujo.agent import _get_agent
+    from bujo.analytics.render import warm_chart_pool
+
+    started = time.perf_counter()
+    try:
+        _get_agent()
+        warm_chart_pool()
+    except Exception as e:
+        logger.error("Agent warm-up failed, building on first message instead: %s", e)
+        return
+    logger.info("Agents ready in %.2fs", time.perf_counter() - started)
+
+
+async def _post_init(application):
+    await setup_scheduler(application)
+    if _WARM_UP:
+        application.create_task(asyncio.to_thread(_warm_up))
+
+
+async def _post_shutdown(application):
+    from bujo.analytics.render import shutdown_chart_pool
+
+    shutdown_chart_pool()
+    await close_async_client()
+
 
 def build_application():
-    app = ApplicationBuilder().token(TELEGRAM_TOKEN).post_init(setup_scheduler).build()
+    app = (
+        ApplicationBuilder()
+        .token(TELEGRAM_TOKEN)
+        .post_init(_post_init)
+        .post_shutdown(_post_shutdown)
+        .build()
+    )
 
     app.add_handler(ConversationHandler(
         entry_points=[CommandHandler("buildPortfolio", bp_start)],
@@ -1,12 +1,14 @@
 import os
 import sched
+import threading
 
-from langchain_openai import ChatOpenAI
-from openai import OpenAI
+from bujo.expenses.rollups import ExpenseRollups
+from bujo.expenses.search_index import ExpenseSearchIndex
 from bujo.models.expenses import Expenses
 from bujo.models.mag import MAG
 from bujo.models.portfolio_transactions import PortfolioTransactions
 from bujo.models.price_alerts import PriceAlerts
+from bujo.models.replica import LocalReplica
 from dotenv import load_dotenv
 from functools import wraps
 from telegram.ext import ConversationHandler
@@ -47,45 +49,76 @@ NOIP_USERNAME = os.environ["NOIP_USERNAME"]
 NOIP_PASSWORD = os.environ["NOIP_PASSWORD"]
 NOIP_HOSTNAME = os.environ["NOIP_HOSTNAME"]
 # Initializations
-_original_create_chat_result = ChatOpenAI._create_chat_result
+# The LLM clients pull in langchain_openai/openai, which dominate start-up time,
+# so they are built on first access through the module ``__getattr__`` below.
+_client_lock = threading.Lock()
 
 
-def patched_create_chat_result(self, response, generation_info):
-    # Iterate over each choice in the ChatCompletion response.
-    for choice in response.choices:
-        message = choice.message
-        # Check if the message has a tool_calls attribute.
-        if hasattr(message, "tool_calls") and message.tool_calls:
-            for tool_call in message.tool_calls:
-                # Check if the tool_call has a function with arguments.
-                if hasattr(tool_call, "function") and hasattr(tool_call.function, "arguments"):
-                    if not isinstance(tool_call.function.arguments, str):
-                        tool_call.function.arguments = json.dumps(tool_call.function.arguments)
-    return _original_create_chat_result(self, response, generation_info)
+def _build_llm():
+    from langchain_openai import ChatOpenAI
 
+    _original_create_chat_result = ChatOpenAI._create_chat_result
 
-ChatOpenAI._create_chat_result = patched_create_chat_result
+    def patched_create_chat_result(self, response, generation_info):
+        # Iterate over each choice in the ChatCompletion response.
+        for choice in response.choices:
+            message = choice.message
+            # Check if the message has a tool_calls attribute.
+            if hasattr(message, "tool_calls") and message.tool_calls:
+                for tool_call in message.tool_calls:
+                    # Check if the tool_call has a function with arguments.
+                    if hasattr(tool_call, "function") and hasattr(tool_call.function, "arguments"):
+                        if not isinstance(tool_call.function.arguments, str):
+                            tool_call.function.arguments = json.dumps(tool_call.function.arguments)
+        return _original_create_chat_result(self, response, generation_info)
 
-# gpt-5-mini does not support the 'stop' parameter.
-# LangChain's ReAct agent always injects stop sequences, so strip them here.
-_orig_generate = ChatOpenAI._generate
-_orig_agenerate = ChatOpenAI._agenerate
+    ChatOpenAI._create_chat_result = patched_create_chat_result
 
-def _patched_generate(self, messages, stop=None, run_manager=None, **kwargs):
-    return _orig_generate(self, messages, stop=None, run_manager=run_manager, **kwargs)
+    # gpt-5-mini does not support the 'stop' parameter.
+    # LangChain's ReAct agent always injects stop sequences, so strip them here.
+    _orig_generate = ChatOpenAI._generate
+    _orig_agenerate = ChatOpenAI._agenerate
 
-async def _patched_agenerate(self, messages, stop=None, run_manager=None, **kwargs):
-    return await _orig_agenerate(self, messages, stop=None, run_manager=run_manager, **kwargs)
+    def _patched_generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return _orig_generate(self, messages, stop=None, run_manager=run_manager, **kwargs)
 
-ChatOpenAI._generate = _patched_generate
-ChatOpenAI._agenerate = _patched_agenerate
+    async def _patched_agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return await _orig_agenerate(self, messages, stop=None, run_manager=run_manager, **kwargs)
 
-llm = ChatOpenAI(model=OPENAI_MODEL)
-openai_model = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-mag_model = MAG(NOCODB_BASE_URL, NOCODB_API_TOKEN, NOCODB_MAG_TABLE_ID)
-expenses_model = Expenses(NOCODB_BASE_URL, NOCODB_API_TOKEN, NOCODB_EXPENSES_TABLE_ID, NOCODB_EXPENSES_MAG_LINK_ID, mag_model)
-portfolio_transactions_model = PortfolioTransactions(NOCODB_BASE_URL, NOCODB_API_TOKEN, NOCODB_TRANSACTIONS_TABLE_ID)
-price_alerts_model = PriceAlerts(NOCODB_BASE_URL, NOCODB_API_TOKEN, NOCODB_PRICE_ALERTS_TABLE_ID)
+    ChatOpenAI._generate = _patched_generate
+    ChatOpenAI._agenerate = _patched_agenerate
+
+    return ChatOpenAI(model=OPENAI_MODEL)
+
+
+def _build_openai_model():
+    from openai import OpenAI
+
+    return OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+
+
+_LAZY_CLIENTS = {"llm": _build_llm, "openai_model": _build_openai_model}
+
+
+def __getattr__(name):
+    if name not in _LAZY_CLIENTS:
+        raise AttributeError(name)
+    with _client_lock:
+        if name not in globals():
+            globals()[name] = _LAZY_CLIENTS[name]()
+    return globals()[name]
+
+
+# Local SQLite mirror of the NocoDB tables; set NOCODB_REPLICA=0 to read straight from REST.
+nocodb_replica = LocalReplica() if os.environ.get("NOCODB_REPLICA", "1") != "0" else None
+# Inverted index over expense text for include/exclude filters and searches; EXPENSE_SEARCH_INDEX=0 scans instead.
+expense_search_index = ExpenseSearchIndex() if os.environ.get("EXPENSE_SEARCH_INDEX", "1") != "0" else None
+# Day/week/month/item expense totals; set EXPENSE_ROLLUPS=0 to aggregate raw rows instead.
+expense_rollups = ExpenseRollups() if os.environ.get("EXPENSE_ROLLUPS", "1") != "0" else None
+mag_model = MAG(NOCODB_BASE_URL, NOCODB_API_TOKEN, NOCODB_MAG_TABLE_ID, replica=nocodb_replica)
+expenses_model = Expenses(NOCODB_BASE_URL, NOCODB_API_TOKEN, NOCODB_EXPENSES_TABLE_ID, NOCODB_EXPENSES_MAG_LINK_ID, mag_model, replica=nocodb_replica, search_index=expense_search_index, rollups=expense_rollups)
+portfolio_transactions_model = PortfolioTransactions(NOCODB_BASE_URL, NOCODB_API_TOKEN, NOCODB_TRANSACTIONS_TABLE_ID, replica=nocodb_replica)
+price_alerts_model = PriceAlerts(NOCODB_BASE_URL, NOCODB_API_TOKEN, NOCODB_PRICE_ALERTS_TABLE_ID, replica=nocodb_replica)
 expense_add_messages=[
     {'role': 'system', 'content': 'You are an expert freetext to python serializer'},
     {'role': 'system', 'content': 'There are following fields in expenses schema: date, item, amount'},
@@ -0,0 +1,114 @@
+"""Shared scaffolding for the SQLite stores derived from the expense table.
+
+``ExpenseRollups`` and ``ExpenseSearchIndex`` both rebuild from the whole
+table, take the Expenses model's writes through ``upsert`` and ``remove``,
+and journal the writes that arrive while a rebuild is reading the table so
+they can be replayed over its result. A subclass provides ``_rebuild``,
+``_upsert_rows`` and ``_remove_ids``; everything else lives here.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class DerivedExpenseStore:
+    """Thread-safe SQLite store rebuilt from the expense table and kept current by write-through."""
+
+    _SCHEMA = ""
+    _STATE_TABLE = ""  # (name, value) table holding the 'built_at' stamp
+
+    def __init__(self, path: Path, max_age_seconds: float):
+        self.path = Path(path)
+        self.max_age = max_age_seconds
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding = threading.Lock()  # one rebuild owns the journal at a time
+        # Writes seen while a rebuild is reading the table, as ("upsert", rows) / ("remove", ids).
+        self._journal: Optional[List[Tuple[str, List[Any]]]] = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(self._SCHEMA)
+        self._conn.commit()
+
+    # ── Maintenance ─────────────────────────────────────────────────────────
+
+    def built_at(self) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT value FROM {self._STATE_TABLE} WHERE name = 'built_at'").fetchone()
+        return row[0] if row else None
+
+    def is_fresh(self) -> bool:
+        built_at = self.built_at()
+        return built_at is not None and time.time() - built_at < self.max_age
+
+    def rebuild(self, expenses: Iterable[Dict[str, Any]]) -> int:
+        """Replace the store's contents with ``expenses``; returns the number of expenses kept."""
+        with self._rebuilding:
+            with self._lock:
+                self._journal = []
+            try:
+                return self._rebuild(expenses)
+            finally:
+                with self._lock:
+                    self._journal = None
+
+    def _rebuild(self, expenses: Iterable[Dict[str, Any]]) -> int:
+        """Read ``expenses`` without the lock, then swap the result in and call ``_finish_rebuild``."""
+        raise NotImplementedError
+
+    def _finish_rebuild(self) -> None:
+        """Inside the swap transaction: replay the journal and stamp ``built_at``."""
+        # The snapshot may predate writes made while it was read; replaying them is idempotent.
+        for op, args in self._journal:
+            if op == "upsert":
+                self._upsert_rows(args)
+            else:
+                self._remove_ids(args)
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {self._STATE_TABLE} (name, value) VALUES ('built_at', ?)", (time.time(),)
+        )
+
+    def ensure_built(self, expenses_model) -> None:
+        """Rebuild from ``expenses_model`` if the store is missing or older than ``max_age``.
+
+        A model with a replica is synced first, so edits made in NocoDB arrive
+        on the replica's schedule rather than at the next rebuild.
+        """
+        if getattr(expenses_model, "replica", None) is not None:
+            expenses_model.sync_replica()
+        if self.is_fresh():
+            return
+        with self._rebuild_lock:
+            if not self.is_fresh():
+                self.rebuild(expenses_model.iter_list())
+
+    # ── Write-through ───────────────────────────────────────────────────────
+
+    def _record(self, op: str, args: List[Any]) -> None:
+        if self._journal is not None:
+            self._journal.append((op, args))
+
+    def upsert(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Apply created or updated expenses; a partial row (a PATCH body) is merged over the stored one."""
+        rows = list(rows)
+        with self._lock, self._conn:
+            self._record("upsert", rows)
+            if self.built_at() is not None:  # never built: the first rebuild will include these rows
+                self._upsert_rows(rows)
+
+    def remove(self, record_ids: Iterable[Any]) -> None:
+        """Take deleted expenses out of the store."""
+        record_ids = list(record_ids)
+        with self._lock, self._conn:
+            self._record("remove", record_ids)
+            if self.built_at() is not None:
+                self._remove_ids(record_ids)
+
+    def _upsert_rows(self, rows: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def _remove_ids(self, record_ids: List[Any]) -> None:
+        raise NotImplementedError
@@ -1,7 +1,10 @@
+import asyncio
 import json
 import logging
 from datetime import datetime
+from typing import Optional
 
+from bujo.expenses.rollups import ExpenseRollups
 from bujo.models.expenses import Expenses
 from bujo.models.mag import MAG
 from bujo.base import llm
@@ -12,8 +15,10 @@ from langgraph.prebuilt import create_react_agent
 
 logger = logging.getLogger(__name__)
 
+_SEARCH_RESULT_LIMIT = 50
+
 SYSTEM_PROMPT = [
-    "You are an expense tracking assistant. You handle two use cases and use two tools to perform them.",
+    "You are an expense tracking assistant. You handle four use cases and use four tools to perform them.",
     "⚠️ CRITICAL: You MUST always call a tool to complete any request. NEVER respond with a fabricated or assumed result. If the user asks to add an expense, you MUST call `Expense_Creation`. If the user asks to list expenses, you MUST call `Expense_Lookup`. Do not skip tool calls under any circumstances.",
 
     "Use Case 1: When a user wants to **add an expense**, follow these instructions:",
@@ -30,6 +35,14 @@ SYSTEM_PROMPT = [
     "• Only include date filters in the tool input. Do not filter by Item or Amount in the input — apply those filters **after** you receive the tool response.",
     "• Once expenses are fetched, summarize them according to the user's request and any grouping mentioned.",
 
+    "Use Case 3: When a user only wants **totals** (e.g. 'How much did I spend in March?', 'Monthly spend this year', 'What did I spend most on last month?'), call `Expense_Totals` instead of listing expenses:",
+    "• Send a JSON string like {{\"start_date\": \"2025-03-01\", \"end_date\": \"2025-04-01\", \"group_by\": \"month\"}}. 'end_date' is exclusive; 'group_by' is one of day, week, month, item.",
+    "• Use `Expense_Lookup` instead when the user asks about specific items or needs individual expenses.",
+
+    "Use Case 4: When a user wants expenses **matching a name or word** (e.g. 'Find all Swiggy orders', 'Show grocery expenses in March except Instamart'), call `Expense_Search`:",
+    "• Send a JSON string like {{\"terms\": [\"Swiggy\"], \"exclude_terms\": [\"Instamart\"], \"start_date\": \"2025-03-01\", \"end_date\": \"2025-04-01\"}}. Dates are optional and 'end_date' is exclusive.",
+    "• Terms match words in Item, Category, Type, Note and Description, including word prefixes and plurals.",
+
     "Remember that today's date is {today_date}, and the week starts on Monday.",
 
     "📌 Final and most important instruction: When sending responses to either the LLM or the parent tool, always send them as a **string** — not a JSON object.",
@@ -40,22 +53,37 @@ SYSTEM_PROMPT = [
 
 
 class ExpenseManager:
-    def __init__(self, expenses_model: Expenses, mag_model: MAG):
+    def __init__(self, expenses_model: Expenses, mag_model: MAG, rollups: Optional[ExpenseRollups] = None):
         logger.info("Initializing ExpenseManager")
         self.expenses_model = expenses_model
         self.mag_model = mag_model
+        self.rollups = rollups
 
         tools = [
             Tool(
                 name="Expense_Lookup",
                 func=self.expenses_model.list,
+                coroutine=self.expenses_model.alist,
                 description="Use this tool to fetch expenses based on specific filters.",
             ),
             Tool(
                 name="Expense_Creation",
                 func=self.add_expense,
+                coroutine=self.aadd_expense,
                 description="Use this tool to create a new expense entry.",
             ),
+            Tool(
+                name="Expense_Search",
+                func=self.expense_search,
+                coroutine=self.aexpense_search,
+                description="Use this tool to find expenses whose item, category, type, note or description match given words.",
+            ),
+            Tool(
+                name="Expense_Totals",
+                func=self.expense_totals,
+                coroutine=self.aexpense_totals,
+                description="Use this tool to get spending totals per day, week, month or item for a date range.",
+            ),
         ]
 
         self._tools = tools
@@ -93,6 +121,30 @@ class ExpenseManager:
                 logger.error("Error in agent_expenses: %s", e, exc_info=True)
                 return "Sorry, there was an error processing your request."
 
+    async def aagent_expenses(self, prompt: str) -> str:
+        """Coroutine twin of ``agent_expenses`` for callers on the event loop."""
+        text = prompt.strip()
+        logger.info("Received prompt: %s", text)
+        for attempt in range(2):
+            try:
+                result = await self.agent.ainvoke(
+                    {"messages": [HumanMessage(content=text)]},
+                    config={"configurable": {"thread_id": "expenses"}},
+                )
+                output = result["messages"][-1].content
+                logger.info("Agent response: %s", output)
+                return output
+            except ValueError as e:
+                if "INVALID_CHAT_HISTORY" in str(e) and attempt == 0:
+                    logger.warning("Corrupt expenses chat history — resetting memory and retrying.")
+                    self._build_agent()
+                    continue
+                logger.error("Error in aagent_expenses: %s", e, exc_info=True)
+                return "Sorry, there was an error processing your request."
+            except Exception as e:
+                logger.error("Error in aagent_expenses: %s", e, exc_info=True)
+                return "Sorry, there was an error processing your request."
+
     def add_expense(self, data: str) -> str:
         logger.info("Adding expense with data: %s", data)
         try:
@@ -113,3 +165,87 @@ class ExpenseManager:
         except Exception as e:
             logger.error("Error in add_expense: %s", e, exc_info=True)
             return "Failed to add expense entry due to an error."
+
+    async def aadd_expense(self, data: str) -> str:
+        logger.info("Adding expense with data: %s", data)
+        try:
+            data_object = json.loads(data)
+            response_add = await self.expenses_model.acreate(data_object)
+            logger.info("Expense creation response: %s", response_add)
+            if "failed" in str(response_add).lower():
+                logger.warning("Failed to add expense entry.")
+                return "Failed to add expense entry. Try again?"
+            mag_object = await self.mag_model.afind_by_date(data_object["Date"])
+            if mag_object:
+                logger.info("Linking MAG %s to expense %s", mag_object["Id"], response_add["Id"])
+                await self.expenses_model.alink_mag_to_expense(response_add["Id"], mag_object["Id"])
+            else:
+                logger.info("No MAG entry found to link with the expense.")
+                return "Expense added but no MAG entry found to link the expense to that date!"
+            return "Expense added successfully"
+        except Exception as e:
+            logger.error("Error in aadd_expense: %s", e, exc_info=True)
+            return "Failed to add expense entry due to an error."
+
+    def expense_totals(self, query: str) -> str:
+        """Spending totals from the rollups, grouped by day, week, month or item."""
+        logger.info("Expense totals request: %s", query)
+        if self.rollups is None:
+            return "Totals are not available; use Expense_Lookup and add up the expenses instead."
+        try:
+            cleaned = str(query or "").replace("```json", "").replace("```", "").strip()
+            params = json.loads(cleaned) if cleaned else {}
+            start, end = params.get("start_date"), params.get("end_date")
+            group_by = str(params.get("group_by") or "month").lower()
+            self.rollups.ensure_built(self.expenses_model)
+            totals = self.rollups.totals(group_by, start, end)
+        except Exception as e:
+            logger.error("Error in expense_totals: %s", e, exc_info=True)
+            return "Failed to compute expense totals."
+
+        period = f"{start or 'the beginning'} to {end or 'today'} (end exclusive)"
+        if not totals:
+            return f"No expenses found from {period}."
+        rows = sorted(totals.items(), key=lambda kv: -kv[1]) if group_by == "item" else totals.items()
+        lines = [f"{label}: ₹{total:,.2f}" for label, total in rows]
+        lines.append(
+            f"Total: ₹{sum(totals.values()):,.2f} across {self.rollups.count(start, end)} expenses from {period}"
+        )
+        return "\n".join(lines)
+
+    async def aexpense_totals(self, query: str) -> str:
+        # SQLite reads (and an occasional rebuild) stay off the event loop.
+        return await asyncio.to_thread(self.expense_totals, query)
+
+    def expense_search(self, query: str) -> str:
+        """Expenses matching words, answered from the search index."""
+        logger.info("Expense search request: %s", query)
+        index = self.expenses_model.search_index
+        if index is None:
+            return "Search is not available; use Expense_Lookup and match the items yourself."
+        try:
+            cleaned = str(query or "").replace("```json", "").replace("```", "").strip()
+            params = json.loads(cleaned) if cleaned else {}
+            terms = [str(t) for t in params.get("terms") or []]
+            exclude_terms = [str(t) for t in params.get("exclude_terms") or []]
+            start, end = params.get("start_date"), params.get("end_date")
+            index.ensure_built(self.expenses_model)
+            expenses = index.search(terms, exclude_terms, start, end)
+        except Exception as e:
+            logger.error("Error in expense_search: %s", e, exc_info=True)
+            return "Failed to search expenses."
+
+        if not expenses:
+            return "No matching expenses found."
+        lines = [
+            f"{e.get('Date')}: {e.get('Item')} ₹{float(e.get('Amount') or 0):,.2f}"
+            for e in expenses[-_SEARCH_RESULT_LIMIT:]
+        ]
+        if len(expenses) > _SEARCH_RESULT_LIMIT:
+            lines.insert(0, f"Showing the latest {_SEARCH_RESULT_LIMIT} of {len(expenses)} matches.")
+        total = sum(float(e.get("Amount") or 0) for e in expenses)
+        lines.append(f"Total: ₹{total:,.2f} across {len(expenses)} expenses")
+        return "\n".join(lines)
+
+    async def aexpense_search(self, query: str) -> str:
+        return await asyncio.to_thread(self.expense_search, query)
@@ -0,0 +1,303 @@
+"""Pre-aggregated expense totals kept in SQLite.
+
+Totals are stored per day, ISO week, month and per item per day, with the
+number of expenses behind each. ``rebuild`` recomputes them from the whole
+expense table. The Expenses model writes its creates, updates and deletes
+through ``upsert`` and ``remove``, so the bot's own changes show up
+immediately. Every counted expense is recorded with the fields its totals
+came from, so an update takes the old contribution out before adding the
+new one, and an expense is never counted twice. Writes that arrive while a
+rebuild is reading the table are journaled and replayed over its result,
+so they are not lost when the rebuild swaps its totals in.
+
+Edits made directly in NocoDB arrive with the replica's delta sync, which
+hands the pulled rows and pruned Ids to the same ``upsert``/``remove``, so
+the totals are no staler than what Expense_Lookup reads. Without a replica
+they are picked up by the next rebuild, at most
+``EXPENSE_ROLLUP_MAX_AGE_HOURS`` after the previous one.
+"""
+
+import logging
+import os
+import tempfile
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bujo.expenses.derived_store import DerivedExpenseStore
+from bujo.models.replica import _row_id
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PATH = Path(tempfile.gettempdir()) / "expense_rollups.sqlite3"
+_DEFAULT_MAX_AGE_SECONDS = float(os.environ.get("EXPENSE_ROLLUP_MAX_AGE_HOURS", "24")) * 3600
+
+GRAINS = ("day", "week", "month", "item")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    grain  TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    key    TEXT NOT NULL DEFAULT '',
+    total  REAL NOT NULL,
+    count  INTEGER NOT NULL,
+    PRIMARY KEY (grain, bucket, key)
+);
+CREATE TABLE IF NOT EXISTS counted_expenses (
+    id       INTEGER PRIMARY KEY,
+    date     TEXT NOT NULL,
+    item     TEXT,
+    category TEXT,
+    amount   REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name  TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+_UPSERT = """
+INSERT INTO rollups (grain, bucket, key, total, count) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (grain, bucket, key) DO UPDATE SET
+    total = total + excluded.total,
+    count = count + excluded.count
+"""
+
+_Entry = Tuple[str, str, str, float, int]  # grain, bucket, key, total, count
+_COUNTED_FIELDS = ("Date", "Item", "Category", "Amount")
+
+
+def item_label(expense: Dict[str, Any]) -> str:
+    """The label the category charts group by."""
+    return str(expense.get("Item") or expense.get("Category") or "Misc").strip() or "Misc"
+
+
+def _expense_day(expense: Dict[str, Any]) -> Optional[date]:
+    try:
+        return datetime.strptime(str(expense.get("Date") or "")[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def bucket_of(grain: str, day: date) -> str:
+    if grain == "week":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    if grain == "month":
+        return day.strftime("%Y-%m")
+    return day.isoformat()
+
+
+def _bucket_start(grain: str, day: date) -> date:
+    if grain == "week":
+        return day - timedelta(days=day.weekday())
+    if grain == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _bucket_first_day(grain: str, bucket: str) -> str:
+    if grain == "week":
+        year, week = bucket.split("-W")
+        return date.fromisocalendar(int(year), int(week), 1).isoformat()
+    if grain == "month":
+        return f"{bucket}-01"
+    return bucket
+
+
+def _entries(expense: Dict[str, Any], sign: int = 1) -> List[_Entry]:
+    day = _expense_day(expense)
+    if day is None:
+        return []
+    amount = sign * float(expense.get("Amount") or 0)
+    iso = day.isoformat()
+    return [
+        ("day", iso, "", amount, sign),
+        ("week", bucket_of("week", day), "", amount, sign),
+        ("month", bucket_of("month", day), "", amount, sign),
+        ("item", iso, item_label(expense), amount, sign),
+    ]
+
+
+def _counted_row(row_id: int, expense: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        row_id,
+        str(expense.get("Date"))[:10],
+        expense.get("Item"),
+        expense.get("Category"),
+        float(expense.get("Amount") or 0),
+    )
+
+
+class ExpenseRollups(DerivedExpenseStore):
+    """Thread-safe SQLite store of expense totals by day, week, month and item."""
+
+    _SCHEMA = _SCHEMA
+    _STATE_TABLE = "rollup_state"
+
+    def __init__(self, path: Path = _DEFAULT_PATH, max_age_seconds: float = _DEFAULT_MAX_AGE_SECONDS):
+        super().__init__(path, max_age_seconds)
+        if self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'counted'").fetchone():
+            # Built before counted expenses kept their fields; updates could not be undone, so start over.
+            self._conn.execute("DROP TABLE counted")
+            self._conn.execute("DELETE FROM rollup_state WHERE name = 'built_at'")
+            self._conn.commit()
+
+    # ── Maintenance ─────────────────────────────────────────────────────────
+
+    def _rebuild(self, expenses: Iterable[Dict[str, Any]]) -> int:
+        totals: Dict[Tuple[str, str, str], List[float]] = defaultdict(lambda: [0.0, 0])
+        counted = {}
+        for expense in expenses:
+            row_id = _row_id(expense)
+            entries = _entries(expense)
+            if row_id is None or not entries:
+                continue
+            counted[row_id] = _counted_row(row_id, expense)
+            for grain, bucket, key, amount, count in entries:
+                slot = totals[(grain, bucket, key)]
+                slot[0] += amount
+                slot[1] += count
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM rollups")
+            self._conn.execute("DELETE FROM counted_expenses")
+            self._conn.executemany(
+                "INSERT INTO rollups (grain, bucket, key, total, count) VALUES (?, ?, ?, ?, ?)",
+                [(g, b, k, total, count) for (g, b, k), (total, count) in totals.items()],
+            )
+            self._conn.executemany(
+                "INSERT INTO counted_expenses (id, date, item, category, amount) VALUES (?, ?, ?, ?, ?)",
+                list(counted.values()),
+            )
+            self._finish_rebuild()
+        logger.info("Rebuilt expense rollups from %d expenses", len(counted))
+        return len(counted)
+
+    def _counted(self, row_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT date, item, category, amount FROM counted_expenses WHERE id = ?", (row_id,)
+        ).fetchone()
+        return dict(zip(_COUNTED_FIELDS, row)) if row else None
+
+    def _fold(self, row_id: int, expense: Dict[str, Any]) -> bool:
+        entries = _entries(expense)
+        if not entries:
+            return False
+        self._conn.executemany(_UPSERT, entries)
+        self._conn.execute(
+            "INSERT INTO counted_expenses (id, date, item, category, amount) VALUES (?, ?, ?, ?, ?)",
+            _counted_row(row_id, expense),
+        )
+        return True
+
+    def _unfold(self, row_id: int, counted: Dict[str, Any]) -> None:
+        self._conn.executemany(_UPSERT, _entries(counted, sign=-1))
+        self._conn.execute("DELETE FROM counted_expenses WHERE id = ?", (row_id,))
+        self._conn.execute("DELETE FROM rollups WHERE count <= 0")
+
+    def add(self, expense: Dict[str, Any]) -> bool:
+        """Fold one newly created expense in. Returns False if it was not counted."""
+        row_id = _row_id(expense)
+        with self._lock, self._conn:
+            self._record("upsert", [expense])
+            if row_id is None or self.built_at() is None or self._counted(row_id) is not None:
+                # Never built: the first rebuild will include this expense.
+                return False
+            return self._fold(row_id, expense)
+
+    def _upsert_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """A PATCH body is merged over the counted copy, whose totals are taken
+        out before the merged expense is added back. A partial row for an
+        expense that was never counted is left to the next rebuild.
+        """
+        for row in rows:
+            row_id = _row_id(row)
+            if row_id is None:
+                continue
+            counted = self._counted(row_id)
+            if counted is None:
+                if row.get("Date") and "Amount" in row:
+                    self._fold(row_id, row)
+                continue
+            merged = {**counted, **{f: row[f] for f in _COUNTED_FIELDS if f in row}}
+            merged["Date"] = str(merged["Date"] or "")[:10]
+            merged["Amount"] = float(merged["Amount"] or 0)
+            if merged == counted:
+                continue
+            self._unfold(row_id, counted)
+            self._fold(row_id, merged)
+
+    def _remove_ids(self, record_ids: List[Any]) -> None:
+        for record_id in record_ids:
+            row_id = _row_id({"Id": record_id})
+            counted = self._counted(row_id) if row_id is not None else None
+            if counted is not None:
+                self._unfold(row_id, counted)
+
+    # ── Reads ───────────────────────────────────────────────────────────────
+
+    def _day_range(self, start: Optional[str], end: Optional[str]) -> Tuple[str, List[Any]]:
+        sql, args = "", []
+        if start:
+            sql += " AND bucket >= ?"
+            args.append(start[:10])
+        if end:
+            sql += " AND bucket < ?"
+            args.append(end[:10])
+        return sql, args
+
+    def _aligned(self, grain: str, start: Optional[str], end: Optional[str]) -> bool:
+        for bound in (start, end):
+            if bound:
+                day = datetime.strptime(bound[:10], "%Y-%m-%d").date()
+                if _bucket_start(grain, day) != day:
+                    return False
+        return True
+
+    def totals(self, grain: str, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, float]:
+        """Totals per bucket (per item for ``item``) for expenses dated in ``[start, end)``."""
+        if grain not in GRAINS:
+            raise ValueError(f"Unknown rollup grain: {grain}")
+        with self._lock:
+            if grain == "item":
+                where, args = self._day_range(start, end)
+                rows = self._conn.execute(
+                    f"SELECT key, SUM(total) FROM rollups WHERE grain = 'item'{where} GROUP BY key ORDER BY key",
+                    args,
+                ).fetchall()
+                return dict(rows)
+            if grain == "day" or not self._aligned(grain, start, end):
+                where, args = self._day_range(start, end)
+                rows = self._conn.execute(
+                    f"SELECT bucket, total FROM rollups WHERE grain = 'day'{where} ORDER BY bucket", args
+                ).fetchall()
+                if grain == "day":
+                    return dict(rows)
+                # A window that cuts through a week/month is regrouped from its days.
+                regrouped: Dict[str, float] = defaultdict(float)
+                for bucket, total in rows:
+                    regrouped[bucket_of(grain, date.fromisoformat(bucket))] += total
+                return dict(sorted(regrouped.items()))
+            sql, args = "SELECT bucket, total FROM rollups WHERE grain = ?", [grain]
+            if start:
+                sql += " AND bucket >= ?"
+                args.append(bucket_of(grain, date.fromisoformat(start[:10])))
+            if end:
+                sql += " AND bucket < ?"
+                args.append(bucket_of(grain, date.fromisoformat(end[:10])))
+            return dict(self._conn.execute(sql + " ORDER BY bucket", args).fetchall())
+
+    def count(self, start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Number of dated expenses in ``[start, end)``."""
+        where, args = self._day_range(start, end)
+        with self._lock:
+            row = self._conn.execute(f"SELECT SUM(count) FROM rollups WHERE grain = 'day'{where}", args).fetchone()
+        return int(row[0] or 0)
+
+    def as_expense_rows(self, grain: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """One synthetic expense per rollup bucket, in the shape the chart builders group by."""
+        totals = self.totals(grain, start, end)
+        if grain == "item":
+            return [{"Item": item, "Amount": total} for item, total in totals.items()]
+        return [{"Date": _bucket_first_day(grain, bucket), "Amount": total} for bucket, total in totals.items()]
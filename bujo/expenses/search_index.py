@@ -0,0 +1,213 @@
+"""Inverted index over the expense text columns, kept in SQLite.
+
+Item, Category, Type, Note and Description are split into lowercase word
+tokens, folded to their singular with a light plural stemmer, and stored as
+``(token, expense Id)`` postings. A search term matches an expense when each
+of its words is a prefix of one of the expense's tokens, so ``swig`` finds
+"Swiggy" and ``grocery`` finds "Groceries". Each word costs one range scan of
+the postings, and the id sets are intersected instead of scanning expenses.
+
+The Expenses model writes its own creates, updates and deletes through, so
+the bot's changes are searchable at once. Writes that arrive while a rebuild
+is reading the table are journaled and replayed over the rebuilt index (see
+``DerivedExpenseStore``). Edits made directly in NocoDB are indexed when the
+replica's delta sync pulls them or, without a replica, by the next rebuild,
+at most ``EXPENSE_SEARCH_MAX_AGE_HOURS`` after the previous one.
+"""
+
+import json
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from bujo.expenses.derived_store import DerivedExpenseStore
+from bujo.models.replica import _row_id
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PATH = Path(tempfile.gettempdir()) / "expense_search.sqlite3"
+_DEFAULT_MAX_AGE_SECONDS = float(os.environ.get("EXPENSE_SEARCH_MAX_AGE_HOURS", "24")) * 3600
+
+# Text columns the expense include/exclude filters search.
+SEARCH_FIELDS = ("Item", "Category", "Type", "Note", "Description")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id   INTEGER PRIMARY KEY,
+    date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_by_date ON docs (date);
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT NOT NULL,
+    id    INTEGER NOT NULL,
+    PRIMARY KEY (token, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_by_id ON postings (id);
+CREATE TABLE IF NOT EXISTS index_state (
+    name  TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_PREFIX_END = "\U0010ffff"
+_ID_CHUNK = 500
+
+
+def stem(token: str) -> str:
+    """Fold a plural to its singular (Harman's S-stemmer): groceries -> grocery, orders -> order."""
+    if len(token) <= 3:
+        return token
+    if token.endswith("ies") and not token.endswith(("eies", "aies")):
+        return token[:-3] + "y"
+    if token.endswith("es") and not token.endswith(("aes", "ees", "oes")):
+        return token[:-1]
+    if token.endswith("s") and not token.endswith(("us", "ss")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(token) for token in _TOKEN_RE.findall(text.lower())]
+
+
+def _document_tokens(expense: Dict[str, Any]) -> Set[str]:
+    return set(tokenize(" ".join(str(expense.get(field) or "") for field in SEARCH_FIELDS)))
+
+
+def _date_column(expense: Dict[str, Any]) -> Optional[str]:
+    value = expense.get("Date")
+    return str(value)[:10] if value else None
+
+
+class ExpenseSearchIndex(DerivedExpenseStore):
+    """Thread-safe SQLite inverted index of expense text, with prefix and plural-insensitive matching."""
+
+    _SCHEMA = _SCHEMA
+    _STATE_TABLE = "index_state"
+
+    def __init__(self, path: Path = _DEFAULT_PATH, max_age_seconds: float = _DEFAULT_MAX_AGE_SECONDS):
+        super().__init__(path, max_age_seconds)
+
+    # ── Maintenance ─────────────────────────────────────────────────────────
+
+    def _rebuild(self, expenses: Iterable[Dict[str, Any]]) -> int:
+        docs, postings = [], []
+        for expense in expenses:
+            row_id = _row_id(expense)
+            if row_id is None:
+                continue
+            docs.append((row_id, _date_column(expense), json.dumps(expense, default=str)))
+            postings.extend((token, row_id) for token in _document_tokens(expense))
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM docs")
+            self._conn.execute("DELETE FROM postings")
+            self._conn.executemany("INSERT OR REPLACE INTO docs (id, date, data) VALUES (?, ?, ?)", docs)
+            self._conn.executemany("INSERT OR IGNORE INTO postings (token, id) VALUES (?, ?)", postings)
+            self._finish_rebuild()
+        logger.info("Rebuilt expense search index from %d expenses", len(docs))
+        return len(docs)
+
+    def _upsert_rows(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            row_id = _row_id(row)
+            if row_id is None:
+                continue
+            stored = self._conn.execute("SELECT data FROM docs WHERE id = ?", (row_id,)).fetchone()
+            merged = {**(json.loads(stored[0]) if stored else {}), **row, "Id": row_id}
+            self._conn.execute(
+                "INSERT OR REPLACE INTO docs (id, date, data) VALUES (?, ?, ?)",
+                (row_id, _date_column(merged), json.dumps(merged, default=str)),
+            )
+            self._conn.execute("DELETE FROM postings WHERE id = ?", (row_id,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO postings (token, id) VALUES (?, ?)",
+                [(token, row_id) for token in _document_tokens(merged)],
+            )
+
+    def _remove_ids(self, record_ids: List[Any]) -> None:
+        ids = [(row_id,) for row_id in (_row_id({"Id": record_id}) for record_id in record_ids) if row_id is not None]
+        self._conn.executemany("DELETE FROM docs WHERE id = ?", ids)
+        self._conn.executemany("DELETE FROM postings WHERE id = ?", ids)
+
+    # ── Reads ───────────────────────────────────────────────────────────────
+
+    def _prefix_ids(self, prefix: str) -> Set[int]:
+        rows = self._conn.execute(
+            "SELECT id FROM postings WHERE token >= ? AND token < ?", (prefix, prefix + _PREFIX_END)
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def match(self, term: str) -> Set[int]:
+        """Ids of expenses matching every word of ``term``."""
+        words = sorted(set(tokenize(term)), key=len, reverse=True)  # longest (rarest) first
+        if not words:
+            return set()
+        with self._lock:
+            ids = self._prefix_ids(words[0])
+            for word in words[1:]:
+                if not ids:
+                    break
+                ids &= self._prefix_ids(word)
+        return ids
+
+    def match_any(self, terms: Iterable[str]) -> Set[int]:
+        """Ids of expenses matching at least one of ``terms``."""
+        ids: Set[int] = set()
+        for term in terms:
+            ids |= self.match(term)
+        return ids
+
+    def _date_range(self, start: Optional[str], end: Optional[str]):
+        sql, args = "", []
+        if start:
+            sql += " AND date >= ?"
+            args.append(start[:10])
+        if end:
+            sql += " AND date < ?"
+            args.append(end[:10])
+        return sql, args
+
+    def count(self, start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Number of indexed expenses dated in ``[start, end)``."""
+        where, args = self._date_range(start, end)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM docs WHERE 1 = 1{where}", args).fetchone()[0]
+
+    def rows(
+        self, ids: Optional[Iterable[int]] = None, start: Optional[str] = None, end: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Stored expenses dated in ``[start, end)``, limited to ``ids`` when given, ordered by date."""
+        where, args = self._date_range(start, end)
+        with self._lock:
+            if ids is None:
+                found = self._conn.execute(
+                    f"SELECT date, id, data FROM docs WHERE 1 = 1{where}", args
+                ).fetchall()
+            else:
+                ids, found = list(ids), []
+                for i in range(0, len(ids), _ID_CHUNK):
+                    chunk = ids[i:i + _ID_CHUNK]
+                    found.extend(self._conn.execute(
+                        f"SELECT date, id, data FROM docs WHERE id IN ({','.join('?' * len(chunk))}){where}",
+                        [*chunk, *args],
+                    ).fetchall())
+        found.sort(key=lambda row: (row[0] or "", row[1]))
+        return [json.loads(data) for _, _, data in found]
+
+    def search(
+        self,
+        include_terms: Iterable[str] = (),
+        exclude_terms: Iterable[str] = (),
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Expenses in ``[start, end)`` matching any include term (all, if none) and no exclude term."""
+        include_terms = list(include_terms)
+        ids = self.match_any(include_terms) if include_terms else None
+        excluded = self.match_any(exclude_terms)
+        return [row for row in self.rows(ids, start, end) if _row_id(row) not in excluded]
@@ -4,6 +4,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
 from bujo.base import check_authorization, price_alerts_model
+from bujo.portoflio.alert_index import price_alert_index
 
 logger = logging.getLogger(__name__)
 
@@ -32,8 +33,9 @@ async def set_alert(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except ValueError:
         await update.message.reply_text("Price must be a number.")
         return
-    result = price_alerts_model.create(ticker, direction, target_price, action)
+    result = await price_alerts_model.acreate(ticker, direction, target_price, action)
     if result:
+        price_alert_index.invalidate()
         action_line = f"\n📝 _{action}_" if action else ""
         await update.message.reply_text(
             f"✅ Alert set: *{ticker}* {direction} ₹{target_price:,.2f}{action_line}",
@@ -45,7 +47,7 @@ async def set_alert(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 @check_authorization
 async def list_alerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    alerts = price_alerts_model.list_active()
+    alerts = await price_alerts_model.alist_active()
     if not alerts:
         await update.message.reply_text("No active price alerts.")
         return
@@ -96,7 +98,8 @@ async def price_alert_callback(update: Update, context: ContextTypes.DEFAULT_TYP
 
     elif data.startswith("pal_cancel_"):
         alert_id = int(data.split("_")[-1])
-        ok = price_alerts_model.delete(alert_id)
+        ok = await price_alerts_model.adelete(alert_id)
+        price_alert_index.invalidate()
         _alert_modify_pending.pop(query.from_user.id, None)
         await _try_delete()
         if ok:
@@ -5,19 +5,26 @@ import os
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 
-from bujo.agent import agent_engage
+from bujo import base
 from bujo.base import (
     OPENAI_MODEL,
     TEXT_TO_SPEECH_MODEL,
     check_authorization,
-    openai_model,
     price_alerts_model,
 )
 from bujo.handlers.alerts import _alert_modify_pending
+from bujo.portoflio.alert_index import price_alert_index
 
 logger = logging.getLogger(__name__)
 
 
+async def _agent_engage(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
+    # bujo.agent pulls in LangChain/LangGraph, so it is loaded on the first message.
+    from bujo.agent import agent_engage
+
+    await agent_engage(update, context, text)
+
+
 @check_authorization
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info("/start from user %s", update.effective_user.id)
@@ -37,14 +44,15 @@ async def chat(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("❌ Invalid price. Send just a number, e.g. `1250.50`.")
             _alert_modify_pending[user_id] = alert_id
             return ConversationHandler.END
-        ok = price_alerts_model.update(alert_id, TargetPrice=new_price)
+        ok = await price_alerts_model.aupdate(alert_id, TargetPrice=new_price)
         if ok:
+            price_alert_index.invalidate()
             await update.message.reply_text(f"✅ Alert updated — new target ₹{new_price:,.2f}")
         else:
             await update.message.reply_text("❌ Failed to update alert.")
         return ConversationHandler.END
 
-    await agent_engage(update, context, text)
+    await _agent_engage(update, context, text)
 
 
 @check_authorization
@@ -55,10 +63,10 @@ async def voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await new_file.download_to_drive(file_path)
     try:
         with open(file_path, "rb") as audio_file:
-            transcript = openai_model.audio.transcriptions.create(
+            transcript = base.openai_model.audio.transcriptions.create(
                 model=TEXT_TO_SPEECH_MODEL, file=audio_file
             )
-        await agent_engage(update, context, transcript.text.strip())
+        await _agent_engage(update, context, transcript.text.strip())
     finally:
         if os.path.exists(file_path):
             os.remove(file_path)
@@ -88,7 +96,7 @@ async def image(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if caption
             else "No caption was provided. Use values from the image only."
         )
-        response = openai_model.responses.create(
+        response = base.openai_model.responses.create(
             model=OPENAI_MODEL,
             input=[{
                 "role": "user",
@@ -114,7 +122,7 @@ async def image(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 ],
             }],
         )
-        await agent_engage(update, context, response.output_text)
+        await _agent_engage(update, context, response.output_text)
     finally:
         if os.path.exists(file_name):
             os.remove(file_name)
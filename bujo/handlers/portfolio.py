@@ -8,15 +8,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 
 from bujo.base import check_authorization, portfolio_transactions_model, CHAT_ID
-from bujo.managers import portfolio_manager
-from bujo.portoflio.alerts import run_portfolio_alerts
-from bujo.portoflio.rebalance import (
-    prepare_rebalance_analysis,
-    execute_rebalance_analysis,
-    run_rebalance_analysis,
-    prepare_fresh_portfolio_analysis,
-    execute_fresh_portfolio_analysis,
-)
+from bujo import managers
 from bujo.handlers.utils import send_long
 
 logger = logging.getLogger(__name__)
@@ -34,7 +26,7 @@ _fresh_portfolio_pending: dict[int, dict] = {}
 @check_authorization
 async def get_cmp_today(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
-        msg = portfolio_manager.update_cmp()
+        msg = await asyncio.to_thread(managers.portfolio_manager.update_cmp)
         await context.bot.send_message(chat_id=CHAT_ID, text=msg, parse_mode="markdown")
     except Exception as e:
         logger.error("Error in get_cmp_today: %s", e)
@@ -45,6 +37,8 @@ async def portfolio_alerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info("portfolioAlerts from user %s", update.effective_user.id)
     await update.message.reply_chat_action(telegram.constants.ChatAction.TYPING)
     try:
+        from bujo.portoflio.alerts import run_portfolio_alerts
+
         msg = await asyncio.to_thread(run_portfolio_alerts, portfolio_transactions_model)
         if msg:
             await send_long(update.message.reply_text, msg, parse_mode="Markdown")
@@ -59,9 +53,12 @@ async def portfolio_alerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def rebalance_recommendations(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info("rebalanceRecommendations from user %s", update.effective_user.id)
     await update.message.reply_chat_action(telegram.constants.ChatAction.TYPING)
+    force_refresh = any(arg.lower() == "refresh" for arg in (context.args or []))
     try:
+        from bujo.portoflio.rebalance import prepare_rebalance_analysis
+
         prepared = await asyncio.to_thread(
-            prepare_rebalance_analysis, portfolio_transactions_model
+            prepare_rebalance_analysis, portfolio_transactions_model, force_refresh
         )
         if prepared.get("error"):
             await update.message.reply_text(prepared["error"])
@@ -111,6 +108,8 @@ async def rebalance_approval_callback(update: Update, context: ContextTypes.DEFA
 
     await query.edit_message_text("⏳ Forwarding prompt to the model and generating the rebalance report…")
     try:
+        from bujo.portoflio.rebalance import execute_rebalance_analysis
+
         report_path, usage_msg = await asyncio.to_thread(execute_rebalance_analysis, prepared)
         input_path = prepared.get("input_path")
         if report_path and os.path.exists(report_path):
@@ -308,8 +307,10 @@ async def portfolio_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE
     logger.info("portfolioDashboard from user %s", update.effective_user.id)
     await update.message.reply_chat_action(telegram.constants.ChatAction.TYPING)
     try:
-        await asyncio.to_thread(portfolio_manager.update_cmp)
-        dashboard = await asyncio.to_thread(portfolio_manager.get_dashboard_data)
+        await asyncio.to_thread(managers.portfolio_manager.update_cmp)
+        dashboard = await asyncio.to_thread(
+            managers.portfolio_manager.get_dashboard_data, update.effective_user.id, refresh=True
+        )
         text = _render_overview(dashboard)
         await update.message.reply_text(text, parse_mode="Markdown", reply_markup=_dashboard_keyboard(dashboard))
     except Exception as e:
@@ -321,7 +322,7 @@ async def portfolio_dashboard_callback(update: Update, context: ContextTypes.DEF
     query = update.callback_query
     await query.answer()
     try:
-        dashboard = await asyncio.to_thread(portfolio_manager.get_dashboard_data)
+        dashboard = await asyncio.to_thread(managers.portfolio_manager.get_dashboard_data, query.from_user.id)
         action = query.data.removeprefix(_PORTFOLIO_DASHBOARD_PREFIX)
         portfolio_name = None
 
@@ -520,6 +521,8 @@ async def bp_confirmed(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "This may take 1–2 minutes.",
     )
     try:
+        from bujo.portoflio.rebalance import prepare_fresh_portfolio_analysis
+
         prepared = await asyncio.to_thread(
             prepare_fresh_portfolio_analysis, amount, preferences
         )
@@ -572,6 +575,8 @@ async def fresh_portfolio_approval_callback(update: Update, context: ContextType
 
     await query.edit_message_text("⏳ Forwarding prompt to the model and generating the fresh portfolio report…")
     try:
+        from bujo.portoflio.rebalance import execute_fresh_portfolio_analysis
+
         report_path, usage_msg = await asyncio.to_thread(execute_fresh_portfolio_analysis, prepared)
         input_path = prepared.get("input_path")
         if report_path and os.path.exists(report_path):
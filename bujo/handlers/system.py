@@ -10,15 +10,14 @@ import telegram
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from bujo.base import check_authorization, WAKE_RELAY_URL, RELAY_BASE_URL, CHAT_ID
-from bujo.managers import mag_manager
+from bujo.base import check_authorization, mag_model, WAKE_RELAY_URL, RELAY_BASE_URL, CHAT_ID
 
 logger = logging.getLogger(__name__)
 
 
 async def send_mag_message(bot: telegram.Bot):
     try:
-        mag_info_list = mag_manager.mag_model.list(
+        mag_info_list = await mag_model.alist(
             json.dumps({"filters": [f"(Date,eq,exactDate,{datetime.now().strftime('%Y-%m-%d')})"]}))
         if not mag_info_list:
             return
@@ -52,11 +52,13 @@ class MagManager:
             Tool(
                 name="Update_MAG",
                 func=self.mag_model.update,
+                coroutine=self.mag_model.aupdate,
                 description="Use this tool to update MAG.",
             ),
             Tool(
                 name="List_MAG",
                 func=self.mag_model.list,
+                coroutine=self.mag_model.alist,
                 description="Use this tool to list MAG entries.",
             ),
         ]
@@ -95,3 +97,27 @@ class MagManager:
             except Exception as e:
                 logger.error("Error in agent_mag: %s", e, exc_info=True)
                 return "An error occurred while processing your request."
+
+    async def aagent_mag(self, prompt: str) -> str:
+        """Coroutine twin of ``agent_mag`` for callers on the event loop."""
+        text = prompt.strip()
+        logger.info("Received prompt: %s", text)
+        for attempt in range(2):
+            try:
+                result = await self.agent.ainvoke(
+                    {"messages": [HumanMessage(content=text)]},
+                    config={"configurable": {"thread_id": "mag"}},
+                )
+                output = result["messages"][-1].content
+                logger.info("Agent response: %s", output)
+                return output
+            except ValueError as e:
+                if "INVALID_CHAT_HISTORY" in str(e) and attempt == 0:
+                    logger.warning("Corrupt MAG chat history — resetting memory and retrying.")
+                    self._build_agent()
+                    continue
+                logger.error("Error in aagent_mag: %s", e, exc_info=True)
+                return "An error occurred while processing your request."
+            except Exception as e:
+                logger.error("Error in aagent_mag: %s", e, exc_info=True)
+                return "An error occurred while processing your request."
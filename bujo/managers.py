@@ -1,8 +1,44 @@
-from bujo.base import expenses_model, mag_model, portfolio_transactions_model
-from bujo.expenses.manage import ExpenseManager
-from bujo.mag.manage import MagManager
-from bujo.portoflio.manage import PortfolioManager
-
-expense_manager   = ExpenseManager(expenses_model, mag_model)
-mag_manager       = MagManager(mag_model)
-portfolio_manager = PortfolioManager(portfolio_transactions_model)
+"""Shared manager instances, constructed on first access.
+
+Each manager compiles its own LangGraph agent, so building them at import
+time would put LangChain on the start-up path of every handler module.
+"""
+
+import threading
+
+from bujo.base import expense_rollups, expenses_model, mag_model, portfolio_transactions_model
+
+__all__ = ["expense_manager", "mag_manager", "portfolio_manager"]
+
+_lock = threading.RLock()
+
+
+def _expense_manager():
+    from bujo.expenses.manage import ExpenseManager
+    return ExpenseManager(expenses_model, mag_model, expense_rollups)
+
+
+def _mag_manager():
+    from bujo.mag.manage import MagManager
+    return MagManager(mag_model)
+
+
+def _portfolio_manager():
+    from bujo.portoflio.manage import PortfolioManager
+    return PortfolioManager(portfolio_transactions_model)
+
+
+_FACTORIES = {
+    "expense_manager": _expense_manager,
+    "mag_manager": _mag_manager,
+    "portfolio_manager": _portfolio_manager,
+}
+
+
+def __getattr__(name):
+    if name not in _FACTORIES:
+        raise AttributeError(name)
+    with _lock:
+        if name not in globals():
+            globals()[name] = _FACTORIES[name]()
+    return globals()[name]
@@ -1,10 +1,83 @@
+import asyncio
 import json
 import logging
+import os
+import threading
+import time
+import weakref
+import httpx
 import requests
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, Iterator, List, Optional
+from urllib3.util.retry import Retry
+
+from bujo.models.replica import LocalReplica
 
 logger = logging.getLogger(__name__)
 
+# Connection pool shared by every NocoDB model. One keep-alive pool per process
+# means the hundreds of PATCHes in a CMP refresh reuse a handful of sockets.
+_POOL_SIZE = int(os.environ.get("NOCODB_POOL_SIZE", "10"))
+_TIMEOUT = float(os.environ.get("NOCODB_TIMEOUT", "30"))
+_MAX_RETRIES = int(os.environ.get("NOCODB_MAX_RETRIES", "3"))
+_BACKOFF_FACTOR = float(os.environ.get("NOCODB_BACKOFF_FACTOR", "0.5"))
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+# POST is left out on purpose: a 5xx after the row was written would duplicate it.
+_RETRY_METHODS = frozenset({"GET", "PATCH", "DELETE", "HEAD", "OPTIONS"})
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+# httpx pools belong to the event loop that opened them, so one async client per loop.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=_MAX_RETRIES,
+        backoff_factor=_BACKOFF_FACTOR,
+        status_forcelist=_RETRY_STATUSES,
+        allowed_methods=_RETRY_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=_POOL_SIZE, pool_maxsize=_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide NocoDB session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the HTTP/2 NocoDB client for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        limits = httpx.Limits(max_connections=_POOL_SIZE, max_keepalive_connections=_POOL_SIZE)
+        # Transport-level retries only cover connection failures; status retries are in _arequest.
+        transport = httpx.AsyncHTTPTransport(http2=True, limits=limits, retries=_MAX_RETRIES)
+        client = httpx.AsyncClient(http2=True, limits=limits, timeout=_TIMEOUT, transport=transport)
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_client() -> None:
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
 
 def nocodb_where_from_tool_input(where: Any) -> Optional[str]:
     if not where:
@@ -29,8 +102,26 @@ def nocodb_where_from_tool_input(where: Any) -> Optional[str]:
     return str(filters)
 
 
+def _retry_after_seconds(value: str) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, in delta-seconds or HTTP-date form; None if absent or invalid."""
+    value = value.strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)  # "-0000": HTTP-dates are always GMT
+    return max(0.0, when.timestamp() - time.time())
+
+
 class BaseNocoDB:
-    def __init__(self, base_url: str, api_token: str, table_id: str):
+    def __init__(self, base_url: str, api_token: str, table_id: str, replica: Optional[LocalReplica] = None):
         self.base_url = base_url.rstrip("/")
         self.table_id = table_id
         self.headers = {
@@ -38,43 +129,333 @@ class BaseNocoDB:
             "Content-Type": "application/json",
             "Accept": "application/json",
         }
+        self.timeout = _TIMEOUT
+        self.replica = replica
+        self._columns: Optional[List[str]] = None
+
+    @property
+    def session(self) -> requests.Session:
+        return get_session()
 
     def _url(self, path: str = "") -> str:
         return f"{self.base_url}/api/v2/tables/{self.table_id}/records{path}"
 
     def create(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        response = requests.post(self._url(), json=data, headers=self.headers)
+        response = self.session.post(self._url(), json=data, headers=self.headers, timeout=self.timeout)
         if response.ok:
-            return response.json()
+            created = response.json()
+            self._write_through_created(data, created)
+            return created
         logger.error("Create failed: %s %s", response.status_code, response.text)
         return None
 
     def read(self, record_id: str) -> Optional[Dict[str, Any]]:
-        response = requests.get(self._url(f"/{record_id}"), headers=self.headers)
+        if self.replica is not None and self._replica_ready():
+            row = self.replica.get(self.table_id, record_id)
+            if row is not None:
+                return row
+        response = self.session.get(self._url(f"/{record_id}"), headers=self.headers, timeout=self.timeout)
         if response.ok:
             return response.json()
         logger.error("Read failed: %s %s", response.status_code, response.text)
         return None
 
     def delete(self, record_id) -> bool:
-        response = requests.delete(self._url(), json=[{"Id": record_id}], headers=self.headers)
+        response = self.session.delete(
+            self._url(), json=[{"Id": record_id}], headers=self.headers, timeout=self.timeout
+        )
         if response.ok:
+            self._write_through_deleted([record_id])
             return True
         logger.error("Delete failed: %s %s", response.status_code, response.text)
         return False
 
+    def column_titles(self) -> Optional[List[str]]:
+        """Column titles from the table metadata, fetched once; None if NocoDB cannot be asked."""
+        if self._columns is None:
+            try:
+                response = self.session.get(
+                    f"{self.base_url}/api/v2/meta/tables/{self.table_id}", headers=self.headers, timeout=self.timeout
+                )
+            except requests.RequestException as e:
+                logger.warning("Table metadata request failed: %s", e)
+                return None
+            if not response.ok:
+                logger.warning("Table metadata request failed: %s %s", response.status_code, response.text)
+                return None
+            self._columns = [c["title"] for c in response.json().get("columns", []) if c.get("title")]
+        return self._columns
+
+    def _list_params(
+        self, where: Optional[str] = None, sort: Optional[str] = None, fields: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        where_clause = nocodb_where_from_tool_input(where)
+        params: Dict[str, Any] = {}
+        if where_clause:
+            params["where"] = where_clause
+        if sort:
+            params["sort"] = sort
+        if fields:
+            params["fields"] = ",".join(fields)
+        return params
+
+    def _fetch_page(self, params: Dict[str, Any], limit: int, offset: int) -> Optional[Dict[str, Any]]:
+        page_params = {**params, "limit": limit, "offset": offset}
+        response = self.session.get(
+            self._url(), headers=self.headers, params=page_params, timeout=self.timeout
+        )
+        if not response.ok:
+            logger.error("List failed: %s %s", response.status_code, response.text)
+            return None
+        return response.json()
+
+    def _iter_paginated(
+        self, params: Dict[str, Any], limit: int = 1000, prefetch: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield rows page by page.
+
+        With ``prefetch`` the next page is requested on a background thread
+        while the caller consumes the current one.
+        """
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            offset = 0
+            data = self._fetch_page(params, limit, offset)
+            while data is not None:
+                is_last = data.get("PageInfo", {}).get("isLastPage", True)
+                pending = None
+                if not is_last:
+                    offset += limit
+                    if executor:
+                        pending = executor.submit(self._fetch_page, params, limit, offset)
+                yield from data.get("list", [])
+                if is_last:
+                    break
+                data = pending.result() if pending else self._fetch_page(params, limit, offset)
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
     def _paginated_list(self, params: Dict[str, Any], limit: int = 1000) -> List[Dict[str, Any]]:
-        all_results: List[Dict[str, Any]] = []
-        offset = 0
+        return list(self._iter_paginated(params, limit))
+
+    def iter_list(
+        self,
+        where: Optional[str] = None,
+        sort: Optional[str] = None,
+        limit: int = 1000,
+        prefetch: bool = True,
+        fields: Optional[List[str]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Streaming counterpart of ``list()``: rows are yielded as each page arrives.
+
+        ``fields`` limits the columns NocoDB sends back; replica rows are local
+        and come back whole.
+        """
+        local = self._replica_rows(where, sort)
+        if local is not None:
+            return iter(local)
+        return self._iter_paginated(self._list_params(where, sort, fields), limit, prefetch)
+
+    def _list(self, where: Optional[str] = None, sort: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Shared body of the models' ``list()``: replica first, paginated REST otherwise."""
+        local = self._replica_rows(where, sort)
+        if local is not None:
+            return local
+        return self._paginated_list(self._list_params(where, sort), limit)
+
+    # ── Async API ───────────────────────────────────────────────────────────
+    #
+    # Coroutine twins of the methods above for callers on the event loop. They
+    # share the replica and write-through logic; only the transport differs.
+
+    async def _arequest(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send one request, retrying the same statuses and methods as the sync session."""
+        client = get_async_client()
+        attempt = 0
         while True:
-            page_params = {**params, "limit": limit, "offset": offset}
-            response = requests.get(self._url(), headers=self.headers, params=page_params)
-            if not response.ok:
-                logger.error("List failed: %s %s", response.status_code, response.text)
-                break
-            data = response.json()
-            all_results.extend(data.get("list", []))
-            if data.get("PageInfo", {}).get("isLastPage", True):
+            response = await client.request(method, url, headers=self.headers, timeout=self.timeout, **kwargs)
+            if (
+                response.status_code not in _RETRY_STATUSES
+                or method not in _RETRY_METHODS
+                or attempt >= _MAX_RETRIES
+            ):
+                return response
+            delay = _retry_after_seconds(response.headers.get("Retry-After", ""))
+            if delay is None:
+                delay = _BACKOFF_FACTOR * (2 ** attempt)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def acreate(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        response = await self._arequest("POST", self._url(), json=data)
+        if response.is_success:
+            created = response.json()
+            self._write_through_created(data, created)
+            return created
+        logger.error("Create failed: %s %s", response.status_code, response.text)
+        return None
+
+    async def aread(self, record_id: str) -> Optional[Dict[str, Any]]:
+        if self.replica is not None and await self._areplica_ready():
+            row = self.replica.get(self.table_id, record_id)
+            if row is not None:
+                return row
+        response = await self._arequest("GET", self._url(f"/{record_id}"))
+        if response.is_success:
+            return response.json()
+        logger.error("Read failed: %s %s", response.status_code, response.text)
+        return None
+
+    async def adelete(self, record_id) -> bool:
+        response = await self._arequest("DELETE", self._url(), json=[{"Id": record_id}])
+        if response.is_success:
+            self._write_through_deleted([record_id])
+            return True
+        logger.error("Delete failed: %s %s", response.status_code, response.text)
+        return False
+
+    async def _afetch_page(self, params: Dict[str, Any], limit: int, offset: int) -> Optional[Dict[str, Any]]:
+        response = await self._arequest("GET", self._url(), params={**params, "limit": limit, "offset": offset})
+        if not response.is_success:
+            logger.error("List failed: %s %s", response.status_code, response.text)
+            return None
+        return response.json()
+
+    async def _apaginated_list(self, params: Dict[str, Any], limit: int = 1000) -> List[Dict[str, Any]]:
+        """All pages of a list query. Once the first page reports ``totalRows`` the rest are fetched concurrently."""
+        data = await self._afetch_page(params, limit, 0)
+        if data is None:
+            return []
+        rows: List[Dict[str, Any]] = list(data.get("list", []))
+        page_info = data.get("PageInfo", {})
+        if page_info.get("isLastPage", True):
+            return rows
+        total = page_info.get("totalRows")
+        if total is None:
+            offset = limit
+            while data is not None:
+                data = await self._afetch_page(params, limit, offset)
+                if data is None:
+                    logger.warning("List of %s truncated at offset %d: page fetch failed", self.table_id, offset)
+                    break
+                rows.extend(data.get("list", []))
+                if data.get("PageInfo", {}).get("isLastPage", True):
+                    break
+                offset += limit
+            return rows
+        offsets = range(limit, int(total), limit)
+        pages = await asyncio.gather(*(self._afetch_page(params, limit, offset) for offset in offsets))
+        missing = [offset for offset, page in zip(offsets, pages) if page is None]
+        if missing:
+            # Same contract as the sync iterator: stop at the first failed page.
+            logger.warning(
+                "List of %s truncated at offset %d of %s rows: pages at offsets %s failed",
+                self.table_id, missing[0], total, missing,
+            )
+        for page in pages:
+            if page is None:
                 break
+            rows.extend(page.get("list", []))
+        return rows
+
+    async def _alist(self, where: Optional[str] = None, sort: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        local = await self._areplica_rows(where, sort)
+        if local is not None:
+            return local
+        return await self._apaginated_list(self._list_params(where, sort), limit)
+
+    async def _areplica_rows(self, where: Optional[str] = None, sort: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        if self.replica is None or not await self._areplica_ready():
+            return None
+        return self.replica.query(self.table_id, nocodb_where_from_tool_input(where), sort)
+
+    async def _areplica_ready(self) -> bool:
+        if self.replica.is_fresh(self.table_id):
+            return True
+        # Syncing pulls over the blocking session; keep it off the event loop.
+        return await asyncio.to_thread(self._replica_ready)
+
+    # ── Local replica ───────────────────────────────────────────────────────
+
+    def _write_through(self, rows: List[Dict[str, Any]]) -> None:
+        if self.replica is not None:
+            self.replica.merge(self.table_id, rows)
+
+    def _write_through_created(self, data: Dict[str, Any], created: Any) -> None:
+        # POST answers with just {"Id": ...}; the rest of the row is what we sent.
+        if isinstance(created, dict):
+            self._write_through([{**data, **created}])
+
+    def _write_through_deleted(self, record_ids: List[Any]) -> None:
+        if self.replica is not None:
+            self.replica.delete(self.table_id, record_ids)
+
+    def _replica_synced(self, rows: List[Dict[str, Any]], deleted_ids: List[int], replaced: bool) -> None:
+        """Called after a sync pulled ``rows`` and dropped ``deleted_ids``; ``replaced`` means a full pull."""
+
+    def _replica_rows(self, where: Optional[str] = None, sort: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        if self.replica is None or not self._replica_ready():
+            return None
+        return self.replica.query(self.table_id, nocodb_where_from_tool_input(where), sort)
+
+    def _replica_ready(self) -> bool:
+        """Sync the replica if it is stale. A stale copy is still served when NocoDB is unreachable."""
+        if self.replica.is_fresh(self.table_id):
+            return True
+        return self.sync_replica() or self.replica.synced_at(self.table_id) is not None
+
+    def _pull(self, params: Dict[str, Any], limit: int = 1000) -> Optional[List[Dict[str, Any]]]:
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            data = self._fetch_page(params, limit, offset)
+            if data is None:
+                return None
+            rows.extend(data.get("list", []))
+            page_info = data.get("PageInfo", {})
+            if page_info.get("isLastPage", True):
+                return rows
             offset += limit
-        return all_results
+
+    def _remote_ids(self) -> Optional[List[int]]:
+        rows = self._pull({"fields": "Id"})
+        if rows is None:
+            return None
+        return [int(row["Id"]) for row in rows if str(row.get("Id", "")).isdigit()]
+
+    def sync_replica(self, full: bool = False) -> bool:
+        """Bring the local replica up to date. Returns False if NocoDB could not be read.
+
+        A delta pull fetches rows whose ``UpdatedAt`` falls on or after the
+        day of the latest timestamp already stored. Deletes made outside the
+        bot are caught by pulling the table's Id column and pruning local rows
+        that are gone, so they too are bounded by ``max_age``. What each sync
+        changed is passed to ``_replica_synced``.
+        """
+        if self.replica is None:
+            return False
+        with self.replica.syncing(self.table_id):
+            if not full and self.replica.is_fresh(self.table_id):
+                return True
+            high_water = None if full else self.replica.high_water(self.table_id)
+            if high_water:
+                rows = self._pull({"where": f"(UpdatedAt,ge,exactDate,{str(high_water)[:10]})"})
+                if rows is None:
+                    return False
+                self.replica.upsert(self.table_id, rows)
+                remote_ids = self._remote_ids()
+                if remote_ids is None:
+                    return False
+                pruned = self.replica.prune(self.table_id, remote_ids)
+                if pruned:
+                    logger.info("Pruned %d rows deleted from %s outside the bot", len(pruned), self.table_id)
+                self._replica_synced(rows, pruned, replaced=False)
+            if not high_water:
+                rows = self._pull({})
+                if rows is None:
+                    return False
+                self.replica.replace_all(self.table_id, rows)
+                self._replica_synced(rows, [], replaced=True)
+            self.replica.mark_synced(self.table_id)
+            return True
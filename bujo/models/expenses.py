@@ -1,13 +1,36 @@
 import json
 import logging
-import requests
 from typing import Any, Dict, List, Optional
 
-from bujo.models.base import BaseNocoDB, nocodb_where_from_tool_input
+from bujo.expenses.rollups import ExpenseRollups
+from bujo.expenses.search_index import SEARCH_FIELDS, ExpenseSearchIndex
+from bujo.models.base import BaseNocoDB
 from bujo.models.mag import MAG
+from bujo.models.replica import LocalReplica
 
 logger = logging.getLogger(__name__)
 
+# Terms containing these cannot be written into a where clause without changing its meaning.
+_UNSAFE_TERM_CHARS = frozenset(",()~%_")
+
+
+def search_where(include_terms: List[str], exclude_terms: List[str], fields: List[str]) -> Optional[str]:
+    """NocoDB where clause for include/exclude terms over ``fields``.
+
+    An expense is kept if any include term is ``like`` any field and no exclude
+    term is. Returns None when there is nothing to push down or a term cannot
+    be expressed safely, in which case the caller filters in Python.
+    """
+    terms = [*include_terms, *exclude_terms]
+    if not fields or not terms or any(not t.strip() or _UNSAFE_TERM_CHARS & set(t) for t in terms):
+        return None
+    clauses = []
+    if include_terms:
+        clauses.append("(" + "~or".join(f"({f},like,%{t}%)" for t in include_terms for f in fields) + ")")
+    for term in exclude_terms:
+        clauses.extend(f"({f},nlike,%{term}%)" for f in fields)
+    return "~and".join(clauses)
+
 
 class Expenses(BaseNocoDB):
     def __init__(
@@ -17,8 +40,13 @@ class Expenses(BaseNocoDB):
         expenses_table_id: str,
         mag_table_link_id: str,
         mag_table_instance: MAG,
+        replica: Optional[LocalReplica] = None,
+        search_index: Optional[ExpenseSearchIndex] = None,
+        rollups: Optional[ExpenseRollups] = None,
     ):
-        super().__init__(base_url, api_token, expenses_table_id)
+        super().__init__(base_url, api_token, expenses_table_id, replica)
+        self.search_index = search_index
+        self.rollups = rollups
         self.mag_table_link_id = mag_table_link_id
         self.mag_table_link_url = (
             f"{self.base_url}/api/v2/tables/{self.table_id}/links/{mag_table_link_id}/records"
@@ -26,34 +54,89 @@ class Expenses(BaseNocoDB):
         self.mag_table_instance = mag_table_instance
 
     def create(self, data: Dict[str, Any]) -> Any:
-        response = requests.post(self._url(), json=data, headers=self.headers)
+        response = self.session.post(self._url(), json=data, headers=self.headers, timeout=self.timeout)
         if response.ok:
-            return response.json()
+            created = response.json()
+            self._write_through_created(data, created)
+            return created
         logger.error("Create failed: %s %s", response.status_code, response.text)
         return "failed to create expense entry. Try again?"
 
     def update(self, record_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        response = requests.patch(self._url(f"/{record_id}"), json=data, headers=self.headers)
+        response = self.session.patch(
+            self._url(f"/{record_id}"), json=data, headers=self.headers, timeout=self.timeout
+        )
         if response.ok:
+            self._write_through([{**data, "Id": record_id}])
             return response.json()
         logger.error("Update failed: %s %s", response.status_code, response.text)
         return None
 
+    def _derived_stores(self) -> list:
+        return [store for store in (self.search_index, self.rollups) if store is not None]
+
+    def _write_through(self, rows: List[Dict[str, Any]]) -> None:
+        super()._write_through(rows)
+        for store in self._derived_stores():
+            try:
+                store.upsert(rows)
+            except Exception as e:
+                logger.error("Failed to update %s: %s", type(store).__name__, e, exc_info=True)
+
+    def _write_through_deleted(self, record_ids: List[Any]) -> None:
+        super()._write_through_deleted(record_ids)
+        for store in self._derived_stores():
+            try:
+                store.remove(record_ids)
+            except Exception as e:
+                logger.error("Failed to update %s: %s", type(store).__name__, e, exc_info=True)
+
+    def _replica_synced(self, rows: List[Dict[str, Any]], deleted_ids: List[int], replaced: bool) -> None:
+        # Edits made directly in NocoDB reach the derived stores with the replica, not at their next rebuild.
+        for store in self._derived_stores():
+            try:
+                if replaced:
+                    store.rebuild(rows)
+                    continue
+                store.upsert(rows)
+                store.remove(deleted_ids)
+            except Exception as e:
+                logger.error("Failed to update %s: %s", type(store).__name__, e, exc_info=True)
+
     def list(self, where: Optional[str] = None, limit: int = 1000, sort: Optional[str] = None) -> List[Dict[str, Any]]:
-        where_clause = nocodb_where_from_tool_input(where)
-        params: Dict[str, Any] = {}
-        if where_clause:
-            params["where"] = where_clause
-        if sort:
-            params["sort"] = sort
-        return self._paginated_list(params, limit)
+        return self._list(where, sort, limit)
 
     def link_mag_to_expense(self, expense_id: str, mag_id: str) -> Optional[str]:
         payload = [{"Id": mag_id}]
-        response = requests.post(
-            f"{self.mag_table_link_url}/{expense_id}", headers=self.headers, json=payload
+        response = self.session.post(
+            f"{self.mag_table_link_url}/{expense_id}",
+            headers=self.headers,
+            json=payload,
+            timeout=self.timeout,
         )
         if response.ok:
             return response.text
         logger.error("Link MAG to expense failed: %s %s", response.status_code, response.text)
         return None
+
+    async def acreate(self, data: Dict[str, Any]) -> Any:
+        created = await super().acreate(data)
+        return created if created is not None else "failed to create expense entry. Try again?"
+
+    async def aupdate(self, record_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        response = await self._arequest("PATCH", self._url(f"/{record_id}"), json=data)
+        if response.is_success:
+            self._write_through([{**data, "Id": record_id}])
+            return response.json()
+        logger.error("Update failed: %s %s", response.status_code, response.text)
+        return None
+
+    async def alist(self, where: Optional[str] = None, limit: int = 1000, sort: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self._alist(where, sort, limit)
+
+    async def alink_mag_to_expense(self, expense_id: str, mag_id: str) -> Optional[str]:
+        response = await self._arequest("POST", f"{self.mag_table_link_url}/{expense_id}", json=[{"Id": mag_id}])
+        if response.is_success:
+            return response.text
+        logger.error("Link MAG to expense failed: %s %s", response.status_code, response.text)
+        return None
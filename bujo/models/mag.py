@@ -1,9 +1,9 @@
 import json
 import logging
-import requests
 from typing import Any, Dict, List, Optional
 
-from bujo.models.base import BaseNocoDB, nocodb_where_from_tool_input
+from bujo.models.base import BaseNocoDB
+from bujo.models.replica import LocalReplica
 
 logger = logging.getLogger(__name__)
 
@@ -11,38 +11,76 @@ logger = logging.getLogger(__name__)
 _UPDATABLE_FIELDS = {"Note", "Exercise"}
 
 
+def _parse_update(data: str) -> Dict[str, Any]:
+    return json.loads(data.replace("```json", "").replace("```", ""))
+
+
+def _update_payload(parsed: Dict[str, Any], mag_object: Dict[str, Any]) -> Dict[str, Any]:
+    mag_object.update({k: v for k, v in parsed["payload"].items() if k in _UPDATABLE_FIELDS})
+    payload = {"Id": mag_object["Id"]}
+    payload.update({k: mag_object[k] for k in _UPDATABLE_FIELDS if k in mag_object})
+    return payload
+
+
 class MAG(BaseNocoDB):
-    def __init__(self, base_url: str, api_token: str, mag_table_id: str):
-        super().__init__(base_url, api_token, mag_table_id)
+    def __init__(self, base_url: str, api_token: str, mag_table_id: str, replica: Optional[LocalReplica] = None):
+        super().__init__(base_url, api_token, mag_table_id, replica)
 
     def update(self, data: str) -> str:
-        parsed = json.loads(data.replace("```json", "").replace("```", ""))
+        parsed = _parse_update(data)
         mag_object = self.find_by_date(parsed["date_filter"])
         if not mag_object:
             return "Failed to find MAG object with the given date filter."
-        mag_object.update({k: v for k, v in parsed["payload"].items() if k in _UPDATABLE_FIELDS})
-        payload = {"Id": mag_object["Id"]}
-        payload.update({k: mag_object[k] for k in _UPDATABLE_FIELDS if k in mag_object})
-        response = requests.patch(self._url(), json=payload, headers=self.headers)
+        payload = _update_payload(parsed, mag_object)
+        response = self.session.patch(self._url(), json=payload, headers=self.headers, timeout=self.timeout)
         if response.ok:
+            self._write_through([payload])
             return response.text
         logger.error("Update failed: %s %s", response.status_code, response.text)
         return "Updating MAG failed. Try again?"
 
     def list(self, where: Optional[str] = None, sort: Optional[str] = None) -> List[Dict[str, Any]]:
-        where_clause = nocodb_where_from_tool_input(where)
-        params: Dict[str, Any] = {}
-        if where_clause:
-            params["where"] = where_clause
-        if sort:
-            params["sort"] = sort
-        return self._paginated_list(params)
+        return self._list(where, sort)
 
     def find_by_date(self, iso_date_str: str) -> Optional[Dict[str, Any]]:
-        params = {"where": f"(Date,eq,exactDate,{iso_date_str})"}
-        response = requests.get(self._url(), headers=self.headers, params=params)
+        where = f"(Date,eq,exactDate,{iso_date_str})"
+        local = self._replica_rows(where)
+        if local is not None:
+            return local[0] if local else None
+        params = {"where": where}
+        response = self.session.get(
+            self._url(), headers=self.headers, params=params, timeout=self.timeout
+        )
         if response.ok:
             items = response.json().get("list", [])
             return items[0] if items else None
         logger.error("Search by date failed: %s %s", response.status_code, response.text)
         return None
+
+    async def aupdate(self, data: str) -> str:
+        parsed = _parse_update(data)
+        mag_object = await self.afind_by_date(parsed["date_filter"])
+        if not mag_object:
+            return "Failed to find MAG object with the given date filter."
+        payload = _update_payload(parsed, mag_object)
+        response = await self._arequest("PATCH", self._url(), json=payload)
+        if response.is_success:
+            self._write_through([payload])
+            return response.text
+        logger.error("Update failed: %s %s", response.status_code, response.text)
+        return "Updating MAG failed. Try again?"
+
+    async def alist(self, where: Optional[str] = None, sort: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self._alist(where, sort)
+
+    async def afind_by_date(self, iso_date_str: str) -> Optional[Dict[str, Any]]:
+        where = f"(Date,eq,exactDate,{iso_date_str})"
+        local = await self._areplica_rows(where)
+        if local is not None:
+            return local[0] if local else None
+        response = await self._arequest("GET", self._url(), params={"where": where})
+        if response.is_success:
+            items = response.json().get("list", [])
+            return items[0] if items else None
+        logger.error("Search by date failed: %s %s", response.status_code, response.text)
+        return None
@@ -1,9 +1,10 @@
+import asyncio
 import json
 import logging
-import requests
 from typing import Any, Dict, List, Optional
 
-from bujo.models.base import BaseNocoDB, nocodb_where_from_tool_input
+from bujo.models.base import BaseNocoDB
+from bujo.models.replica import LocalReplica
 
 logger = logging.getLogger(__name__)
 
@@ -12,31 +13,83 @@ _ALLOWED_UPDATE_KEYS = {
     "CostPerShare", "CMP", "Portfolio", "Note",
 }
 
+# NocoDB accepts an array of records per PATCH; keep each request modest.
+_BULK_CHUNK_SIZE = 100
+
+
+def _bulk_payload(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {k: v for k, v in row.items() if k in _ALLOWED_UPDATE_KEYS}
+        for row in rows
+        if row.get("Id") is not None
+    ]
+
 
 class PortfolioTransactions(BaseNocoDB):
-    def __init__(self, base_url: str, api_token: str, table_id: str):
-        super().__init__(base_url, api_token, table_id)
+    def __init__(self, base_url: str, api_token: str, table_id: str, replica: Optional[LocalReplica] = None):
+        super().__init__(base_url, api_token, table_id, replica)
 
     def create(self, data: Dict[str, Any]) -> Any:
-        response = requests.post(self._url(), json=data, headers=self.headers)
+        response = self.session.post(self._url(), json=data, headers=self.headers, timeout=self.timeout)
         if response.ok:
-            return response.json()
+            created = response.json()
+            self._write_through_created(data, created)
+            return created
         logger.error("Create failed: %s %s", response.status_code, response.text)
         return "failed to create transaction entry. Try again?"
 
     def update(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         filtered = {k: v for k, v in data.items() if k in _ALLOWED_UPDATE_KEYS}
-        response = requests.patch(self._url(), json=filtered, headers=self.headers)
+        response = self.session.patch(self._url(), json=filtered, headers=self.headers, timeout=self.timeout)
         if response.ok:
+            self._write_through([filtered])
             return response.json()
         logger.error("Update failed: %s %s", response.status_code, response.text)
         return None
 
+    def bulk_update(self, rows: List[Dict[str, Any]], chunk_size: int = _BULK_CHUNK_SIZE) -> int:
+        """PATCH many rows using NocoDB's array form. Returns the number of rows written."""
+        payload = _bulk_payload(rows)
+        updated = 0
+        for start in range(0, len(payload), chunk_size):
+            chunk = payload[start:start + chunk_size]
+            response = self.session.patch(self._url(), json=chunk, headers=self.headers, timeout=self.timeout)
+            if response.ok:
+                self._write_through(chunk)
+                updated += len(chunk)
+            else:
+                logger.error("Bulk update failed: %s %s", response.status_code, response.text)
+        return updated
+
     def list(self, where: Optional[str] = None, limit: int = 1000, sort: Optional[str] = None) -> List[Dict[str, Any]]:
-        where_clause = nocodb_where_from_tool_input(where)
-        params: Dict[str, Any] = {}
-        if where_clause:
-            params["where"] = where_clause
-        if sort:
-            params["sort"] = sort
-        return self._paginated_list(params, limit)
+        return self._list(where, sort, limit)
+
+    async def acreate(self, data: Dict[str, Any]) -> Any:
+        created = await super().acreate(data)
+        return created if created is not None else "failed to create transaction entry. Try again?"
+
+    async def aupdate(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        filtered = {k: v for k, v in data.items() if k in _ALLOWED_UPDATE_KEYS}
+        response = await self._arequest("PATCH", self._url(), json=filtered)
+        if response.is_success:
+            self._write_through([filtered])
+            return response.json()
+        logger.error("Update failed: %s %s", response.status_code, response.text)
+        return None
+
+    async def abulk_update(self, rows: List[Dict[str, Any]], chunk_size: int = _BULK_CHUNK_SIZE) -> int:
+        """Async ``bulk_update``; chunks are sent concurrently over the shared client."""
+        payload = _bulk_payload(rows)
+        chunks = [payload[start:start + chunk_size] for start in range(0, len(payload), chunk_size)]
+        responses = await asyncio.gather(*(self._arequest("PATCH", self._url(), json=chunk) for chunk in chunks))
+        updated = 0
+        for chunk, response in zip(chunks, responses):
+            if response.is_success:
+                self._write_through(chunk)
+                updated += len(chunk)
+            else:
+                logger.error("Bulk update failed: %s %s", response.status_code, response.text)
+        return updated
+
+    async def alist(self, where: Optional[str] = None, limit: int = 1000, sort: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self._alist(where, sort, limit)
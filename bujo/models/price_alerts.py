@@ -1,5 +1,4 @@
 import logging
-import requests
 from typing import Any, Dict, List, Optional
 
 from bujo.models.base import BaseNocoDB
@@ -7,26 +6,50 @@ from bujo.models.base import BaseNocoDB
 logger = logging.getLogger(__name__)
 
 
+def _alert_data(ticker: str, direction: str, target_price: float, action: str = "") -> Dict[str, Any]:
+    data = {"Ticker": ticker, "Direction": direction, "TargetPrice": target_price}
+    if action:
+        data["Action"] = action
+    return data
+
+
 class PriceAlerts(BaseNocoDB):
     def create(self, ticker: str, direction: str, target_price: float, action: str = "") -> Optional[Dict[str, Any]]:
-        data = {"Ticker": ticker, "Direction": direction, "TargetPrice": target_price}
-        if action:
-            data["Action"] = action
-        response = requests.post(self._url(), json=data, headers=self.headers)
+        data = _alert_data(ticker, direction, target_price, action)
+        response = self.session.post(self._url(), json=data, headers=self.headers, timeout=self.timeout)
         if response.ok:
-            return response.json()
+            created = response.json()
+            self._write_through_created(data, created)
+            return created
         logger.error("PriceAlerts create failed: %s %s", response.status_code, response.text)
         return None
 
     def list_active(self) -> List[Dict[str, Any]]:
-        return self._paginated_list({})
+        return self._list()
 
     def update(self, alert_id: int, **fields) -> bool:
-        response = requests.patch(
+        response = self.session.patch(
             self._url(),
             json=[{"Id": alert_id, **fields}],
             headers=self.headers,
+            timeout=self.timeout,
         )
         if not response.ok:
             logger.error("PriceAlerts update failed: %s %s", response.status_code, response.text)
+        else:
+            self._write_through([{"Id": alert_id, **fields}])
         return response.ok
+
+    async def acreate(self, ticker: str, direction: str, target_price: float, action: str = "") -> Optional[Dict[str, Any]]:
+        return await super().acreate(_alert_data(ticker, direction, target_price, action))
+
+    async def alist_active(self) -> List[Dict[str, Any]]:
+        return await self._alist()
+
+    async def aupdate(self, alert_id: int, **fields) -> bool:
+        response = await self._arequest("PATCH", self._url(), json=[{"Id": alert_id, **fields}])
+        if not response.is_success:
+            logger.error("PriceAlerts update failed: %s %s", response.status_code, response.text)
+        else:
+            self._write_through([{"Id": alert_id, **fields}])
+        return response.is_success
@@ -0,0 +1,372 @@
+"""Local SQLite mirror of the NocoDB tables.
+
+Rows are stored as JSON keyed by ``(table_id, Id)`` with ``Date`` and
+``UpdatedAt`` pulled into indexed columns. The models keep the mirror current
+with delta pulls on ``UpdatedAt`` and by writing their own changes through,
+and serve reads from it while it is younger than ``max_age`` seconds.
+
+Only the subset of the NocoDB ``where`` syntax the bot generates is evaluated
+locally: ``~and`` of ``eq/neq/gt/ge/lt/le/like/nlike/blank/notblank``
+conditions, optionally with ``exactDate``, and ``((a)~or(b))`` groups of such
+conditions. ``query`` returns None for anything else so the caller can fall
+back to REST.
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PATH = Path(tempfile.gettempdir()) / "nocodb_replica.sqlite3"
+_DEFAULT_MAX_AGE_SECONDS = float(os.environ.get("NOCODB_REPLICA_MAX_AGE_SECONDS", "300"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    table_id   TEXT NOT NULL,
+    id         INTEGER NOT NULL,
+    date       TEXT,
+    updated_at TEXT,
+    data       TEXT NOT NULL,
+    PRIMARY KEY (table_id, id)
+);
+CREATE INDEX IF NOT EXISTS rows_by_date ON rows (table_id, date);
+CREATE TABLE IF NOT EXISTS sync_state (
+    table_id  TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL
+);
+"""
+
+_CONDITION_RE = re.compile(r"^\((.*)\)$", re.DOTALL)
+_OPS = {"eq", "neq", "gt", "ge", "lt", "le", "like", "nlike", "blank", "notblank"}
+_SQL_DATE_OPS = {"eq": "=", "gt": ">", "ge": ">=", "lt": "<", "le": "<="}
+
+Condition = Tuple[str, str, Optional[str], bool]  # field, op, value, exact_date
+Clause = Union[Condition, Tuple[Condition, ...]]  # a condition or an ~or group of them
+
+
+def _row_id(row: Dict[str, Any]) -> Optional[int]:
+    try:
+        return int(row.get("Id"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _date_column(row: Dict[str, Any]) -> Optional[str]:
+    value = row.get("Date")
+    return str(value)[:10] if value else None
+
+
+def _split_top_level(where: str, separator: str) -> Optional[List[str]]:
+    """Split on ``separator`` outside parentheses, or None if they are unbalanced."""
+    parts, depth, current, i = [], 0, [], 0
+    while i < len(where):
+        if depth == 0 and where.startswith(separator, i):
+            parts.append("".join(current))
+            current, i = [], i + len(separator)
+            continue
+        char = where[i]
+        depth += char == "("
+        depth -= char == ")"
+        if depth < 0:
+            return None
+        current.append(char)
+        i += 1
+    parts.append("".join(current))
+    return parts if depth == 0 else None
+
+
+def _parse_condition(part: str) -> Optional[Condition]:
+    match = _CONDITION_RE.match(part.strip())
+    if not match or "~or" in part or "~and" in part or "~not" in part:
+        return None
+    pieces = match.group(1).split(",", 3)
+    if len(pieces) < 2:
+        return None
+    field, op = pieces[0].strip(), pieces[1].strip()
+    if op not in _OPS:
+        return None
+    exact_date = False
+    if len(pieces) == 4:
+        if pieces[2].strip() != "exactDate":
+            return None
+        exact_date = True
+        value: Optional[str] = pieces[3].strip()
+    elif len(pieces) == 3:
+        value = pieces[2].strip()
+        if value == "exactDate":
+            return None
+    else:
+        value = None
+    if value is None and op not in {"blank", "notblank"}:
+        return None
+    return field, op, value, exact_date
+
+
+def parse_where(where: Optional[str]) -> Optional[List[Clause]]:
+    """Parse a NocoDB where clause into clauses, or None if it cannot be evaluated locally."""
+    if not where:
+        return []
+    parts = _split_top_level(where, "~and")
+    if parts is None:
+        return None
+    clauses: List[Clause] = []
+    for part in parts:
+        part = part.strip()
+        if part.startswith("((") and part.endswith("))"):
+            members = _split_top_level(part[1:-1], "~or")
+            group = [_parse_condition(m) for m in members or []]
+            if not group or any(c is None for c in group):
+                return None
+            clauses.append(tuple(group))
+            continue
+        condition = _parse_condition(part)
+        if condition is None:
+            return None
+        clauses.append(condition)
+    return clauses
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _like(text: str, pattern: str) -> bool:
+    text, pattern = text.lower(), pattern.lower()
+    if "%" not in pattern:
+        return pattern in text
+    regex = ".*".join(re.escape(chunk) for chunk in pattern.split("%"))
+    return re.fullmatch(regex, text, re.DOTALL) is not None
+
+
+def _matches(row: Dict[str, Any], clause: Clause) -> bool:
+    if isinstance(clause[0], tuple):
+        return any(_matches(row, condition) for condition in clause)
+    field, op, value, exact_date = clause
+    actual = row.get(field)
+    is_blank = actual is None or actual == ""
+    if op == "blank":
+        return is_blank
+    if op == "notblank":
+        return not is_blank
+    if op in {"like", "nlike"}:
+        found = not is_blank and _like(str(actual), value or "")
+        return found if op == "like" else not found
+    if is_blank:
+        return op == "neq"
+
+    if exact_date:
+        left, right = str(actual)[:10], (value or "")[:10]
+    else:
+        left_num, right_num = _as_number(actual), _as_number(value)
+        if left_num is not None and right_num is not None:
+            left, right = left_num, right_num
+        else:
+            left, right = str(actual), value or ""
+    if op == "eq":
+        return left == right
+    if op == "neq":
+        return left != right
+    if op == "gt":
+        return left > right
+    if op == "ge":
+        return left >= right
+    if op == "lt":
+        return left < right
+    return left <= right
+
+
+def _sort_rows(rows: List[Dict[str, Any]], sort: Optional[str]) -> List[Dict[str, Any]]:
+    for key in reversed([k.strip() for k in (sort or "").split(",") if k.strip()]):
+        descending = key.startswith("-")
+        field = key.lstrip("-")
+        present = [r for r in rows if r.get(field) not in (None, "")]
+        missing = [r for r in rows if r.get(field) in (None, "")]
+        numeric = all(_as_number(r[field]) is not None for r in present)
+        present.sort(
+            key=lambda r: _as_number(r[field]) if numeric else str(r[field]),
+            reverse=descending,
+        )
+        rows = present + missing
+    return rows
+
+
+class LocalReplica:
+    """Thread-safe SQLite store shared by every NocoDB model."""
+
+    def __init__(self, path: Path = _DEFAULT_PATH, max_age_seconds: float = _DEFAULT_MAX_AGE_SECONDS):
+        self.path = Path(path)
+        self.max_age = max_age_seconds
+        self._lock = threading.RLock()
+        self._sync_locks: Dict[str, threading.Lock] = {}
+        # Ids written through while a sync of the table is in flight; prune leaves them alone.
+        self._written_during_sync: Dict[str, Set[int]] = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def sync_lock(self, table_id: str) -> threading.Lock:
+        with self._lock:
+            return self._sync_locks.setdefault(table_id, threading.Lock())
+
+    @contextmanager
+    def syncing(self, table_id: str) -> Iterator[None]:
+        """Hold the table's sync lock and track the Ids written through until it is released."""
+        with self.sync_lock(table_id):
+            with self._lock:
+                self._written_during_sync[table_id] = set()
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self._written_during_sync.pop(table_id, None)
+
+    # ── Sync bookkeeping ────────────────────────────────────────────────────
+
+    def synced_at(self, table_id: str) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at FROM sync_state WHERE table_id = ?", (table_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def is_fresh(self, table_id: str) -> bool:
+        synced_at = self.synced_at(table_id)
+        return synced_at is not None and time.time() - synced_at < self.max_age
+
+    def mark_synced(self, table_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (table_id, synced_at) VALUES (?, ?)",
+                (table_id, time.time()),
+            )
+            self._conn.commit()
+
+    def high_water(self, table_id: str) -> Optional[str]:
+        """Latest ``UpdatedAt`` seen from the server, or None if rows carry no timestamp."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(updated_at) FROM rows WHERE table_id = ?", (table_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def count(self, table_id: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM rows WHERE table_id = ?", (table_id,)
+            ).fetchone()[0]
+
+    # ── Writes ──────────────────────────────────────────────────────────────
+
+    def _upsert_rows(self, table_id: str, rows: Iterable[Dict[str, Any]]) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO rows (table_id, id, date, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+            [
+                (table_id, row_id, _date_column(row), row.get("UpdatedAt"), json.dumps(row, default=str))
+                for row in rows
+                if (row_id := _row_id(row)) is not None
+            ],
+        )
+
+    def replace_all(self, table_id: str, rows: List[Dict[str, Any]]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM rows WHERE table_id = ?", (table_id,))
+            self._upsert_rows(table_id, rows)
+
+    def upsert(self, table_id: str, rows: List[Dict[str, Any]]) -> None:
+        with self._lock, self._conn:
+            self._upsert_rows(table_id, rows)
+
+    def merge(self, table_id: str, rows: List[Dict[str, Any]]) -> None:
+        """Write-through for partial rows: fields are merged into the stored copy."""
+        with self._lock, self._conn:
+            merged = []
+            for row in rows:
+                row_id = _row_id(row)
+                if row_id is None:
+                    continue
+                existing = self._conn.execute(
+                    "SELECT data FROM rows WHERE table_id = ? AND id = ?", (table_id, row_id)
+                ).fetchone()
+                current = json.loads(existing[0]) if existing else {}
+                # Keep the server timestamp so the next delta pull still covers this row.
+                merged.append({**current, **row, "Id": row_id})
+            self._upsert_rows(table_id, merged)
+            if table_id in self._written_during_sync:
+                self._written_during_sync[table_id].update(row["Id"] for row in merged)
+
+    def delete(self, table_id: str, ids: Iterable[Any]) -> None:
+        row_ids = [row_id for i in ids if (row_id := _row_id({"Id": i})) is not None]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM rows WHERE table_id = ? AND id = ?",
+                [(table_id, row_id) for row_id in row_ids],
+            )
+
+    def prune(self, table_id: str, remote_ids: Iterable[int]) -> List[int]:
+        """Delete local rows missing from ``remote_ids``; returns the Ids removed.
+
+        Rows written through during the current sync are kept: they may have
+        been created after the Id list was read.
+        """
+        keep = set(remote_ids)
+        with self._lock, self._conn:
+            keep |= self._written_during_sync.get(table_id, set())
+            local = [row_id for (row_id,) in self._conn.execute("SELECT id FROM rows WHERE table_id = ?", (table_id,))]
+            gone = [row_id for row_id in local if row_id not in keep]
+            self._conn.executemany(
+                "DELETE FROM rows WHERE table_id = ? AND id = ?", [(table_id, row_id) for row_id in gone]
+            )
+        return gone
+
+    # ── Reads ───────────────────────────────────────────────────────────────
+
+    def get(self, table_id: str, record_id: Any) -> Optional[Dict[str, Any]]:
+        row_id = _row_id({"Id": record_id})
+        if row_id is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM rows WHERE table_id = ? AND id = ?", (table_id, row_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(
+        self, table_id: str, where: Optional[str] = None, sort: Optional[str] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Rows matching ``where`` in NocoDB order, or None if the clause is not supported locally."""
+        clauses = parse_where(where)
+        if clauses is None:
+            return None
+        sql = "SELECT data FROM rows WHERE table_id = ?"
+        args: List[Any] = [table_id]
+        remaining: List[Clause] = []
+        for clause in clauses:
+            if isinstance(clause[0], tuple):
+                remaining.append(clause)
+                continue
+            field, op, value, exact_date = clause
+            if field == "Date" and exact_date and op in _SQL_DATE_OPS:
+                sql += f" AND date {_SQL_DATE_OPS[op]} ?"
+                args.append((value or "")[:10])
+            else:
+                remaining.append(clause)
+        sql += " ORDER BY id"
+        with self._lock:
+            rows = [json.loads(data) for (data,) in self._conn.execute(sql, args)]
+        rows = [row for row in rows if all(_matches(row, c) for c in remaining)]
+        return _sort_rows(rows, sort)
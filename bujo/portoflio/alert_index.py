@@ -0,0 +1,150 @@
+"""In-memory index of active price alerts with crossing detection.
+
+Alerts are grouped by ticker into sorted ``above`` and ``below`` threshold
+lists (``both`` alerts sit in each). Given the previous and current price of
+a ticker, the alerts that were crossed are a bisect slice of one list, so a
+poll costs O(log n + fired) per ticker instead of a scan over every alert.
+
+An alert fires when the price crosses its target and again only after the
+price has moved back across it. Alerts that are new or were modified since
+the last load are checked once against the current price instead, so an
+``above`` alert set below the market fires on the next poll.
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+_REFRESH_SECONDS = float(os.environ.get("PRICE_ALERT_REFRESH_SECONDS", "300"))
+_MARKET_HOURS = os.environ.get("PRICE_ALERT_MARKET_HOURS", "09:15-15:30")
+
+_DIRECTIONS = {"above", "below", "both"}
+
+_Threshold = Tuple[float, int]  # (target, alert id)
+
+
+def _parse_alert(alert: Dict[str, Any]) -> Optional[Tuple[int, str, str, float]]:
+    try:
+        alert_id = int(alert.get("Id"))
+        target = float(alert.get("TargetPrice") or 0)
+    except (TypeError, ValueError):
+        return None
+    ticker = str(alert.get("Ticker") or "").strip()
+    direction = str(alert.get("Direction") or "").strip().lower()
+    if not ticker or direction not in _DIRECTIONS or target <= 0:
+        return None
+    return alert_id, ticker, direction, target
+
+
+def is_market_open(now: Optional[datetime] = None, hours: str = _MARKET_HOURS) -> bool:
+    """True on weekdays between the ``HH:MM-HH:MM`` bounds, in the process's local time."""
+    now = now or datetime.now()
+    if now.weekday() >= 5:
+        return False
+    start, end = (part.strip() for part in hours.split("-", 1))
+    return start <= now.strftime("%H:%M") <= end
+
+
+class PriceAlertIndex:
+    """Alert thresholds by ticker plus the last price seen for each ticker."""
+
+    def __init__(self, refresh_seconds: float = _REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._alerts: Dict[int, Dict[str, Any]] = {}
+        self._signatures: Dict[int, Tuple[str, str, float]] = {}
+        self._above: Dict[str, List[_Threshold]] = {}
+        self._below: Dict[str, List[_Threshold]] = {}
+        self._pending: Set[int] = set()
+        self._last_price: Dict[str, float] = {}
+        self._loaded_at: Optional[float] = None
+
+    # ── Loading ─────────────────────────────────────────────────────────────
+
+    def needs_reload(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at >= self.refresh_seconds
+
+    def invalidate(self) -> None:
+        """Force a reload on the next poll, e.g. after an alert is created or changed."""
+        self._loaded_at = None
+
+    def load(self, alerts: Iterable[Dict[str, Any]]) -> None:
+        """Replace the indexed alerts, keeping crossing state for unchanged ones."""
+        above: Dict[str, List[_Threshold]] = {}
+        below: Dict[str, List[_Threshold]] = {}
+        by_id: Dict[int, Dict[str, Any]] = {}
+        signatures: Dict[int, Tuple[str, str, float]] = {}
+        for alert in alerts:
+            parsed = _parse_alert(alert)
+            if parsed is None:
+                continue
+            alert_id, ticker, direction, target = parsed
+            by_id[alert_id] = alert
+            signatures[alert_id] = (ticker, direction, target)
+            if direction in ("above", "both"):
+                above.setdefault(ticker, []).append((target, alert_id))
+            if direction in ("below", "both"):
+                below.setdefault(ticker, []).append((target, alert_id))
+        for thresholds in (*above.values(), *below.values()):
+            thresholds.sort()
+
+        with self._lock:
+            changed = {i for i, sig in signatures.items() if self._signatures.get(i) != sig}
+            self._pending = (self._pending & signatures.keys()) | changed
+            tickers = {sig[0] for sig in signatures.values()}
+            self._last_price = {t: p for t, p in self._last_price.items() if t in tickers}
+            self._alerts, self._signatures = by_id, signatures
+            self._above, self._below = above, below
+            self._loaded_at = time.monotonic()
+
+    def tickers(self) -> List[str]:
+        with self._lock:
+            return sorted({sig[0] for sig in self._signatures.values()})
+
+    # ── Crossing detection ──────────────────────────────────────────────────
+
+    def _crossed(self, ticker: str, previous: float, price: float) -> List[int]:
+        if price > previous:
+            # Upward: above-side targets in (previous, price].
+            thresholds = self._above.get(ticker, [])
+            lo = bisect.bisect_right(thresholds, (previous, math.inf))
+            hi = bisect.bisect_right(thresholds, (price, math.inf))
+        elif price < previous:
+            # Downward: below-side targets in [price, previous).
+            thresholds = self._below.get(ticker, [])
+            lo = bisect.bisect_left(thresholds, (price, -math.inf))
+            hi = bisect.bisect_left(thresholds, (previous, -math.inf))
+        else:
+            return []
+        return [alert_id for _, alert_id in thresholds[lo:hi]]
+
+    def _already_triggered(self, alert_id: int, price: float) -> bool:
+        _, direction, target = self._signatures[alert_id]
+        return (direction == "above" and price >= target) or (direction == "below" and price <= target)
+
+    def observe(self, prices: Mapping[str, float]) -> List[Tuple[Dict[str, Any], float]]:
+        """Record a batch of prices and return ``(alert, price)`` for every alert that fired."""
+        fired: Dict[int, float] = {}
+        with self._lock:
+            for ticker in {sig[0] for sig in self._signatures.values()}:
+                price = prices.get(ticker)
+                if price is None or math.isnan(price) or price <= 0:
+                    continue
+                for alert_id in [i for i in self._pending if self._signatures[i][0] == ticker]:
+                    self._pending.discard(alert_id)
+                    if self._already_triggered(alert_id, price):
+                        fired[alert_id] = price
+                previous = self._last_price.get(ticker)
+                if previous is not None:
+                    for alert_id in self._crossed(ticker, previous, price):
+                        fired.setdefault(alert_id, price)
+                self._last_price[ticker] = price
+            return [(self._alerts[alert_id], price) for alert_id, price in sorted(fired.items())]
+
+
+price_alert_index = PriceAlertIndex()
@@ -1,16 +1,18 @@
+import hashlib
 import json
 import logging
+import os
 import re
-import xml.etree.ElementTree as ET
-import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
-from email.utils import parsedate_to_datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
-import requests
 import yfinance as yf
 
 from bujo.base import OPENAI_MODEL, openai_model
+from bujo.portoflio.ledger import build_position_views
+from bujo.portoflio.llm_cache import LLMResultCache, cache_key
+from bujo.portoflio.news import fetch_news_items
 
 logger = logging.getLogger(__name__)
 
@@ -21,27 +23,20 @@ _LTCG_WARN_DAYS = 14        # days before 1-year mark to warn
 _DIV_WARN_DAYS = 7           # days before ex-dividend to warn
 _EARNINGS_WARN_DAYS = 7     # days before earnings to warn
 _52W_LOW_BUFFER_PCT = 5.0   # % above 52-week low to flag
-
-
-def _transaction_sort_key(tx: Dict) -> tuple[str, int]:
-    date_str = str(tx.get("Date") or "")[:10]
-    try:
-        row_id = int(tx.get("Id") or 0)
-    except (TypeError, ValueError):
-        row_id = 0
-    return date_str, row_id
-
-
-def _parse_number(value) -> float:
-    if value is None or value == "":
-        return 0.0
-    if isinstance(value, (int, float)):
-        return float(value)
-    cleaned = str(value).replace(",", "").replace("₹", "").replace("$", "").strip()
-    try:
-        return float(cleaned) if cleaned else 0.0
-    except ValueError:
-        return 0.0
+_NEWS_PRIORITY_RULES = (
+    "HIGH (always flag): auditor resignation, CFO/CEO/board member resignation or appointment, "
+    "SEBI investigation or charges, promoter selling or pledging stake, debt default or credit "
+    "downgrade, major litigation or court order, supply chain disruption, key customer loss, "
+    "US/India/other country sanctions or trade restrictions, geopolitical events directly affecting "
+    "the company, merger/acquisition announcement, bankruptcy risk, fraud allegation, "
+    "regulatory ban or licence suspension, major data breach.\n\n"
+    "LOW (ignore): routine earnings summaries, analyst price targets, general market commentary, "
+    "technical analysis, index rebalancing.\n\n"
+)
+# Cache keys embed the prompt version so edited rules never reuse stale verdicts.
+_NEWS_PROMPT_VERSION = "news-" + hashlib.sha1(_NEWS_PRIORITY_RULES.encode("utf-8")).hexdigest()[:8]
+_LLM_CACHE = LLMResultCache()
+_ALERT_WORKERS = int(os.environ.get("PORTFOLIO_ALERT_WORKERS", "8"))  # tickers checked in parallel
 
 
 def _compute_open_positions(transactions: List[Dict]) -> Dict[str, Dict]:
@@ -51,65 +46,7 @@ def _compute_open_positions(transactions: List[Dict]) -> Dict[str, Dict]:
     not pollute the average cost, oldest buy date, or thesis note of a later
     re-entry in the same ticker.
     """
-    data: Dict[str, Dict] = {}
-
-    for tx in sorted(transactions or [], key=_transaction_sort_key):
-        ticker = (tx.get("Ticker") or "").strip().upper()
-        tx_type = (tx.get("TransactionType") or "").strip().lower()
-        shares = _parse_number(tx.get("NoOfShares"))
-        cost = _parse_number(tx.get("CostPerShare"))
-        cmp = _parse_number(tx.get("CMP"))
-        date_str = str(tx.get("Date") or "")[:10]
-        note = (tx.get("Note") or "").strip()
-
-        if not ticker or ticker == "CASH" or shares <= 0:
-            continue
-
-        pos = data.setdefault(ticker, {"cmp": 0.0, "lots": []})
-        if cmp:
-            pos["cmp"] = cmp
-
-        if tx_type == "buy":
-            buy_date = None
-            if date_str:
-                try:
-                    buy_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-                except ValueError:
-                    buy_date = None
-            pos["lots"].append({
-                "shares": shares,
-                "cost": cost,
-                "date": buy_date,
-                "note": note,
-            })
-        elif tx_type == "sell":
-            remaining_to_sell = shares
-            while remaining_to_sell > 1e-9 and pos["lots"]:
-                lot = pos["lots"][0]
-                consumed = min(remaining_to_sell, lot["shares"])
-                lot["shares"] -= consumed
-                remaining_to_sell -= consumed
-                if lot["shares"] <= 1e-9:
-                    pos["lots"].pop(0)
-
-    open_positions = {}
-    for ticker, d in data.items():
-        lots = [lot for lot in d["lots"] if lot["shares"] > 1e-9]
-        net_shares = sum(lot["shares"] for lot in lots)
-        if net_shares <= 0:
-            continue
-        open_cost = sum(lot["shares"] * lot["cost"] for lot in lots)
-        buy_dates = [lot["date"] for lot in lots if lot.get("date")]
-        notes = [lot["note"] for lot in lots if lot.get("note")]
-        open_positions[ticker] = {
-            "net_shares": net_shares,
-            "avg_cost": open_cost / net_shares if net_shares else 0.0,
-            "cmp": d["cmp"],
-            "oldest_buy_date": min(buy_dates) if buy_dates else None,
-            "note": notes[-1] if notes else "",
-        }
-
-    return open_positions
+    return build_position_views(transactions, views=("open_positions",))["open_positions"]
 
 
 def _check_yfinance_events(
@@ -230,56 +167,39 @@ def _check_derived_signals(
 
 
 def _fetch_news(company_name: str, ticker: str) -> List[Dict]:
-    """Fetch recent news via Google News RSS."""
-    clean_ticker = re.sub(r"\.(NS|BO)$", "", ticker, flags=re.IGNORECASE)
-    query = urllib.parse.quote(f'"{company_name}" OR "{clean_ticker}" stock')
-    url = f"https://news.google.com/rss/search?q={query}&hl=en-IN&gl=IN&ceid=IN:en"
-
-    try:
-        resp = requests.get(
-            url, timeout=10, headers={"User-Agent": "Mozilla/5.0"}
-        )
-        resp.raise_for_status()
-        root = ET.fromstring(resp.content)
-        cutoff = datetime.now() - timedelta(hours=_LOOKBACK_HOURS)
-        items = []
-        for item in root.findall(".//item")[:25]:
-            title = (item.findtext("title") or "").strip()
-            if not title:
-                continue
-            pub_str = item.findtext("pubDate", "")
-            try:
-                pub_dt = parsedate_to_datetime(pub_str).replace(tzinfo=None)
-                if pub_dt < cutoff:
-                    continue
-            except Exception:
-                pass
-            items.append({"title": title})
-        return items
-    except Exception as e:
-        logger.warning("News fetch failed for %s: %s", ticker, e)
+    """Fetch recent news via the shared Google News RSS fetcher."""
+    items = fetch_news_items(company_name, ticker, lookback_hours=_LOOKBACK_HOURS, limit=25)
+    if items is None:
+        logger.warning("News fetch failed for %s", ticker)
         return []
+    return [{"title": item["title"]} for item in items]
 
 
-def _classify_news(
-    company_name: str, ticker: str, news_items: List[Dict]
-) -> List[str]:
-    """Use LLM to filter news down to HIGH-priority investor alerts."""
-    if not news_items:
-        return []
+def _format_news_alerts(items: List[Dict]) -> List[str]:
+    return [
+        f"📰 *{it['headline']}*\n   _{it.get('reason', '')}_"
+        for it in items
+        if isinstance(it, dict) and it.get("headline")
+    ]
+
+
+def _format_thesis_alerts(items: List[Dict]) -> List[str]:
+    return [
+        f"📋 *Thesis alert*: {it['condition']}\n   _{it.get('evidence', '')}_"
+        for it in items
+        if isinstance(it, dict) and it.get("condition")
+    ]
 
+
+def _request_news_classification(
+    company_name: str, ticker: str, news_items: List[Dict]
+) -> Optional[List[Dict]]:
+    """Ask the model for the HIGH-priority subset. Returns None if the call failed."""
     headlines = "\n".join(f"- {n['title']}" for n in news_items)
     prompt = (
         f"You are a financial analyst reviewing news about {company_name} ({ticker}).\n\n"
         "Classify each headline as HIGH or LOW priority for an investor holding this stock.\n\n"
-        "HIGH (always flag): auditor resignation, CFO/CEO/board member resignation or appointment, "
-        "SEBI investigation or charges, promoter selling or pledging stake, debt default or credit "
-        "downgrade, major litigation or court order, supply chain disruption, key customer loss, "
-        "US/India/other country sanctions or trade restrictions, geopolitical events directly affecting "
-        "the company, merger/acquisition announcement, bankruptcy risk, fraud allegation, "
-        "regulatory ban or licence suspension, major data breach.\n\n"
-        "LOW (ignore): routine earnings summaries, analyst price targets, general market commentary, "
-        "technical analysis, index rebalancing.\n\n"
+        f"{_NEWS_PRIORITY_RULES}"
         f"Headlines:\n{headlines}\n\n"
         "Return ONLY a JSON array of HIGH items:\n"
         '[{"headline": "...", "reason": "one-line investor impact"}]\n'
@@ -295,28 +215,20 @@ def _classify_news(
         raw = resp.choices[0].message.content.strip()
         match = re.search(r"\[.*\]", raw, re.DOTALL)
         if match:
-            items = json.loads(match.group())
-            return [
-                f"📰 *{it['headline']}*\n   _{it.get('reason', '')}_"
-                for it in items
-                if it.get("headline")
-            ]
+            return json.loads(match.group())
     except Exception as e:
         logger.warning("News classification failed for %s: %s", ticker, e)
 
-    return []
+    return None
 
 
-def _check_thesis_note(
+def _request_thesis_check(
     company_name: str,
     ticker: str,
     note: str,
     news_items: List[Dict],
-) -> List[str]:
-    """Use LLM to evaluate whether thesis exit/trim conditions are triggered."""
-    if not note.strip():
-        return []
-
+) -> Optional[List[Dict]]:
+    """Ask the model which thesis conditions are triggered. Returns None if the call failed."""
     headlines = (
         "\n".join(f"- {n['title']}" for n in news_items)
         if news_items
@@ -346,21 +258,174 @@ def _check_thesis_note(
         raw = resp.choices[0].message.content.strip()
         match = re.search(r"\[.*\]", raw, re.DOTALL)
         if match:
-            items = json.loads(match.group())
-            return [
-                f"📋 *Thesis alert*: {it['condition']}\n   _{it.get('evidence', '')}_"
-                for it in items
-                if it.get("condition")
-            ]
+            return json.loads(match.group())
     except Exception as e:
         logger.warning("Thesis note check failed for %s: %s", ticker, e)
 
-    return []
+    return None
+
 
+def _request_combined_review(
+    company_name: str,
+    ticker: str,
+    note: str,
+    to_classify: List[Dict],
+    news_items: List[Dict],
+) -> Optional[Tuple[List[Dict], List[Dict]]]:
+    """One request covering headline classification and the thesis check.
 
-def run_portfolio_alerts(transactions_model) -> str:
+    Only ``to_classify`` headlines are classified; the thesis check sees all of
+    ``news_items``. Returns (high_items, triggered_conditions) or None on failure.
+    """
+    headlines = "\n".join(f"- {n['title']}" for n in news_items)
+    if len(to_classify) == len(news_items):
+        classify_task = "Task 1 — classify each headline above as HIGH or LOW priority.\n"
+    else:
+        classify_task = (
+            "Task 1 — classify only these headlines as HIGH or LOW priority:\n"
+            + "\n".join(f"- {n['title']}" for n in to_classify)
+            + "\n"
+        )
+    prompt = (
+        f"You are a financial analyst reviewing news about {company_name} ({ticker}) "
+        "for an investor holding this stock. Do two tasks on the same headlines.\n\n"
+        f"Recent news headlines (last 48 hours):\n{headlines}\n\n"
+        f"{classify_task}"
+        f"{_NEWS_PRIORITY_RULES}"
+        "Task 2 — evaluate the investor's thesis / exit conditions:\n"
+        f"{note}\n"
+        "Using the news above and your general knowledge of recent events, identify which "
+        "conditions (if any) appear to be triggered or clearly at risk right now. "
+        "Be conservative — only flag a condition if there is concrete evidence from the "
+        "headlines or well-known recent events. Do not speculate.\n\n"
+        "Return ONLY a JSON object:\n"
+        '{"news": [{"headline": "...", "reason": "one-line investor impact"}], '
+        '"thesis": [{"condition": "exact phrase from the thesis", "evidence": "one-line explanation"}]}\n'
+        "Use empty arrays when nothing qualifies."
+    )
+
+    try:
+        resp = openai_model.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"},
+            max_completion_tokens=900,
+        )
+        raw = resp.choices[0].message.content.strip()
+        match = re.search(r"\{.*\}", raw, re.DOTALL)
+        if match:
+            parsed = json.loads(match.group())
+            return parsed.get("news") or [], parsed.get("thesis") or []
+    except Exception as e:
+        logger.warning("Combined news/thesis review failed for %s: %s", ticker, e)
+
+    return None
+
+
+def _headline_key(ticker: str, title: str) -> str:
+    return cache_key(_NEWS_PROMPT_VERSION, ticker, title)
+
+
+def _same_title(title: str) -> str:
+    return " ".join(str(title).lower().split())
+
+
+def _remember_classifications(ticker: str, classified: List[Dict], high_items: List[Dict]) -> None:
+    """Cache a verdict for every headline sent; anything not returned as HIGH is LOW."""
+    high_by_title = {
+        _same_title(it["headline"]): it
+        for it in high_items
+        if isinstance(it, dict) and it.get("headline")
+    }
+    for item in classified:
+        high = high_by_title.get(_same_title(item["title"]))
+        verdict = {"priority": "HIGH", "reason": high.get("reason", "")} if high else {"priority": "LOW"}
+        _LLM_CACHE.put(_headline_key(ticker, item["title"]), verdict)
+
+
+def _review_news_and_thesis(
+    company_name: str,
+    ticker: str,
+    note: str,
+    news_items: List[Dict],
+) -> Tuple[List[str], List[str]]:
+    """Classify headlines and check thesis exit conditions, reusing cached headline verdicts.
+
+    Headlines classified on an earlier run (same ticker and prompt version) are
+    not re-sent. The thesis check is not cached: the 48-hour window changes
+    between runs and the model also weighs recent events beyond the headlines,
+    so a noted position is re-checked every run. When both halves need the
+    model they go out as one combined request.
+    Returns (news_alerts, thesis_alerts).
+    """
+    note = (note or "").strip()
+    unseen = [n for n in news_items if _LLM_CACHE.get(_headline_key(ticker, n["title"])) is None]
+
+    thesis_items: Optional[List[Dict]] = []
+    unmatched_high: List[Dict] = []
+    if note and unseen:
+        combined = _request_combined_review(company_name, ticker, note, unseen, news_items)
+        if combined is not None:
+            high_items, thesis_items = combined
+            _remember_classifications(ticker, unseen, high_items)
+            unmatched_high = high_items
+    else:
+        if unseen:
+            high_items = _request_news_classification(company_name, ticker, unseen)
+            if high_items is not None:
+                _remember_classifications(ticker, unseen, high_items)
+                unmatched_high = high_items
+        if note:
+            thesis_items = _request_thesis_check(company_name, ticker, note, news_items)
+
+    high_news: List[Dict] = []
+    reported = set()
+    for item in news_items:
+        verdict = _LLM_CACHE.get(_headline_key(ticker, item["title"])) or {}
+        if verdict.get("priority") == "HIGH":
+            high_news.append({"headline": item["title"], "reason": verdict.get("reason", "")})
+            reported.add(_same_title(item["title"]))
+    # Keep HIGH items the model paraphrased instead of echoing verbatim.
+    high_news.extend(
+        it for it in unmatched_high
+        if isinstance(it, dict) and it.get("headline")
+        and _same_title(it["headline"]) not in reported
+    )
+
+    return _format_news_alerts(high_news), _format_thesis_alerts(thesis_items or [])
+
+
+def _alerts_for_ticker(ticker: str, position: Dict) -> List[str]:
+    """Run every check for one open position. Safe to call from worker threads."""
+    ticker_alerts: List[str] = []
+
+    try:
+        yf_ticker = yf.Ticker(ticker)
+        info = yf_ticker.info
+        company_name = info.get("shortName") or ticker
+    except Exception as e:
+        logger.warning("yfinance fetch failed for %s: %s", ticker, e)
+        yf_ticker = yf.Ticker(ticker)
+        info = {}
+        company_name = ticker
+
+    ticker_alerts.extend(_check_yfinance_events(ticker, position, yf_ticker, info))
+    ticker_alerts.extend(_check_derived_signals(ticker, position, info))
+
+    news_items = _fetch_news(company_name, ticker)
+    news_alerts, thesis_alerts = _review_news_and_thesis(
+        company_name, ticker, position.get("note", ""), news_items
+    )
+    ticker_alerts.extend(news_alerts)
+    ticker_alerts.extend(thesis_alerts)
+
+    return ticker_alerts
+
+
+def run_portfolio_alerts(transactions_model, workers: Optional[int] = None) -> str:
     """
     Run all alert checks across open positions.
+    Positions are checked concurrently (PORTFOLIO_ALERT_WORKERS, default 8).
     Returns a formatted Telegram message, or empty string if nothing to report.
     """
     transactions = transactions_model.list()
@@ -371,32 +436,16 @@ def run_portfolio_alerts(transactions_model) -> str:
     if not positions:
         return ""
 
-    all_alerts: Dict[str, List[str]] = {}
-
-    for ticker, position in positions.items():
-        ticker_alerts: List[str] = []
-
-        try:
-            yf_ticker = yf.Ticker(ticker)
-            info = yf_ticker.info
-            company_name = info.get("shortName") or ticker
-        except Exception as e:
-            logger.warning("yfinance fetch failed for %s: %s", ticker, e)
-            yf_ticker = yf.Ticker(ticker)
-            info = {}
-            company_name = ticker
-
-        ticker_alerts.extend(_check_yfinance_events(ticker, position, yf_ticker, info))
-        ticker_alerts.extend(_check_derived_signals(ticker, position, info))
-
-        news_items = _fetch_news(company_name, ticker)
-        ticker_alerts.extend(_classify_news(company_name, ticker, news_items))
-        ticker_alerts.extend(
-            _check_thesis_note(company_name, ticker, position.get("note", ""), news_items)
-        )
+    tickers = list(positions)
+    workers = max(1, min(workers or _ALERT_WORKERS, len(tickers)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="portfolio-alerts") as pool:
+        results = list(pool.map(lambda tk: _alerts_for_ticker(tk, positions[tk]), tickers))
+    _LLM_CACHE.save()
 
-        if ticker_alerts:
-            all_alerts[ticker] = ticker_alerts
+    # pool.map preserves input order, so the report order matches the position order.
+    all_alerts: Dict[str, List[str]] = {
+        ticker: ticker_alerts for ticker, ticker_alerts in zip(tickers, results) if ticker_alerts
+    }
 
     if not all_alerts:
         return ""
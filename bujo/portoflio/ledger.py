@@ -1,9 +1,22 @@
+import json
+import logging
 import math
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import os
+import tempfile
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 CASH_TICKER = "CASH"
 
+logger = logging.getLogger(__name__)
+
+# "python" folds row by row; "columnar" uses the pandas engine in ledger_columnar.
+LEDGER_ENGINES = ("python", "columnar")
+_DEFAULT_ENGINE = os.environ.get("PORTFOLIO_LEDGER_ENGINE", "python")
+POSITION_VIEWS = ("state", "cmp", "positions_by_portfolio", "open_positions", "cash_by_portfolio")
+
 
 def parse_number(value: Any, default: float = 0.0) -> float:
     if value is None or value == "":
@@ -95,117 +108,376 @@ def _portfolio_row(name: str) -> Dict[str, Any]:
     }
 
 
-def build_portfolio_ledger(
+# ──────────────────────────────────────────────────────────────────────────────
+# Fold state
+#
+# Transactions are folded in native currency into a JSON-serialisable state so
+# the same state can be persisted and extended with new rows later. FX rates
+# and CMPs change between calls, so they are only applied in _finalize_ledger.
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _new_fold_state() -> Dict[str, Any]:
+    return {"portfolios": {}, "warnings": []}
+
+
+def _warn(state: Dict[str, Any], portfolio: Dict[str, Any], msg: str) -> None:
+    portfolio["warnings"].append(msg)
+    state["warnings"].append(msg)
+
+
+def _parse_row(tx: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "ticker": normalize_ticker(tx.get("Ticker")),
+        "type": normalize_transaction_type(tx.get("TransactionType")),
+        "shares": parse_number(tx.get("NoOfShares")),
+        "cost": parse_number(tx.get("CostPerShare")),
+        "cmp": parse_number(tx.get("CMP")),
+        "portfolio": normalize_portfolio(tx.get("Portfolio")),
+        "date": str(tx.get("Date") or "")[:10],
+        "note": str(tx.get("Note") or "").strip(),
+    }
+
+
+def _apply_transaction(state: Dict[str, Any], tx: Dict[str, Any]) -> None:
+    """Fold one transaction into ``state``. Rows must arrive in transaction_sort_key order."""
+    _apply_row(state, _parse_row(tx))
+
+
+def _apply_row(state: Dict[str, Any], row: Dict[str, Any]) -> None:
+    ticker = row["ticker"]
+    if not ticker:
+        return
+    tx_type = row["type"]
+    shares = row["shares"]
+    cost_native = row["cost"]
+    portfolio_name = row["portfolio"]
+
+    portfolio = state["portfolios"].setdefault(
+        portfolio_name, {"cash": 0.0, "positions": {}, "warnings": []}
+    )
+
+    if ticker == CASH_TICKER:
+        cash_units = shares if shares else 1.0
+        amount = cash_units * cost_native
+        if tx_type == "Deposit":
+            portfolio["cash"] += amount
+        elif tx_type in {"Withdraw", "Withdrawal"}:
+            portfolio["cash"] -= amount
+        elif amount:
+            _warn(state, portfolio, f"Unknown CASH transaction type {tx_type!r} in {portfolio_name}")
+        return
+
+    if shares <= 0:
+        _warn(state, portfolio, f"Skipped {ticker} {tx_type} in {portfolio_name}: shares must be positive")
+        return
+
+    pos = portfolio["positions"].setdefault(ticker, {
+        "total_bought": 0.0,
+        "total_sold": 0.0,
+        "buy_cost_native": 0.0,
+        "open_cost_native": 0.0,
+        "open_shares": 0.0,
+        "realised_cost_basis_native": 0.0,
+        "sell_proceeds_native": 0.0,
+        "notes": [],
+        "buy_dates": [],
+        "sell_dates": [],
+        "all_buy_lots": [],
+    })
+
+    date_str = row["date"]
+    note = row["note"]
+    if note:
+        pos["notes"].append({"date": date_str, "type": tx_type, "note": note})
+
+    if tx_type == "Buy":
+        pos["total_bought"] += shares
+        pos["buy_cost_native"] += shares * cost_native
+        pos["open_shares"] += shares
+        pos["open_cost_native"] += shares * cost_native
+        if date_str:
+            pos["buy_dates"].append(date_str)
+            pos["all_buy_lots"].append([date_str, shares, cost_native])
+    elif tx_type == "Sell":
+        pos["total_sold"] += shares
+        pos["sell_proceeds_native"] += shares * cost_native
+        matched_shares = min(shares, pos["open_shares"])
+        if matched_shares > 0:
+            avg_open_native = pos["open_cost_native"] / pos["open_shares"]
+            pos["open_shares"] -= matched_shares
+            pos["open_cost_native"] -= matched_shares * avg_open_native
+            pos["realised_cost_basis_native"] += matched_shares * avg_open_native
+            if abs(pos["open_shares"]) < 1e-9:
+                pos["open_shares"] = 0.0
+                pos["open_cost_native"] = 0.0
+        if date_str:
+            pos["sell_dates"].append(date_str)
+    else:
+        _warn(state, portfolio, f"Unknown stock transaction type {tx_type!r} for {ticker} in {portfolio_name}")
+
+
+def _record_cmp(cmp_by_position: Dict[Tuple[str, str], float], row: Dict[str, Any]) -> None:
+    ticker = row["ticker"]
+    if row["cmp"] and ticker and ticker != CASH_TICKER and row["shares"] > 0:
+        cmp_by_position[(row["portfolio"], ticker)] = row["cmp"]
+
+
+def _consume_fifo(lots: List[Dict[str, Any]], shares: float) -> None:
+    remaining_to_sell = shares
+    while remaining_to_sell > 1e-9 and lots:
+        lot = lots[0]
+        consumed = min(remaining_to_sell, lot["shares"])
+        lot["shares"] -= consumed
+        remaining_to_sell -= consumed
+        if lot["shares"] <= 1e-9:
+            lots.pop(0)
+
+
+def _portfolio_lots_view(raw: Dict[str, Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for portfolio, tickers in raw.items():
+        result[portfolio] = {}
+        for ticker, d in tickers.items():
+            open_lots = [lot for lot in d["lots"] if lot["shares"] > 1e-9]
+            net = sum(lot["shares"] for lot in open_lots)
+            if net <= 0:
+                continue
+            total_invested = sum(lot["shares"] * lot["cost"] for lot in open_lots)
+            buy_dates = [lot["date"] for lot in open_lots if lot["date"]]
+            all_buy_lots = [
+                (lot["date"], lot["shares"], lot["cost"])
+                for lot in open_lots
+                if lot["date"]
+            ]
+            result[portfolio][ticker] = {
+                "net_shares": net,
+                "avg_cost": total_invested / net if net else 0.0,
+                "total_invested": total_invested,
+                "buy_dates": sorted(buy_dates),
+                "sell_dates": sorted(d["sell_dates"]),
+                "total_bought": d["total_bought"],
+                "total_sold": d["total_sold"],
+                "sell_proceeds": d["sell_proceeds"],
+                "all_buy_lots": sorted(all_buy_lots, key=lambda x: x[0]),
+                "notes": sorted(
+                    d["notes"],
+                    key=lambda item: ((item.get("date") or ""), (item.get("type") or "")),
+                    reverse=True,
+                ),
+            }
+    return result
+
+
+def _buy_date(date_str: str) -> Optional[date]:
+    if not date_str:
+        return None
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def _open_positions_view(by_ticker: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    open_positions: Dict[str, Dict[str, Any]] = {}
+    for ticker, d in by_ticker.items():
+        lots = [lot for lot in d["lots"] if lot["shares"] > 1e-9]
+        net_shares = sum(lot["shares"] for lot in lots)
+        if net_shares <= 0:
+            continue
+        open_cost = sum(lot["shares"] * lot["cost"] for lot in lots)
+        buy_dates = [lot["date"] for lot in lots if lot["date"]]
+        notes = [lot["note"] for lot in lots if lot["note"]]
+        open_positions[ticker] = {
+            "net_shares": net_shares,
+            "avg_cost": open_cost / net_shares,
+            "cmp": d["cmp"],
+            "oldest_buy_date": min(buy_dates) if buy_dates else None,
+            "note": notes[-1] if notes else "",
+        }
+    return open_positions
+
+
+def _resolve_views(views: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    if views is None:
+        return POSITION_VIEWS
+    views = tuple(views)
+    unknown = [view for view in views if view not in POSITION_VIEWS]
+    if unknown:
+        raise ValueError(f"Unknown position view {unknown[0]!r}; expected one of {', '.join(POSITION_VIEWS)}")
+    return views
+
+
+def build_position_views(
     transactions: List[Dict[str, Any]],
-    fx_rates: Optional[Dict[str, float]] = None,
-    default_usd_to_inr: float = 84.0,
+    engine: Optional[str] = None,
+    views: Optional[Iterable[str]] = None,
 ) -> Dict[str, Any]:
-    """Aggregate transactions into cash, open holdings, closed positions, and P&L.
+    """Sort and parse the transactions once and derive the position views from that pass.
 
-    Uses average-cost accounting for realised P&L on sells. Stock trade cash rows
-    are not inferred here; only explicit CASH ledger rows affect cash.
+    ``views`` names the keys to build (default: all of ``POSITION_VIEWS``);
+    views that are not asked for are not computed.
+
+    - ``state`` / ``cmp``: average-cost fold and latest CMPs behind ``build_portfolio_ledger``
+    - ``positions_by_portfolio``: per-portfolio FIFO open lots (rebalance)
+    - ``open_positions``: cross-portfolio FIFO positions keyed by ticker, with
+      the oldest open buy date and latest thesis note (alerts)
+    - ``cash_by_portfolio``: explicit CASH ledger balances
     """
-    portfolios: Dict[str, Dict[str, Any]] = {}
-    warnings: List[str] = []
+    views = _resolve_views(views)
+    if _resolve_engine(engine) == "columnar":
+        from bujo.portoflio import ledger_columnar
+        return ledger_columnar.position_views(transactions, views)
+
+    fold = "state" in views or "cash_by_portfolio" in views
+    lots_by_portfolio = "positions_by_portfolio" in views
+    lots_by_ticker = "open_positions" in views
+    state = _new_fold_state()
+    cmp_by_position: Dict[Tuple[str, str], float] = {}
+    by_portfolio: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    by_ticker: Dict[str, Dict[str, Any]] = {}
+    buy_dates: Dict[str, Optional[date]] = {}
 
     for tx in sorted(transactions or [], key=transaction_sort_key):
-        ticker = normalize_ticker(tx.get("Ticker"))
-        tx_type = normalize_transaction_type(tx.get("TransactionType"))
-        shares = parse_number(tx.get("NoOfShares"))
-        cost_native = parse_number(tx.get("CostPerShare"))
-        cmp_native = parse_number(tx.get("CMP"))
-        portfolio_name = normalize_portfolio(tx.get("Portfolio"))
+        row = _parse_row(tx)
+        if fold:
+            _apply_row(state, row)
+        if "cmp" in views:
+            _record_cmp(cmp_by_position, row)
 
-        if not ticker:
+        ticker, tx_type, shares = row["ticker"], row["type"], row["shares"]
+        if not ticker or ticker == CASH_TICKER or shares <= 0:
             continue
 
-        portfolio = portfolios.setdefault(portfolio_name, _portfolio_row(portfolio_name))
-
-        if ticker == CASH_TICKER:
-            cash_units = shares if shares else 1.0
-            amount = cash_units * cost_native
-            if tx_type == "Deposit":
-                portfolio["cash_inr"] += amount
-            elif tx_type in {"Withdraw", "Withdrawal"}:
-                portfolio["cash_inr"] -= amount
-            elif amount:
-                msg = f"Unknown CASH transaction type {tx_type!r} in {portfolio_name}"
-                portfolio["warnings"].append(msg)
-                warnings.append(msg)
-            continue
+        if lots_by_portfolio:
+            pos = by_portfolio.setdefault(row["portfolio"], {}).setdefault(ticker, {
+                "total_bought": 0.0,
+                "total_sold": 0.0,
+                "sell_proceeds": 0.0,
+                "sell_dates": [],
+                "lots": [],
+                "notes": [],
+            })
+            if row["note"]:
+                pos["notes"].append({"date": row["date"], "type": tx_type, "note": row["note"]})
+            if tx_type == "Buy":
+                pos["total_bought"] += shares
+                pos["lots"].append({"date": row["date"], "shares": shares, "cost": row["cost"]})
+            elif tx_type == "Sell":
+                pos["total_sold"] += shares
+                pos["sell_proceeds"] += shares * row["cost"]
+                if row["date"]:
+                    pos["sell_dates"].append(row["date"])
+                _consume_fifo(pos["lots"], shares)
+
+        if lots_by_ticker:
+            held = by_ticker.setdefault(ticker, {"cmp": 0.0, "lots": []})
+            if row["cmp"]:
+                held["cmp"] = row["cmp"]
+            if tx_type == "Buy":
+                if row["date"] not in buy_dates:
+                    buy_dates[row["date"]] = _buy_date(row["date"])
+                held["lots"].append({
+                    "shares": shares,
+                    "cost": row["cost"],
+                    "date": buy_dates[row["date"]],
+                    "note": row["note"],
+                })
+            elif tx_type == "Sell":
+                _consume_fifo(held["lots"], shares)
+
+    builders = {
+        "state": lambda: state,
+        "cmp": lambda: cmp_by_position,
+        "positions_by_portfolio": lambda: _portfolio_lots_view(by_portfolio),
+        "open_positions": lambda: _open_positions_view(by_ticker),
+        "cash_by_portfolio": lambda: {name: folded["cash"] for name, folded in state["portfolios"].items()},
+    }
+    return {view: builders[view]() for view in views}
+
+
+def _latest_cmp(transactions: List[Dict[str, Any]]) -> Dict[Tuple[str, str], float]:
+    """Most recent non-zero CMP per (portfolio, ticker), in transaction order.
 
-        if shares <= 0:
-            msg = f"Skipped {ticker} {tx_type} in {portfolio_name}: shares must be positive"
-            portfolio["warnings"].append(msg)
-            warnings.append(msg)
+    CMP is rewritten on every row by the daily refresh, so it is kept out of
+    the fold state and resolved here with a single unsorted pass.
+    """
+    latest: Dict[Tuple[str, str], Tuple[tuple, float]] = {}
+    for tx in transactions or []:
+        cmp_native = parse_number(tx.get("CMP"))
+        ticker = normalize_ticker(tx.get("Ticker"))
+        if not cmp_native or not ticker or ticker == CASH_TICKER or parse_number(tx.get("NoOfShares")) <= 0:
             continue
+        key = (normalize_portfolio(tx.get("Portfolio")), ticker)
+        order = transaction_sort_key(tx)
+        if key not in latest or order >= latest[key][0]:
+            latest[key] = (order, cmp_native)
+    return {key: cmp_native for key, (_, cmp_native) in latest.items()}
+
+
+def _resolve_engine(engine: Optional[str]) -> str:
+    engine = (engine or _DEFAULT_ENGINE).strip().lower()
+    if engine not in LEDGER_ENGINES:
+        raise ValueError(f"Unknown ledger engine {engine!r}; expected one of {', '.join(LEDGER_ENGINES)}")
+    return engine
+
+
+def _ledger_inputs(
+    transactions: List[Dict[str, Any]], engine: Optional[str] = None
+) -> Tuple[Dict[str, Any], Dict[Tuple[str, str], float]]:
+    """Fold state and latest CMPs from the selected engine."""
+    if _resolve_engine(engine) == "columnar":
+        from bujo.portoflio import ledger_columnar
+        return ledger_columnar.ledger_inputs(transactions)
+    state = _new_fold_state()
+    cmp_by_position: Dict[Tuple[str, str], float] = {}
+    for tx in sorted(transactions or [], key=transaction_sort_key):
+        row = _parse_row(tx)
+        _apply_row(state, row)
+        _record_cmp(cmp_by_position, row)
+    return state, cmp_by_position
 
-        currency = currency_for_ticker(ticker)
-        fx = fx_for_currency(currency, fx_rates, default_usd_to_inr)
-        key = ticker
-        pos = portfolio["positions"].setdefault(key, {
-            "ticker": ticker,
-            "portfolio": portfolio_name,
-            "currency": currency,
-            "fx_rate": fx,
-            "total_bought": 0.0,
-            "total_sold": 0.0,
-            "buy_cost_native": 0.0,
-            "buy_cost_inr": 0.0,
-            "open_cost_native": 0.0,
-            "open_cost_inr": 0.0,
-            "open_shares": 0.0,
-            "realised_cost_basis_inr": 0.0,
-            "sell_proceeds_native": 0.0,
-            "sell_proceeds_inr": 0.0,
-            "cmp_native": 0.0,
-            "cmp_inr": 0.0,
-            "notes": [],
-            "buy_dates": [],
-            "sell_dates": [],
-            "all_buy_lots": [],
-        })
-        if cmp_native:
-            pos["cmp_native"] = cmp_native
-            pos["cmp_inr"] = cmp_native * fx
-
-        date_str = str(tx.get("Date") or "")[:10]
-        note = str(tx.get("Note") or "").strip()
-        if note:
-            pos["notes"].append({"date": date_str, "type": tx_type, "note": note})
-
-        if tx_type == "Buy":
-            pos["total_bought"] += shares
-            pos["buy_cost_native"] += shares * cost_native
-            pos["buy_cost_inr"] += shares * cost_native * fx
-            pos["open_shares"] += shares
-            pos["open_cost_native"] += shares * cost_native
-            pos["open_cost_inr"] += shares * cost_native * fx
-            if date_str:
-                pos["buy_dates"].append(date_str)
-                pos["all_buy_lots"].append((date_str, shares, cost_native))
-        elif tx_type == "Sell":
-            pos["total_sold"] += shares
-            pos["sell_proceeds_native"] += shares * cost_native
-            pos["sell_proceeds_inr"] += shares * cost_native * fx
-            matched_shares = min(shares, pos["open_shares"])
-            if matched_shares > 0:
-                avg_open_native = pos["open_cost_native"] / pos["open_shares"]
-                avg_open_inr = pos["open_cost_inr"] / pos["open_shares"]
-                pos["open_shares"] -= matched_shares
-                pos["open_cost_native"] -= matched_shares * avg_open_native
-                pos["open_cost_inr"] -= matched_shares * avg_open_inr
-                pos["realised_cost_basis_inr"] += matched_shares * avg_open_inr
-                if abs(pos["open_shares"]) < 1e-9:
-                    pos["open_shares"] = 0.0
-                    pos["open_cost_native"] = 0.0
-                    pos["open_cost_inr"] = 0.0
-            if date_str:
-                pos["sell_dates"].append(date_str)
-        else:
-            msg = f"Unknown stock transaction type {tx_type!r} for {ticker} in {portfolio_name}"
-            portfolio["warnings"].append(msg)
-            warnings.append(msg)
+
+def _finalize_ledger(
+    state: Dict[str, Any],
+    cmp_by_position: Dict[Tuple[str, str], float],
+    fx_rates: Optional[Dict[str, float]],
+    default_usd_to_inr: float,
+) -> Dict[str, Any]:
+    """Convert a fold state into the ledger report. ``state`` is not modified."""
+    portfolios: Dict[str, Dict[str, Any]] = {}
+    warnings: List[str] = list(state["warnings"])
+
+    for portfolio_name, folded in state["portfolios"].items():
+        portfolio = _portfolio_row(portfolio_name)
+        portfolio["cash_inr"] = folded["cash"]
+        portfolio["warnings"] = list(folded["warnings"])
+        for ticker, raw in folded["positions"].items():
+            currency = currency_for_ticker(ticker)
+            fx = fx_for_currency(currency, fx_rates, default_usd_to_inr)
+            cmp_native = cmp_by_position.get((portfolio_name, ticker), 0.0)
+            portfolio["positions"][ticker] = {
+                "ticker": ticker,
+                "portfolio": portfolio_name,
+                "currency": currency,
+                "fx_rate": fx,
+                "total_bought": raw["total_bought"],
+                "total_sold": raw["total_sold"],
+                "buy_cost_native": raw["buy_cost_native"],
+                "buy_cost_inr": raw["buy_cost_native"] * fx,
+                "open_cost_native": raw["open_cost_native"],
+                "open_cost_inr": raw["open_cost_native"] * fx,
+                "open_shares": raw["open_shares"],
+                "realised_cost_basis_inr": raw["realised_cost_basis_native"] * fx,
+                "sell_proceeds_native": raw["sell_proceeds_native"],
+                "sell_proceeds_inr": raw["sell_proceeds_native"] * fx,
+                "cmp_native": cmp_native,
+                "cmp_inr": cmp_native * fx,
+                "notes": list(raw["notes"]),
+                "buy_dates": list(raw["buy_dates"]),
+                "sell_dates": list(raw["sell_dates"]),
+                "all_buy_lots": [tuple(lot) for lot in raw["all_buy_lots"]],
+            }
+        portfolios[portfolio_name] = portfolio
 
     all_holdings: List[Dict[str, Any]] = []
     all_closed: List[Dict[str, Any]] = []
@@ -316,82 +588,187 @@ def build_portfolio_ledger(
         "warnings": warnings,
     }
 
+def build_portfolio_ledger(
+    transactions: List[Dict[str, Any]],
+    fx_rates: Optional[Dict[str, float]] = None,
+    default_usd_to_inr: float = 84.0,
+    engine: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Aggregate transactions into cash, open holdings, closed positions, and P&L.
+
+    Uses average-cost accounting for realised P&L on sells. Stock trade cash rows
+    are not inferred here; only explicit CASH ledger rows affect cash.
+    ``engine`` is one of ``LEDGER_ENGINES`` (default ``PORTFOLIO_LEDGER_ENGINE``).
+    """
+    state, cmp_by_position = _ledger_inputs(transactions, engine)
+    return _finalize_ledger(state, cmp_by_position, fx_rates, default_usd_to_inr)
 
-def compute_cash_by_portfolio(transactions: List[Dict[str, Any]]) -> Dict[str, float]:
-    ledger = build_portfolio_ledger(transactions, fx_rates={"USD": 1.0}, default_usd_to_inr=1.0)
-    return {name: row["cash_inr"] for name, row in ledger["portfolios"].items()}
 
 
-def compute_positions_by_portfolio(transactions: List[Dict[str, Any]]) -> Dict[str, Dict[str, Dict[str, Any]]]:
-    raw: Dict[str, Dict[str, Dict[str, Any]]] = {}
-    for tx in sorted(transactions or [], key=transaction_sort_key):
-        ticker = normalize_ticker(tx.get("Ticker"))
-        tx_type = normalize_transaction_type(tx.get("TransactionType"))
-        shares = parse_number(tx.get("NoOfShares"))
-        cost = parse_number(tx.get("CostPerShare"))
-        portfolio = normalize_portfolio(tx.get("Portfolio"))
-        date_str = str(tx.get("Date") or "")[:10]
-        note = str(tx.get("Note") or "").strip()
+# ──────────────────────────────────────────────────────────────────────────────
+# Incremental ledger
+# ──────────────────────────────────────────────────────────────────────────────
 
-        if not ticker or ticker == CASH_TICKER or shares <= 0:
-            continue
+_LEDGER_SNAPSHOT_PATH = Path(tempfile.gettempdir()) / "portfolio_ledger_snapshot.json"
+_LEDGER_SNAPSHOT_VERSION = 2
+# CMP and UpdatedAt are deliberately left out: the daily CMP refresh rewrites
+# every row without changing anything the fold depends on.
+_FINGERPRINT_FIELDS = ("Ticker", "TransactionType", "NoOfShares", "CostPerShare", "Portfolio", "Date", "Note")
+# Delta advances are written to disk once this many rows have piled up. A
+# snapshot that lags is still valid: after a restart the rows it lacks sort
+# after its mark and are folded again as a delta.
+_DELTA_ROWS_PER_SAVE = 500
 
-        pos = raw.setdefault(portfolio, {}).setdefault(ticker, {
-            "total_bought": 0.0,
-            "total_sold": 0.0,
-            "sell_proceeds": 0.0,
-            "sell_dates": [],
-            "lots": [],
-            "notes": [],
-        })
-        if note:
-            pos["notes"].append({"date": date_str, "type": tx_type, "note": note})
-        if tx_type == "Buy":
-            pos["total_bought"] += shares
-            pos["lots"].append({"date": date_str, "shares": shares, "cost": cost})
-        elif tx_type == "Sell":
-            pos["total_sold"] += shares
-            pos["sell_proceeds"] += shares * cost
-            if date_str:
-                pos["sell_dates"].append(date_str)
-            remaining_to_sell = shares
-            while remaining_to_sell > 1e-9 and pos["lots"]:
-                lot = pos["lots"][0]
-                consumed = min(remaining_to_sell, lot["shares"])
-                lot["shares"] -= consumed
-                remaining_to_sell -= consumed
-                if lot["shares"] <= 1e-9:
-                    pos["lots"].pop(0)
 
-    result: Dict[str, Dict[str, Dict[str, Any]]] = {}
-    for portfolio, tickers in raw.items():
-        result[portfolio] = {}
-        for ticker, d in tickers.items():
-            open_lots = [lot for lot in d["lots"] if lot["shares"] > 1e-9]
-            net = sum(lot["shares"] for lot in open_lots)
-            if net <= 0:
+def _row_id(tx: Dict[str, Any]) -> Optional[int]:
+    try:
+        row_id = int(tx.get("Id"))
+    except (TypeError, ValueError):
+        return None
+    return row_id if row_id > 0 else None
+
+
+class IncrementalLedger:
+    """``build_portfolio_ledger`` backed by a persisted fold of the transactions table.
+
+    The snapshot records each row's fold fields by ``Id`` and a high-water
+    mark on ``(Date, Id)``. Rows that are new and sort after the mark are
+    folded onto the saved state; an edited, deleted or back-dated row triggers
+    a full rebuild. Rows without an ``Id`` cannot be tracked and are always
+    replayed. The check and the latest-CMP lookup share one pass over the
+    rows, so an unchanged table costs far less than a fold.
+    """
+
+    def __init__(self, path: Path = _LEDGER_SNAPSHOT_PATH, engine: Optional[str] = None):
+        self.path = Path(path)
+        self.engine = _resolve_engine(engine)
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._unsaved_rows = 0
+        self.last_mode: Optional[str] = None  # "full", "delta" or "unchanged"
+
+    def build(
+        self,
+        transactions: List[Dict[str, Any]],
+        fx_rates: Optional[Dict[str, float]] = None,
+        default_usd_to_inr: float = 84.0,
+    ) -> Dict[str, Any]:
+        with self._lock:
+            state, cmp_by_position = self._sync(transactions or [])
+            return _finalize_ledger(state, cmp_by_position, fx_rates, default_usd_to_inr)
+
+    def _scan(
+        self, transactions: List[Dict[str, Any]], seen: Dict[int, tuple]
+    ) -> Optional[Tuple[Dict[int, tuple], List[Dict[str, Any]], bool, Dict[Tuple[str, str], float]]]:
+        """One pass: fold fields per Id, rows missing from ``seen``, whether ``seen`` still
+        matches, and the latest CMP per position. None if a row has no usable Id."""
+        fields = _FINGERPRINT_FIELDS
+        rows: Dict[int, tuple] = {}
+        new_rows: List[Dict[str, Any]] = []
+        matched = 0
+        latest: Dict[Tuple[str, str], Tuple[tuple, float]] = {}
+        # The same few raw values repeat on every row, so each is normalised once.
+        keys: Dict[Tuple[Any, Any], Optional[Tuple[str, str]]] = {}  # (Portfolio, Ticker) -> position
+        numbers: Dict[Any, float] = {}
+        for tx in transactions:
+            row_id = _row_id(tx)
+            if row_id is None:
+                return None
+            fingerprint = tuple(map(tx.get, fields))
+            rows[row_id] = fingerprint
+            previous = seen.get(row_id)
+            if previous is None:
+                new_rows.append(tx)
+            elif previous == fingerprint:
+                matched += 1
+
+            raw_ticker, _, raw_shares, _, raw_portfolio, raw_date, _ = fingerprint
+            raw_cmp = tx.get("CMP")
+            if raw_cmp not in numbers:
+                numbers[raw_cmp] = parse_number(raw_cmp)
+            cmp_native = numbers[raw_cmp]
+            if not cmp_native:
                 continue
-            total_invested = sum(lot["shares"] * lot["cost"] for lot in open_lots)
-            buy_dates = [lot["date"] for lot in open_lots if lot["date"]]
-            all_buy_lots = [
-                (lot["date"], lot["shares"], lot["cost"])
-                for lot in open_lots
-                if lot["date"]
-            ]
-            result[portfolio][ticker] = {
-                "net_shares": net,
-                "avg_cost": total_invested / net if net else 0.0,
-                "total_invested": total_invested,
-                "buy_dates": sorted(buy_dates),
-                "sell_dates": sorted(d["sell_dates"]),
-                "total_bought": d["total_bought"],
-                "total_sold": d["total_sold"],
-                "sell_proceeds": d["sell_proceeds"],
-                "all_buy_lots": sorted(all_buy_lots, key=lambda x: x[0]),
-                "notes": sorted(
-                    d["notes"],
-                    key=lambda item: ((item.get("date") or ""), (item.get("type") or "")),
-                    reverse=True,
-                ),
-            }
-    return result
+            raw_key = (raw_portfolio, raw_ticker)
+            if raw_key not in keys:
+                ticker = normalize_ticker(raw_key[1])
+                keys[raw_key] = (
+                    (normalize_portfolio(raw_key[0]), ticker) if ticker and ticker != CASH_TICKER else None
+                )
+            key = keys[raw_key]
+            if raw_shares not in numbers:
+                numbers[raw_shares] = parse_number(raw_shares)
+            if key is None or numbers[raw_shares] <= 0:
+                continue
+            order = (str(raw_date or "")[:10], row_id)
+            if key not in latest or order >= latest[key][0]:
+                latest[key] = (order, cmp_native)
+        cmp_by_position = {key: cmp_native for key, (_, cmp_native) in latest.items()}
+        return rows, new_rows, matched == len(seen), cmp_by_position
+
+    def _sync(
+        self, transactions: List[Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], Dict[Tuple[str, str], float]]:
+        snapshot = self._load()
+        scanned = self._scan(transactions, snapshot["rows"] if snapshot is not None else {})
+        if scanned is None:
+            self.last_mode = "full"
+            return _ledger_inputs(transactions, self.engine)
+        rows, new_rows, unchanged, cmp_by_position = scanned
+
+        if snapshot is not None:
+            if unchanged:
+                if not new_rows:
+                    self.last_mode = "unchanged"
+                    return snapshot["state"], cmp_by_position
+                new_rows.sort(key=transaction_sort_key)
+                if transaction_sort_key(new_rows[0]) > tuple(snapshot["watermark"]):
+                    for tx in new_rows:
+                        _apply_transaction(snapshot["state"], tx)
+                    snapshot["rows"] = rows
+                    snapshot["watermark"] = list(transaction_sort_key(new_rows[-1]))
+                    self._unsaved_rows += len(new_rows)
+                    if self._unsaved_rows >= _DELTA_ROWS_PER_SAVE:
+                        self._save(snapshot)
+                    self.last_mode = "delta"
+                    logger.debug("Ledger snapshot advanced by %d row(s)", len(new_rows))
+                    return snapshot["state"], cmp_by_position
+                logger.info("Back-dated transaction found; rebuilding ledger snapshot")
+            else:
+                logger.info("Transactions edited or deleted; rebuilding ledger snapshot")
+
+        watermark = max((transaction_sort_key(tx) for tx in transactions), default=("", 0))
+        state, cmp_by_position = _ledger_inputs(transactions, self.engine)
+        snapshot = {
+            "version": _LEDGER_SNAPSHOT_VERSION,
+            "watermark": list(watermark),
+            "rows": rows,
+            "state": state,
+        }
+        self._save(snapshot)
+        self.last_mode = "full"
+        return state, cmp_by_position
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        if self._snapshot is None and self.path.exists():
+            try:
+                snapshot = json.loads(self.path.read_text())
+                if snapshot.get("version") == _LEDGER_SNAPSHOT_VERSION:
+                    snapshot["rows"] = {row[0]: tuple(row[1:]) for row in snapshot["rows"]}
+                    self._snapshot = snapshot
+            except Exception as e:
+                logger.warning("Ignoring unreadable ledger snapshot %s: %s", self.path, e)
+        return self._snapshot
+
+    def _save(self, snapshot: Dict[str, Any]) -> None:
+        self._snapshot = snapshot
+        self._unsaved_rows = 0
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            rows = [[row_id, *fingerprint] for row_id, fingerprint in snapshot["rows"].items()]
+            tmp_path.write_text(json.dumps({**snapshot, "rows": rows}))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning("Could not persist ledger snapshot %s: %s", self.path, e)
+
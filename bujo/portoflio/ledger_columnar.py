@@ -0,0 +1,348 @@
+"""Columnar implementation of the ledger folds in ``ledger.py``.
+
+Each field is parsed once per column (string columns once per distinct
+value), rows are ordered with a single ``lexsort`` and grouped by
+(portfolio, ticker) or ticker. Totals that do not depend on order are ``bincount`` sums,
+which add in row order and so match the row-by-row engine exactly; only
+positions that contain sells replay their own rows for average-cost or FIFO
+matching. ``position_views`` derives the requested views from one parsed frame.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bujo.portoflio.ledger import (
+    CASH_TICKER,
+    _buy_date,
+    normalize_portfolio,
+    normalize_ticker,
+    normalize_transaction_type,
+    parse_number,
+)
+
+_FIELDS = ["Id", "Date", "Ticker", "TransactionType", "NoOfShares", "CostPerShare", "CMP", "Portfolio", "Note"]
+
+
+def _normalize_column(values: pd.Series, func: Callable[[Any], str]) -> np.ndarray:
+    codes, uniques = pd.factorize(values)
+    table = np.array([func(value) for value in uniques] + [func(None)], dtype=object)
+    return table[codes]
+
+
+def _parse_numbers(values: pd.Series) -> np.ndarray:
+    numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float, copy=True)
+    pending = np.isnan(numbers)
+    if pending.any():
+        # Blanks and formatted strings ("1,000", "₹12") go through parse_number once per distinct value.
+        codes, uniques = pd.factorize(values[pending])
+        table = np.array([parse_number(value) for value in uniques] + [parse_number(None)], dtype=float)
+        numbers[pending] = table[codes]
+    return numbers
+
+
+def _row_ids(values: pd.Series) -> np.ndarray:
+    ids = pd.to_numeric(values, errors="coerce").fillna(0).to_numpy(dtype=float)
+    return np.trunc(ids).astype(np.int64)
+
+
+def load_frame(transactions: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Parse and normalise every field once, returned in ``transaction_sort_key`` order."""
+    raw = pd.DataFrame.from_records(list(transactions or []), columns=_FIELDS)
+    frame = pd.DataFrame({
+        "date": _normalize_column(raw["Date"], lambda v: str(v or "")[:10]),
+        "id": _row_ids(raw["Id"]),
+        "ticker": _normalize_column(raw["Ticker"], normalize_ticker),
+        "type": _normalize_column(raw["TransactionType"], normalize_transaction_type),
+        "shares": _parse_numbers(raw["NoOfShares"]),
+        "cost": _parse_numbers(raw["CostPerShare"]),
+        "cmp": _parse_numbers(raw["CMP"]),
+        "portfolio": _normalize_column(raw["Portfolio"], normalize_portfolio),
+        "note": _normalize_column(raw["Note"], lambda v: str(v or "").strip()),
+    })
+    date_rank, _ = pd.factorize(frame["date"], sort=True)
+    order = np.lexsort((frame["id"].to_numpy(), date_rank))
+    return frame.iloc[order].reset_index(drop=True)
+
+
+def latest_cmp(frame: pd.DataFrame) -> Dict[Tuple[str, str], float]:
+    priced = frame[
+        (frame["ticker"] != "")
+        & (frame["ticker"] != CASH_TICKER)
+        & (frame["shares"] > 0)
+        & (frame["cmp"] != 0)
+    ]
+    if priced.empty:
+        return {}
+    last = priced.groupby(["portfolio", "ticker"], sort=False)["cmp"].last()
+    return {key: float(value) for key, value in last.items()}
+
+
+class _Positions:
+    """Rows of one frame grouped by ``by`` columns, groups numbered by first appearance."""
+
+    def __init__(self, frame: pd.DataFrame, by: Tuple[str, ...] = ("portfolio", "ticker")):
+        self.frame = frame.reset_index(drop=True)
+        if self.frame.empty:
+            self.codes = np.empty(0, dtype=np.int64)
+            self.keys: List[Tuple[str, ...]] = []
+        else:
+            self.codes = self.frame.groupby(list(by), sort=False).ngroup().to_numpy()
+            _, first = np.unique(self.codes, return_index=True)
+            self.keys = list(zip(*(self.frame[column].to_numpy()[first].tolist() for column in by)))
+        kinds = self.frame["type"].to_numpy()
+        self.is_buy = kinds == "Buy"
+        self.is_sell = kinds == "Sell"
+        self.shares = self.frame["shares"].to_numpy()
+        self.costs = self.frame["cost"].to_numpy()
+        self.dates = self.frame["date"].to_numpy()
+
+    def total(self, values: np.ndarray, where: np.ndarray) -> List[float]:
+        return np.bincount(self.codes, weights=np.where(where, values, 0.0), minlength=len(self.keys)).tolist()
+
+    def split(self, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, List[int]]:
+        """Row positions (optionally masked) ordered by group, and slice bounds per group."""
+        rows = np.arange(len(self.codes)) if mask is None else np.flatnonzero(mask)
+        rows = rows[np.argsort(self.codes[rows], kind="stable")]
+        return rows, np.searchsorted(self.codes[rows], np.arange(len(self.keys) + 1)).tolist()
+
+    def notes(self) -> Tuple[List[Dict[str, str]], List[int]]:
+        notes = self.frame["note"].to_numpy()
+        rows, bounds = self.split(notes != "")
+        entries = [
+            {"date": date, "type": kind, "note": note}
+            for date, kind, note in zip(
+                self.dates[rows].tolist(), self.frame["type"].to_numpy()[rows].tolist(), notes[rows].tolist()
+            )
+        ]
+        return entries, bounds
+
+    def has_sells(self) -> List[bool]:
+        return (np.bincount(self.codes, weights=self.is_sell, minlength=len(self.keys)) > 0).tolist()
+
+
+def _fold_cash(frame: pd.DataFrame, state: Dict[str, Any], warnings: List[Tuple[int, str, str]]) -> None:
+    cash = frame[frame["ticker"] == CASH_TICKER]
+    if cash.empty:
+        return
+    shares = cash["shares"].to_numpy()
+    amount = np.where(shares != 0, shares, 1.0) * cash["cost"].to_numpy()
+    tx_type = cash["type"].to_numpy()
+    deposit = tx_type == "Deposit"
+    withdraw = np.isin(tx_type, ["Withdraw", "Withdrawal"])
+    signed = np.where(deposit, amount, np.where(withdraw, -amount, 0.0))
+    codes, names = pd.factorize(cash["portfolio"])
+    for name, total in zip(names, np.bincount(codes, weights=signed).tolist()):
+        state["portfolios"][name]["cash"] = total
+    unknown = ~deposit & ~withdraw & (amount != 0)
+    for pos, portfolio, kind in zip(cash.index[unknown], cash["portfolio"][unknown], tx_type[unknown]):
+        warnings.append((pos, portfolio, f"Unknown CASH transaction type {kind!r} in {portfolio}"))
+
+
+def _replay_average_cost(shares: List[float], costs: List[float], buys: List[bool], sells: List[bool]) -> Tuple[float, float, float]:
+    open_shares = open_cost = realised_basis = 0.0
+    for qty, cost, is_buy, is_sell in zip(shares, costs, buys, sells):
+        if is_buy:
+            open_shares += qty
+            open_cost += qty * cost
+        elif is_sell:
+            matched = min(qty, open_shares)
+            if matched > 0:
+                avg_open = open_cost / open_shares
+                open_shares -= matched
+                open_cost -= matched * avg_open
+                realised_basis += matched * avg_open
+                if abs(open_shares) < 1e-9:
+                    open_shares = open_cost = 0.0
+    return open_shares, open_cost, realised_basis
+
+
+def _stock_rows(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame[(frame["ticker"] != "") & (frame["ticker"] != CASH_TICKER) & (frame["shares"] > 0)]
+
+
+def _fifo_lots(rows: range, buys: List[bool], sells: List[bool], shares: List[float], lot_for: Callable[[int], List[Any]]) -> List[List[Any]]:
+    """Replay one group's rows; lots are lists whose second item is the open share count."""
+    lots: List[List[Any]] = []
+    for j in rows:
+        if buys[j]:
+            lots.append(lot_for(j))
+        elif sells[j]:
+            remaining_to_sell = shares[j]
+            while remaining_to_sell > 1e-9 and lots:
+                consumed = min(remaining_to_sell, lots[0][1])
+                lots[0][1] -= consumed
+                remaining_to_sell -= consumed
+                if lots[0][1] <= 1e-9:
+                    lots.pop(0)
+    return [lot for lot in lots if lot[1] > 1e-9]
+
+
+def _ledger_state(frame: pd.DataFrame) -> Dict[str, Any]:
+    frame = frame[frame["ticker"] != ""]
+    state: Dict[str, Any] = {"portfolios": {}, "warnings": []}
+    for name in pd.unique(frame["portfolio"]):
+        state["portfolios"][name] = {"cash": 0.0, "positions": {}, "warnings": []}
+
+    warnings: List[Tuple[int, str, str]] = []
+    _fold_cash(frame, state, warnings)
+
+    stock = frame[frame["ticker"] != CASH_TICKER]
+    skipped = stock[stock["shares"] <= 0]
+    for pos, row in zip(skipped.index, skipped.itertuples(index=False)):
+        warnings.append((pos, row.portfolio, f"Skipped {row.ticker} {row.type} in {row.portfolio}: shares must be positive"))
+    valid = stock[stock["shares"] > 0]
+    unknown = valid[~valid["type"].isin(["Buy", "Sell"])]
+    for pos, row in zip(unknown.index, unknown.itertuples(index=False)):
+        warnings.append((pos, row.portfolio, f"Unknown stock transaction type {row.type!r} for {row.ticker} in {row.portfolio}"))
+
+    g = _Positions(valid)
+    total_bought = g.total(g.shares, g.is_buy)
+    buy_cost = g.total(g.shares * g.costs, g.is_buy)
+    total_sold = g.total(g.shares, g.is_sell)
+    sell_proceeds = g.total(g.shares * g.costs, g.is_sell)
+
+    rows, bounds = g.split()
+    shares, costs = g.shares[rows].tolist(), g.costs[rows].tolist()
+    buys, sells = g.is_buy[rows].tolist(), g.is_sell[rows].tolist()
+    notes, note_bounds = g.notes()
+    dated = g.dates != ""
+    buy_rows, buy_bounds = g.split(g.is_buy & dated)
+    buy_dates = g.dates[buy_rows].tolist()
+    buy_lots = [list(lot) for lot in zip(buy_dates, g.shares[buy_rows].tolist(), g.costs[buy_rows].tolist())]
+    sell_rows, sell_bounds = g.split(g.is_sell & dated)
+    sell_dates = g.dates[sell_rows].tolist()
+
+    for i, (key, has_sells) in enumerate(zip(g.keys, g.has_sells())):
+        lo, hi = bounds[i], bounds[i + 1]
+        if has_sells:
+            open_shares, open_cost, realised = _replay_average_cost(
+                shares[lo:hi], costs[lo:hi], buys[lo:hi], sells[lo:hi]
+            )
+        else:
+            open_shares, open_cost, realised = total_bought[i], buy_cost[i], 0.0
+        portfolio_name, ticker = key
+        state["portfolios"][portfolio_name]["positions"][ticker] = {
+            "total_bought": total_bought[i],
+            "total_sold": total_sold[i],
+            "buy_cost_native": buy_cost[i],
+            "open_cost_native": open_cost,
+            "open_shares": open_shares,
+            "realised_cost_basis_native": realised,
+            "sell_proceeds_native": sell_proceeds[i],
+            "notes": notes[note_bounds[i]:note_bounds[i + 1]],
+            "buy_dates": buy_dates[buy_bounds[i]:buy_bounds[i + 1]],
+            "sell_dates": sell_dates[sell_bounds[i]:sell_bounds[i + 1]],
+            "all_buy_lots": buy_lots[buy_bounds[i]:buy_bounds[i + 1]],
+        }
+
+    for _, portfolio_name, msg in sorted(warnings, key=lambda item: item[0]):
+        state["portfolios"][portfolio_name]["warnings"].append(msg)
+        state["warnings"].append(msg)
+    return state
+
+
+def _positions_by_portfolio(valid: pd.DataFrame) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    result: Dict[str, Dict[str, Dict[str, Any]]] = {name: {} for name in pd.unique(valid["portfolio"])}
+
+    g = _Positions(valid)
+    total_bought = g.total(g.shares, g.is_buy)
+    total_sold = g.total(g.shares, g.is_sell)
+    sell_proceeds = g.total(g.shares * g.costs, g.is_sell)
+
+    rows, bounds = g.split()
+    dates, shares, costs = g.dates[rows].tolist(), g.shares[rows].tolist(), g.costs[rows].tolist()
+    buys, sells = g.is_buy[rows].tolist(), g.is_sell[rows].tolist()
+    notes, note_bounds = g.notes()
+    sell_rows, sell_bounds = g.split(g.is_sell & (g.dates != ""))
+    sell_dates = g.dates[sell_rows].tolist()
+
+    for i, (portfolio, ticker) in enumerate(g.keys):
+        open_lots = _fifo_lots(
+            range(bounds[i], bounds[i + 1]), buys, sells, shares,
+            lambda j: [dates[j], shares[j], costs[j]],
+        )
+        net = sum(lot[1] for lot in open_lots)
+        if net <= 0:
+            continue
+        total_invested = sum(lot[1] * lot[2] for lot in open_lots)
+        result[portfolio][ticker] = {
+            "net_shares": net,
+            "avg_cost": total_invested / net,
+            "total_invested": total_invested,
+            "buy_dates": sorted(lot[0] for lot in open_lots if lot[0]),
+            "sell_dates": sorted(sell_dates[sell_bounds[i]:sell_bounds[i + 1]]),
+            "total_bought": total_bought[i],
+            "total_sold": total_sold[i],
+            "sell_proceeds": sell_proceeds[i],
+            "all_buy_lots": sorted(
+                ((lot[0], lot[1], lot[2]) for lot in open_lots if lot[0]),
+                key=lambda x: x[0],
+            ),
+            "notes": sorted(
+                notes[note_bounds[i]:note_bounds[i + 1]],
+                key=lambda item: ((item.get("date") or ""), (item.get("type") or "")),
+                reverse=True,
+            ),
+        }
+    return result
+
+
+def _open_positions(valid: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    g = _Positions(valid, by=("ticker",))
+    rows, bounds = g.split()
+    shares, costs = g.shares[rows].tolist(), g.costs[rows].tolist()
+    buys, sells = g.is_buy[rows].tolist(), g.is_sell[rows].tolist()
+    codes, uniques = pd.factorize(g.dates[rows])
+    dates = [_buy_date(value) for value in uniques]
+    buy_dates = [dates[code] for code in codes.tolist()]
+    notes = g.frame["note"].to_numpy()[rows].tolist()
+    cmps = g.frame["cmp"].to_numpy()
+
+    priced_rows, priced_bounds = g.split(cmps != 0)
+    priced_cmp = cmps[priced_rows].tolist()
+
+    open_positions: Dict[str, Dict[str, Any]] = {}
+    for i, (ticker,) in enumerate(g.keys):
+        # Lots are [date, shares, cost, note] so _fifo_lots can track shares at index 1.
+        lots = _fifo_lots(
+            range(bounds[i], bounds[i + 1]), buys, sells, shares,
+            lambda j: [buy_dates[j], shares[j], costs[j], notes[j]],
+        )
+        net_shares = sum(lot[1] for lot in lots)
+        if net_shares <= 0:
+            continue
+        lot_dates = [lot[0] for lot in lots if lot[0]]
+        lot_notes = [lot[3] for lot in lots if lot[3]]
+        lo, hi = priced_bounds[i], priced_bounds[i + 1]
+        open_positions[ticker] = {
+            "net_shares": net_shares,
+            "avg_cost": sum(lot[1] * lot[2] for lot in lots) / net_shares,
+            "cmp": priced_cmp[hi - 1] if hi > lo else 0.0,
+            "oldest_buy_date": min(lot_dates) if lot_dates else None,
+            "note": lot_notes[-1] if lot_notes else "",
+        }
+    return open_positions
+
+
+def position_views(transactions: List[Dict[str, Any]], views: Tuple[str, ...]) -> Dict[str, Any]:
+    """Columnar counterpart of ``ledger.build_position_views``, sharing one parsed frame."""
+    frame = load_frame(transactions)
+    valid = _stock_rows(frame)
+    state = _ledger_state(frame) if "state" in views or "cash_by_portfolio" in views else None
+    builders = {
+        "state": lambda: state,
+        "cmp": lambda: latest_cmp(frame),
+        "positions_by_portfolio": lambda: _positions_by_portfolio(valid),
+        "open_positions": lambda: _open_positions(valid),
+        "cash_by_portfolio": lambda: {name: folded["cash"] for name, folded in state["portfolios"].items()},
+    }
+    return {view: builders[view]() for view in views}
+
+
+def ledger_inputs(transactions: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[Tuple[str, str], float]]:
+    """Fold state and latest CMPs for ``ledger._finalize_ledger`` from one parse of the rows."""
+    frame = load_frame(transactions)
+    return _ledger_state(frame), latest_cmp(frame)
+
@@ -0,0 +1,85 @@
+"""Persistent cache of per-headline LLM results.
+
+Consecutive alert runs overlap heavily (the news window is 48 hours), so most
+headlines were already classified the day before. Entries are keyed by a hash
+of (prompt version, ticker, headline) and evicted once older than
+``max_age_days``.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PATH = Path(tempfile.gettempdir()) / "news_llm_cache.json"
+_DEFAULT_MAX_AGE_DAYS = float(os.environ.get("NEWS_LLM_CACHE_DAYS", "7"))
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).lower().split())
+
+
+def cache_key(*parts: Any) -> str:
+    return hashlib.sha1("\x1f".join(_normalize(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+class LLMResultCache:
+    """Thread-safe JSON-file cache. Load lazily, call ``save()`` once per run."""
+
+    def __init__(self, path: Path = _DEFAULT_PATH, max_age_days: float = _DEFAULT_MAX_AGE_DAYS):
+        self.path = Path(path)
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            entries: Dict[str, Dict[str, Any]] = {}
+            if self.path.exists():
+                try:
+                    entries = json.loads(self.path.read_text())
+                except Exception as e:
+                    logger.warning("Ignoring unreadable LLM cache %s: %s", self.path, e)
+            self._entries = entries
+            self._evict()
+        return self._entries
+
+    def _evict(self) -> None:
+        cutoff = time.time() - self.max_age
+        stale = [k for k, v in self._entries.items() if v.get("t", 0) < cutoff]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self._dirty = True
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._load().get(key)
+            return entry["v"] if entry else None
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._load()[key] = {"t": time.time(), "v": value}
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if self._entries is None or not self._dirty:
+                return
+            self._evict()
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix(".tmp")
+                tmp_path.write_text(json.dumps(self._entries))
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception as e:
+                logger.warning("Could not persist LLM cache %s: %s", self.path, e)
@@ -1,12 +1,17 @@
+import asyncio
 import json
 import logging
+import os
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 import yfinance as yf
 
 from bujo.models.portfolio_transactions import PortfolioTransactions
-from bujo.portoflio.ledger import build_portfolio_ledger
+from bujo.portoflio.ledger import IncrementalLedger
+from bujo.portoflio.quotes import fetch_quotes, fetch_usd_to_inr, last_price
 from bujo.base import llm
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.tools import Tool
@@ -20,6 +25,9 @@ except Exception:
 
 logger = logging.getLogger(__name__)
 
+# Dashboard tab switches are served from this snapshot; writes invalidate it.
+_DASHBOARD_TTL_SECONDS = float(os.environ.get("PORTFOLIO_DASHBOARD_TTL_SECONDS", "120"))
+
 SYSTEM_PROMPT = [
     "You are a portfolio transactions assistant. You handle two use cases using two tools.",
     "⚠️ CRITICAL: You MUST always call a tool. NEVER fabricate results. To add a transaction call `Transaction_Creation`. To list transactions call `Transaction_Lookup`.",
@@ -68,16 +76,22 @@ SYSTEM_PROMPT = [
 class PortfolioManager:
     def __init__(self, transactions_model: PortfolioTransactions):
         self.transactions_model = transactions_model
+        self.ledger = IncrementalLedger()
+        self._dashboards: Dict[Any, Tuple[float, Dict]] = {}
+        self._dashboards_lock = threading.Lock()
+        self._dashboards_generation = 0  # bumped by every invalidation
 
         tools = [
             Tool(
                 name="Transaction_Lookup",
                 func=self.transactions_model.list,
+                coroutine=self.transactions_model.alist,
                 description="Fetch portfolio transactions based on filters.",
             ),
             Tool(
                 name="Transaction_Creation",
                 func=self.add_transaction,
+                coroutine=self.aadd_transaction,
                 description="Create a new portfolio transaction.",
             ),
         ]
@@ -124,6 +138,37 @@ class PortfolioManager:
                 logger.error("Error in agent_portfolio: %s", e, exc_info=True)
                 return "An error occurred while processing your request."
 
+    async def aagent_portfolio(self, prompt: str) -> str:
+        """Coroutine twin of ``agent_portfolio`` for callers on the event loop."""
+        text = prompt.strip()
+        logger.info("Received prompt: %s", text)
+        for attempt in range(2):
+            try:
+                result = await self.agent.ainvoke(
+                    {"messages": [HumanMessage(content=text)]},
+                    config={"configurable": {"thread_id": "portfolio"}},
+                )
+                output = result["messages"][-1].content
+                logger.info("Agent response: %s", output)
+                return output
+            except ValueError as e:
+                if "INVALID_CHAT_HISTORY" in str(e) and attempt == 0:
+                    logger.warning("Corrupt portfolio chat history — resetting memory and retrying.")
+                    self._build_agent()
+                    continue
+                logger.error("Error in aagent_portfolio: %s", e, exc_info=True)
+                return "An error occurred while processing your request."
+            except GraphRecursionError as e:
+                logger.error("Error in aagent_portfolio: %s", e, exc_info=True)
+                return "I got stuck in a loop trying to process that — could you rephrase or be more specific?"
+            except Exception as e:
+                logger.error("Error in aagent_portfolio: %s", e, exc_info=True)
+                return "An error occurred while processing your request."
+
+    async def aadd_transaction(self, data: str) -> str:
+        # The offsetting CASH row may need a yfinance FX lookup, which has no async API.
+        return await asyncio.to_thread(self.add_transaction, data)
+
     def add_transaction(self, data: str) -> str:
         logger.info("Adding transaction with data: %s", data)
         try:
@@ -198,6 +243,9 @@ class PortfolioManager:
         except Exception as e:
             logger.error("Error in add_transaction: %s", e, exc_info=True)
             return "Failed to add transaction due to an error."
+        finally:
+            # After the last write: a snapshot built between the stock and CASH rows would miss the cash leg.
+            self.invalidate_dashboards()
 
     @staticmethod
     def _normalize_transaction_type(value) -> str:
@@ -221,31 +269,69 @@ class PortfolioManager:
         return float(cleaned)
 
     def update_cmp(self) -> str:
-        """Fetch latest prices from yfinance and update all transaction rows in NocoDB."""
+        """Fetch latest prices in one batched download and update all transaction rows in NocoDB."""
         transactions = self.transactions_model.list()
-        tickers = {
-            tx.get("Ticker") for tx in transactions
-            if tx.get("Ticker") and tx.get("Ticker", "").upper() != "CASH"
-        }
-        if not tickers:
+        rows_by_ticker: Dict[str, List[Dict]] = {}
+        for tx in transactions:
+            ticker = tx.get("Ticker")
+            if ticker and ticker.upper() != "CASH":
+                rows_by_ticker.setdefault(ticker, []).append(tx)
+        if not rows_by_ticker:
             return "No tickers found in transactions table."
-        for ticker in tickers:
-            cmp = yf.Ticker(ticker).info.get("currentPrice", 0)
-            for tx in transactions:
-                if tx.get("Ticker") == ticker:
-                    tx["CMP"] = cmp
-                    self.transactions_model.update(tx)
+        prices = fetch_quotes(rows_by_ticker)
+        changes: List[Dict] = []
+        unpriced: List[str] = []
+        for ticker, rows in rows_by_ticker.items():
+            cmp = last_price(prices, ticker)
+            if not cmp:
+                logger.warning("No price for %s; leaving CMP unchanged", ticker)
+                unpriced.append(ticker)
+                continue
+            changes.extend({"Id": tx.get("Id"), "CMP": cmp} for tx in rows if tx.get("CMP") != cmp)
             logger.info("Updated CMP for %s: %s", ticker, cmp)
-        return "✅ CMP values updated for all tickers."
+        written = self.transactions_model.bulk_update(changes) if changes else 0
+        if written:
+            self.invalidate_dashboards()
+        if not unpriced and written == len(changes):
+            return "✅ CMP values updated for all tickers."
+        lines = [f"⚠️ CMP update incomplete: {written} of {len(changes)} changed rows saved."]
+        if written < len(changes):
+            lines.append("Some rows could not be saved to NocoDB; check the logs and run the update again.")
+        if unpriced:
+            lines.append(f"No price for {len(unpriced)} of {len(rows_by_ticker)} tickers, left unchanged: {', '.join(sorted(unpriced))}.")
+        return "\n".join(lines)
 
-    def get_dashboard_data(self) -> Dict:
-        """Return a compact portfolio snapshot for Telegram dashboard views."""
+    def invalidate_dashboards(self) -> None:
+        with self._dashboards_lock:
+            self._dashboards.clear()
+            self._dashboards_generation += 1
+
+    def get_dashboard_data(self, user_id: Optional[Any] = None, refresh: bool = False) -> Dict:
+        """Return a compact portfolio snapshot for Telegram dashboard views.
+
+        Snapshots are cached per user for ``PORTFOLIO_DASHBOARD_TTL_SECONDS`` so
+        tab navigation does not refetch transactions and FX; ``refresh`` forces a rebuild.
+        """
+        with self._dashboards_lock:
+            cached = None if refresh else self._dashboards.get(user_id)
+            generation = self._dashboards_generation
+        if cached and time.monotonic() - cached[0] < _DASHBOARD_TTL_SECONDS:
+            return cached[1]
+
+        dashboard = self._build_dashboard_data()
+        with self._dashboards_lock:
+            # A write invalidated the cache mid-build, so this snapshot may predate it.
+            if self._dashboards_generation == generation:
+                self._dashboards[user_id] = (time.monotonic(), dashboard)
+        return dashboard
+
+    def _build_dashboard_data(self) -> Dict:
         transactions = self.transactions_model.list()
         if not transactions:
             return {"as_of": datetime.now(), "portfolios": {}, "totals": {}, "holdings": [], "risk_flags": []}
 
         usd_to_inr = self._get_usd_to_inr()
-        ledger = build_portfolio_ledger(transactions, fx_rates={"USD": usd_to_inr})
+        ledger = self.ledger.build(transactions, fx_rates={"USD": usd_to_inr})
         holdings = ledger.get("holdings", [])
         totals = ledger.get("totals", {})
 
@@ -270,11 +356,7 @@ class PortfolioManager:
 
     @staticmethod
     def _get_usd_to_inr() -> float:
-        usd_inr_ticker = yf.Ticker("USDINR=X")
-        return (
-            usd_inr_ticker.info.get("regularMarketPrice")
-            or usd_inr_ticker.fast_info.get("lastPrice", 84.0)
-        )
+        return fetch_usd_to_inr()
 
     def get_profit_loss_report(self) -> str:
         """Compute P&L across all portfolio positions and return a formatted Markdown string.
@@ -288,7 +370,7 @@ class PortfolioManager:
 
         usd_to_inr = self._get_usd_to_inr()
         logger.info("USD → INR rate: %s", usd_to_inr)
-        ledger = build_portfolio_ledger(transactions, fx_rates={"USD": usd_to_inr})
+        ledger = self.ledger.build(transactions, fx_rates={"USD": usd_to_inr})
 
         open_tickers: List[Dict] = []
         closed_tickers: List[Dict] = []
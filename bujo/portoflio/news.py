@@ -0,0 +1,186 @@
+"""Google News RSS fetcher shared by portfolio alerts and rebalance.
+
+Every caller asks for the same ``"<company>" OR "<symbol>" stock`` query, so
+one parsed feed per query is kept in memory and on disk for ``NEWS_CACHE_MINUTES``.
+Stale entries are revalidated with ETag / Last-Modified conditional requests,
+and concurrent callers for the same query share a single download.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.parse
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+_NEWS_CACHE_DIR = Path(tempfile.gettempdir()) / "news_cache"
+_NEWS_CACHE_TTL_SECONDS = float(os.environ.get("NEWS_CACHE_MINUTES", "30")) * 60
+_NEWS_TIMEOUT = 10
+_MAX_IN_FLIGHT = 4  # concurrent requests to news.google.com
+_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_in_flight = threading.BoundedSemaphore(_MAX_IN_FLIGHT)
+_memory: Dict[str, Dict[str, Any]] = {}
+_query_locks: Dict[str, threading.Lock] = {}
+_query_locks_guard = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_MAX_IN_FLIGHT)
+                session.mount("https://", adapter)
+                session.headers.update(_HEADERS)
+                _session = session
+    return _session
+
+
+def news_query_url(company_name: str, ticker: str) -> str:
+    clean_ticker = re.sub(r"\.(NS|BO)$", "", ticker, flags=re.IGNORECASE)
+    query = urllib.parse.quote(f'"{company_name}" OR "{clean_ticker}" stock')
+    return f"https://news.google.com/rss/search?q={query}&hl=en-IN&gl=IN&ceid=IN:en"
+
+
+def _dedup_key(title: str) -> str:
+    # Google News appends " - <Publisher>"; the same story syndicated by two
+    # outlets should only count once.
+    base = title.rsplit(" - ", 1)[0] if " - " in title else title
+    return " ".join(base.lower().split())
+
+
+def _parse_feed(content: bytes) -> List[Dict[str, Any]]:
+    root = ET.fromstring(content)
+    items: List[Dict[str, Any]] = []
+    seen = set()
+    for item in root.findall(".//item"):
+        title = (item.findtext("title") or "").strip()
+        if not title:
+            continue
+        key = _dedup_key(title)
+        if key in seen:
+            continue
+        seen.add(key)
+        published = None
+        try:
+            published = parsedate_to_datetime(item.findtext("pubDate", "")).replace(tzinfo=None).isoformat()
+        except Exception:
+            pass
+        items.append({"title": title, "link": (item.findtext("link") or "").strip(), "published": published})
+    return items
+
+
+def _cache_file(url: str) -> Path:
+    return _NEWS_CACHE_DIR / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json"
+
+
+def _load_entry(url: str) -> Optional[Dict[str, Any]]:
+    entry = _memory.get(url)
+    if entry is not None:
+        return entry
+    cache_file = _cache_file(url)
+    if cache_file.exists():
+        try:
+            entry = json.loads(cache_file.read_text())
+            _memory[url] = entry
+            return entry
+        except Exception:
+            return None
+    return None
+
+
+def _store_entry(url: str, entry: Dict[str, Any]) -> None:
+    _memory[url] = entry
+    try:
+        _NEWS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_file = _cache_file(url)
+        tmp_file = cache_file.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps(entry))
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        logger.debug("News cache write failed for %s: %s", url, e)
+
+
+def _query_lock(url: str) -> threading.Lock:
+    with _query_locks_guard:
+        return _query_locks.setdefault(url, threading.Lock())
+
+
+def _feed_items(url: str) -> Optional[List[Dict[str, Any]]]:
+    """Parsed, de-duplicated items for one feed URL, or None when unavailable."""
+    with _query_lock(url):
+        entry = _load_entry(url)
+        if entry and time.time() - entry.get("fetched_at", 0) < _NEWS_CACHE_TTL_SECONDS:
+            return entry["items"]
+
+        headers: Dict[str, str] = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            with _in_flight:
+                resp = _get_session().get(url, headers=headers, timeout=_NEWS_TIMEOUT)
+            if resp.status_code == 304 and entry:
+                entry = {**entry, "fetched_at": time.time()}
+            else:
+                resp.raise_for_status()
+                entry = {
+                    "fetched_at": time.time(),
+                    "etag": resp.headers.get("ETag"),
+                    "last_modified": resp.headers.get("Last-Modified"),
+                    "items": _parse_feed(resp.content),
+                }
+        except Exception as e:
+            logger.debug("News feed request failed for %s: %s", url, e)
+            # A stale copy beats no news at all.
+            return entry["items"] if entry else None
+        _store_entry(url, entry)
+        return entry["items"]
+
+
+def fetch_news_items(
+    company_name: str,
+    ticker: str,
+    lookback_hours: int,
+    limit: int,
+) -> Optional[List[Dict[str, Any]]]:
+    """Recent headlines for a holding, newest feed order first.
+
+    The first ``limit`` feed items are considered and anything published
+    before the lookback window is dropped; items with an unparseable date are
+    kept. Returns None if the feed could not be fetched and nothing is cached.
+    """
+    items = _feed_items(news_query_url(company_name, ticker))
+    if items is None:
+        return None
+    cutoff = datetime.now() - timedelta(hours=lookback_hours)
+    recent: List[Dict[str, Any]] = []
+    for item in items[:limit]:
+        published = item.get("published")
+        if published:
+            try:
+                if datetime.fromisoformat(published) < cutoff:
+                    continue
+            except ValueError:
+                pass
+        recent.append(item)
+    return recent
@@ -0,0 +1,233 @@
+"""Token-budgeted assembly of a prompt from markdown sections.
+
+Each section has a priority and a ladder of compaction steps. Sections are
+measured with tiktoken. When the total is over budget, the first pass applies
+lossless compaction (trimmed whitespace, narrow table rules) to every section,
+lowest priority first. If the prompt is still too long, the second pass walks
+the lossy steps of the non-required sections, again lowest priority first:
+dropping trailing table rows or ``###`` entries, then omitting the section.
+Each step is kept only while the prompt is over budget, so higher-priority
+sections are touched only after everything below them is exhausted.
+
+``compile_prompt`` returns the text with one report row per section (tokens
+before and after, and what was done), which ``budget_report_markdown`` turns
+into a table for the saved input prompt.
+"""
+
+import logging
+import math
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_FALLBACK_ENCODING = "o200k_base"
+_CHARS_PER_TOKEN = 4  # used only when tiktoken or its encoding files are unavailable
+
+_TABLE_RULE_RE = re.compile(r"^\|(\s*:?-+:?\s*\|)+\s*$")
+_SPACES_RE = re.compile(r"[ \t]{2,}")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_ROWS_OMITTED_RE = re.compile(r"^_(\d+) lower-ranked rows omitted to fit the prompt budget\._$")
+_ENTRIES_OMITTED_RE = re.compile(r"\n*_(\d+) further entries omitted to fit the prompt budget\._\n*$")
+
+_encoding: Any = None
+_encoding_name: Optional[str] = None
+_encoding_lock = threading.Lock()
+
+Step = Tuple[str, Callable[[str], str]]  # action label, text -> text
+
+
+# ── Token counting ───────────────────────────────────────────────────────────
+
+def _load_encoding(model: str) -> None:
+    global _encoding, _encoding_name
+    with _encoding_lock:
+        if _encoding_name is not None:
+            return
+        try:
+            import tiktoken
+
+            try:
+                _encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encoding = tiktoken.get_encoding(_FALLBACK_ENCODING)
+            _encoding_name = f"tiktoken {_encoding.name}"
+        except Exception as e:
+            # Offline hosts cannot fetch the BPE files; a length estimate still keeps the budget meaningful.
+            logger.warning("tiktoken unavailable (%s); estimating %d characters per token", e, _CHARS_PER_TOKEN)
+            _encoding = None
+            _encoding_name = f"estimate ({_CHARS_PER_TOKEN} chars/token)"
+
+
+def count_tokens(text: str, model: str) -> int:
+    _load_encoding(model)
+    if _encoding is None:
+        return math.ceil(len(text) / _CHARS_PER_TOKEN)
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def token_counter_name(model: str) -> str:
+    _load_encoding(model)
+    return _encoding_name
+
+
+# ── Compaction steps ─────────────────────────────────────────────────────────
+
+def compact_whitespace(text: str) -> str:
+    """Lossless: trim padding, narrow table rules to ``|-|`` and collapse blank runs."""
+    lines = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if _TABLE_RULE_RE.match(line):
+            line = "|" + "-|" * (line.count("|") - 1)
+        elif line.startswith("|"):
+            line = _SPACES_RE.sub(" ", line)
+        lines.append(line)
+    compacted = _BLANK_LINES_RE.sub("\n\n", "\n".join(lines))
+    return compacted + "\n" if text.endswith("\n") else compacted
+
+
+def _is_table_row(line: str) -> bool:
+    return line.startswith("|")
+
+
+def keep_table_rows(fraction: float) -> Callable[[str], str]:
+    """Keep the leading ``fraction`` of each table's data rows; tables are assumed ranked best-first.
+
+    The fraction is of the original rows: an omission note left by an earlier
+    step is folded back into the count and replaced.
+    """
+
+    def step(text: str) -> str:
+        lines, out, i = text.splitlines(), [], 0
+        while i < len(lines):
+            if not (_is_table_row(lines[i]) and i + 1 < len(lines) and _TABLE_RULE_RE.match(lines[i + 1])):
+                out.append(lines[i])
+                i += 1
+                continue
+            end = i + 2
+            while end < len(lines) and _is_table_row(lines[end]):
+                end += 1
+            rows = lines[i + 2:end]
+            noted = _ROWS_OMITTED_RE.match(lines[end]) if end < len(lines) else None
+            original = len(rows) + (int(noted.group(1)) if noted else 0)
+            keep = min(len(rows), max(1, math.ceil(original * fraction))) if rows else 0
+            out.extend(lines[i:i + 2] + rows[:keep])
+            if original > keep:
+                out.append(f"_{original - keep} lower-ranked rows omitted to fit the prompt budget._")
+            i = end + 1 if noted else end
+        return "\n".join(out) + ("\n" if text.endswith("\n") else "")
+
+    return step
+
+
+def keep_subsections(fraction: float) -> Callable[[str], str]:
+    """Keep the leading ``fraction`` of the ``###`` entries, dropping the rest.
+
+    As with ``keep_table_rows`` the fraction is of the original entries.
+    """
+
+    def step(text: str) -> str:
+        parts = re.split(r"(?m)^(?=### )", text)
+        head, entries = parts[0], parts[1:]
+        if not entries:
+            return text
+        noted = _ENTRIES_OMITTED_RE.search(entries[-1])
+        original = len(entries) + (int(noted.group(1)) if noted else 0)
+        keep = max(1, math.ceil(original * fraction))
+        if keep >= len(entries):
+            return text
+        omitted = original - keep
+        return head + "".join(entries[:keep]).rstrip("\n") + (
+            f"\n\n_{omitted} further entries omitted to fit the prompt budget._\n"
+        )
+
+    return step
+
+
+TABLE_STEPS: List[Step] = [
+    ("kept top 50% of table rows", keep_table_rows(0.5)),
+    ("kept top 25% of table rows", keep_table_rows(0.25)),
+]
+ENTRY_STEPS: List[Step] = [
+    ("kept first 50% of entries", keep_subsections(0.5)),
+    ("kept first 25% of entries", keep_subsections(0.25)),
+]
+
+
+# ── Compiler ─────────────────────────────────────────────────────────────────
+
+def section(name: str, text: str, priority: int, steps: Optional[List[Step]] = None, required: bool = False) -> Dict[str, Any]:
+    """One prompt section. Higher ``priority`` survives longer; ``required`` sections are never cut."""
+    return {"name": name, "text": text, "priority": priority, "steps": list(steps or []), "required": required}
+
+
+def compile_prompt(
+    sections: List[Dict[str, Any]], budget: int, model: str
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """Join ``sections`` in order, compacted to ``budget`` tokens (0 = unlimited).
+
+    Returns the prompt and one report row per section with ``name``,
+    ``priority``, ``tokens_before``, ``tokens`` and ``actions``.
+    """
+    rows = [
+        {**s, "tokens_before": count_tokens(s["text"], model), "actions": []}
+        for s in sections
+    ]
+    for row in rows:
+        row["tokens"] = row["tokens_before"]
+
+    def total() -> int:
+        return sum(row["tokens"] for row in rows)
+
+    def apply(row: Dict[str, Any], label: str, fn: Callable[[str], str]) -> None:
+        text = fn(row["text"])
+        if text == row["text"]:
+            return
+        row["text"] = text
+        row["tokens"] = count_tokens(text, model)
+        row["actions"].append(label)
+
+    by_priority = sorted(rows, key=lambda row: row["priority"])
+    if budget and total() > budget:
+        for row in by_priority:
+            apply(row, "compacted", compact_whitespace)
+            if total() <= budget:
+                break
+    if budget and total() > budget:
+        for row in (r for r in by_priority if not r["required"]):
+            omit = ("omitted", lambda _text, name=row["name"]: f"_{name}: omitted to fit the prompt budget._\n")
+            for label, fn in [*row["steps"], omit]:
+                if total() <= budget:
+                    break
+                apply(row, label, fn)
+            if total() <= budget:
+                break
+    if budget and total() > budget:
+        logger.warning("Prompt is %d tokens after compaction, over the %d token budget", total(), budget)
+
+    report = [
+        {key: row[key] for key in ("name", "priority", "required", "tokens_before", "tokens", "actions")}
+        for row in rows
+    ]
+    return "\n".join(row["text"] for row in rows), report
+
+
+def budget_report_markdown(report: List[Dict[str, Any]], budget: int, model: str) -> str:
+    before = sum(row["tokens_before"] for row in report)
+    after = sum(row["tokens"] for row in report)
+    lines = [
+        "## Prompt Token Budget\n",
+        f"**Counter:** {token_counter_name(model)} | **Budget:** {f'{budget:,}' if budget else 'unlimited'} | "
+        f"**Measured:** {before:,} | **Sent:** {after:,}\n",
+        "| Section | Priority | Tokens (measured) | Tokens (sent) | Action |",
+        "|---------|----------|-------------------|---------------|--------|",
+    ]
+    for row in report:
+        priority = "required" if row["required"] else str(row["priority"])
+        lines.append(
+            f"| {row['name']} | {priority} | {row['tokens_before']:,} | {row['tokens']:,} | "
+            f"{'; '.join(row['actions']) or 'kept'} |"
+        )
+    return "\n".join(lines) + "\n"
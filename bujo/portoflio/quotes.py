@@ -0,0 +1,56 @@
+"""Batched quote fetching shared by CMP refresh, dashboards and price alerts.
+
+One ``yf.download`` call resolves every requested symbol (equities and FX
+pairs alike), which is far cheaper than a ``yf.Ticker(...).info`` round trip
+per ticker.
+"""
+
+import logging
+import math
+from typing import Iterable
+
+import pandas as pd
+import yfinance as yf
+
+logger = logging.getLogger(__name__)
+
+USD_INR_SYMBOL = "USDINR=X"
+DEFAULT_USD_TO_INR = 84.0
+
+
+def fetch_quotes(tickers: Iterable[str], period: str = "5d") -> pd.Series:
+    """Return the latest close for each ticker as a float Series indexed by ticker.
+
+    Symbols Yahoo could not price are NaN. A multi-day period is used so that
+    weekends and exchange holidays still resolve to the last traded close.
+    """
+    symbols = sorted({str(t).strip() for t in tickers if t and str(t).strip()})
+    empty = pd.Series(float("nan"), index=symbols, dtype=float)
+    if not symbols:
+        return empty
+    try:
+        raw = yf.download(symbols, period=period, progress=False, auto_adjust=True)
+    except Exception as e:
+        logger.error("Quote download failed for %d symbols: %s", len(symbols), e)
+        return empty
+    if raw is None or raw.empty or "Close" not in raw:
+        logger.warning("Quote download returned no data for %s", ", ".join(symbols))
+        return empty
+
+    close = raw["Close"]
+    if isinstance(close, pd.Series):
+        close = close.to_frame(name=symbols[0])
+    latest = close.ffill().iloc[-1]
+    return pd.to_numeric(latest, errors="coerce").reindex(symbols).astype(float)
+
+
+def last_price(prices: pd.Series, ticker: str, default: float = 0.0) -> float:
+    """Look up one ticker in a ``fetch_quotes`` result, falling back to ``default``."""
+    value = prices.get(ticker)
+    if value is None or math.isnan(value) or value <= 0:
+        return default
+    return float(value)
+
+
+def fetch_usd_to_inr() -> float:
+    return last_price(fetch_quotes([USD_INR_SYMBOL]), USD_INR_SYMBOL, DEFAULT_USD_TO_INR)
@@ -4,10 +4,11 @@ import math
 import os
 import re
 import tempfile
-import urllib.parse
-import xml.etree.ElementTree as ET
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import date, datetime, timedelta
-from email.utils import parsedate_to_datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -15,8 +16,9 @@ import requests
 import yfinance as yf
 
 from bujo.base import openai_model
-from bujo.portoflio.ledger import compute_cash_by_portfolio as _ledger_compute_cash_by_portfolio
-from bujo.portoflio.ledger import compute_positions_by_portfolio as _ledger_compute_positions_by_portfolio
+from bujo.portoflio.ledger import build_position_views
+from bujo.portoflio.news import fetch_news_items
+from bujo.portoflio.prompt_budget import ENTRY_STEPS, TABLE_STEPS, budget_report_markdown, compile_prompt, section
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,8 @@ _REBALANCE_MODEL         = os.environ.get("REBALANCE_OPENAI_MODEL", "gpt-5.4")
 # Pricing per 1M tokens in USD — update via env vars when OpenAI changes rates
 _PRICE_INPUT_PER_1M  = float(os.environ.get("REBALANCE_PRICE_INPUT_PER_1M",  "2.50"))
 _PRICE_OUTPUT_PER_1M = float(os.environ.get("REBALANCE_PRICE_OUTPUT_PER_1M", "15.00"))
+# Token budget for the rebalance user message; 0 only measures the sections.
+_REBALANCE_PROMPT_TOKEN_BUDGET = int(os.environ.get("REBALANCE_PROMPT_TOKEN_BUDGET", "40000"))
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Self-contained system prompt — derived from Graham/GARP/Quality-Moat/Forensic
@@ -584,36 +588,196 @@ def _cash_conversion_ratio(fin_data: List[Dict], cf_data: List[Dict]) -> Optiona
 
 
 # ──────────────────────────────────────────────
-# Transaction → Position aggregation
+# Concurrent fetch helpers
 # ──────────────────────────────────────────────
 
-def _compute_positions_by_portfolio(
-    transactions: List[Dict],
-) -> Dict[str, Dict[str, Dict]]:
-    """Aggregate stock transactions into open positions by portfolio.
+_FETCH_WORKERS = int(os.environ.get("REBALANCE_FETCH_WORKERS", "8"))
+# Per-host cap on in-flight requests so a wide fan-out does not get us throttled.
+# Google News has its own cap in bujo.portoflio.news.
+_HOST_CONCURRENCY = {"yahoo": 4, "screener.in": 2}
+_HOST_SEMAPHORES = {host: threading.BoundedSemaphore(n) for host, n in _HOST_CONCURRENCY.items()}
 
-    Delegates to the shared ledger module so rebalance, dashboards, and P&L
-    use the same transaction normalisation and average-cost logic.
+
+@contextmanager
+def _host_slot(host: str):
+    semaphore = _HOST_SEMAPHORES.get(host)
+    if semaphore is None:
+        yield
+        return
+    with semaphore:
+        yield
+
+
+def _map_concurrent(func, items, workers: Optional[int] = None) -> List[Any]:
+    """Apply func to every item on a bounded thread pool; results keep input order."""
+    items = list(items)
+    workers = max(1, min(workers or _FETCH_WORKERS, len(items)))
+    if workers == 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rebalance-fetch") as pool:
+        return list(pool.map(func, items))
+
+
+# ──────────────────────────────────────────────
+# Ticker data cache
+# ──────────────────────────────────────────────
+
+# Raw upstream payloads are cached per ticker on disk, one entry per field
+# group, so annual statements are not refetched on every run while prices stay
+# fresh. Derived metrics are always recomputed from the cached raw values.
+_TICKER_CACHE_DIR = Path(tempfile.gettempdir()) / "ticker_data_cache"
+_TICKER_CACHE_TTL_HOURS = {
+    "price":       float(os.environ.get("REBALANCE_PRICE_CACHE_HOURS", "4")),
+    "statements":  float(os.environ.get("REBALANCE_STATEMENTS_CACHE_HOURS", "720")),
+    "qualitative": float(os.environ.get("REBALANCE_QUALITATIVE_CACHE_HOURS", "168")),
+}
+_TICKER_CACHE_LOCK = threading.Lock()
+
+
+def _ticker_cache_file(ticker: str) -> Path:
+    return _TICKER_CACHE_DIR / f"{re.sub(r'[^A-Za-z0-9._-]', '_', ticker.upper())}.json"
+
+
+def _read_ticker_cache(ticker: str) -> Dict[str, Any]:
+    cache_file = _ticker_cache_file(ticker)
+    if not cache_file.exists():
+        return {}
+    try:
+        return json.loads(cache_file.read_text())
+    except Exception:
+        return {}
+
+
+def _cached_group(ticker: str, group: str, loader, force_refresh: bool = False, cacheable=None) -> Any:
+    """Return the cached raw payload for one field group, reloading when stale.
+
+    A payload that ``cacheable`` rejects (part of it failed to load) is used for
+    this run but not stored, so the next run retries instead of serving the gap
+    for the whole TTL.
     """
-    return _ledger_compute_positions_by_portfolio(transactions)
+    if not force_refresh:
+        entry = _read_ticker_cache(ticker).get(group)
+        max_age = _TICKER_CACHE_TTL_HOURS[group] * 3600
+        if entry and time.time() - entry.get("fetched_at", 0) < max_age:
+            return entry.get("data")
+
+    data = loader()
+    if data is None:
+        return None
+    if cacheable is not None and not cacheable(data):
+        return data
+    with _TICKER_CACHE_LOCK:
+        try:
+            _TICKER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            cache = _read_ticker_cache(ticker)
+            cache[group] = {"fetched_at": time.time(), "data": data}
+            cache_file = _ticker_cache_file(ticker)
+            tmp_file = cache_file.with_suffix(".tmp")
+            tmp_file.write_text(json.dumps(cache, default=str))
+            os.replace(tmp_file, cache_file)
+        except Exception as exc:
+            logger.debug("Ticker cache write failed for %s/%s: %s", ticker, group, exc)
+    return data
+
+
+def _monthly_closes(yf_obj, period: str) -> List[float]:
+    hist = yf_obj.history(period=period, interval="1mo")
+    if hist is None or hist.empty:
+        return []
+    return [float(v) for v in hist["Close"].tolist()]
+
+
+def _load_price_group(yf_obj) -> Dict[str, Any]:
+    """Quote snapshot (.info) plus monthly closes used for price CAGRs; closes are None if history failed."""
+    with _host_slot("yahoo"):
+        info = yf_obj.info or {}
+        try:
+            closes_5y = _monthly_closes(yf_obj, "5y")
+            closes_1y = _monthly_closes(yf_obj, "1y") if closes_5y else []
+        except Exception as exc:
+            logger.debug("Price history unavailable for %s: %s", getattr(yf_obj, "ticker", "?"), exc)
+            closes_5y, closes_1y = None, None
+    return {"info": info, "closes_5y": closes_5y, "closes_1y": closes_1y}
+
+
+def _price_group_complete(group: Dict[str, Any]) -> bool:
+    return group.get("closes_5y") is not None
+
+
+def _statement_rows(frame, labels: set) -> List[Dict[str, Any]]:
+    """Flatten the last five annual columns of a yfinance statement, native units."""
+    if frame is None or frame.empty:
+        return []
+    rows = {r: frame.loc[r] for r in frame.index if r in labels}
+    entries: List[Dict[str, Any]] = []
+    for col in frame.columns[:5]:
+        entry: Dict[str, Any] = {"year": str(col)[:10]}
+        for label, row in rows.items():
+            try:
+                entry[label.lower().replace(" ", "_")] = float(row[col])
+            except Exception:
+                entry[label.lower().replace(" ", "_")] = None
+        entries.append(entry)
+    return entries
+
+
+def _load_statements_group(ticker: str, yf_obj) -> Dict[str, Optional[List[Dict[str, Any]]]]:
+    statements: Dict[str, Optional[List[Dict[str, Any]]]] = {}
+    for key, attr, labels in (
+        ("financials", "financials", {
+            "Total Revenue", "Net Income", "EBIT", "EBITDA",
+            "Gross Profit", "Interest Expense Non Operating",
+        }),
+        ("balance_sheet", "balance_sheet", {
+            "Accounts Receivable", "Inventory", "Total Assets",
+            "Stockholders Equity", "Long Term Debt", "Current Debt",
+        }),
+        ("cashflow", "cashflow", {
+            "Operating Cash Flow", "Free Cash Flow",
+            "Capital Expenditure", "Net Issuance Payments Of Debt",
+            "Cash Dividends Paid",
+        }),
+    ):
+        try:
+            with _host_slot("yahoo"):
+                frame = getattr(yf_obj, attr)
+            statements[key] = _statement_rows(frame, labels)
+        except Exception as exc:
+            logger.debug("%s unavailable for %s: %s", attr, ticker, exc)
+            statements[key] = None  # failed, as opposed to an empty statement
+    return statements
+
 
-def _compute_cash_by_portfolio(transactions: List[Dict]) -> Dict[str, float]:
-    """Return {portfolio: net_cash_balance} from explicit CASH ledger rows."""
-    return _ledger_compute_cash_by_portfolio(transactions)
+def _statements_group_complete(statements: Dict[str, Any]) -> bool:
+    return all(rows is not None for rows in statements.values())
+
+
+def _statements_in_inr_cr(entries: List[Dict[str, Any]], fx_rate: float) -> List[Dict[str, Any]]:
+    return [
+        {
+            k: (v if k == "year" or v is None else round(v * fx_rate / 1e7, 2))
+            for k, v in entry.items()
+        }
+        for entry in entries
+    ]
 
 
 # ──────────────────────────────────────────────
 # Market data fetch
 # ──────────────────────────────────────────────
 
-def _fetch_ticker_data(ticker: str) -> Dict:
+def _fetch_ticker_data(ticker: str, force_refresh: bool = False) -> Dict:
     """
     Fetch fundamental + technical + forensic-accounting data from yfinance.
     Returns a rich dict aligned to GrahamPrompt.md criteria across all Parts.
+    Raw inputs come from the per-ticker disk cache unless ``force_refresh``.
     """
     try:
         yf_obj = yf.Ticker(ticker)
-        info   = yf_obj.info or {}
+        price_group = _cached_group(
+            ticker, "price", lambda: _load_price_group(yf_obj), force_refresh, _price_group_complete
+        )
+        info   = price_group.get("info") or {}
 
         sector   = info.get("sector", "N/A")
         industry = info.get("industry", "N/A")
@@ -726,51 +890,24 @@ def _fetch_ticker_data(ticker: str) -> Dict:
         # Interest coverage computed after financials are fetched (see below)
 
         # ── 5-year price CAGR from monthly history ──
-        try:
-            hist = yf_obj.history(period="5y", interval="1mo")
-            if not hist.empty:
-                s = hist["Close"].iloc[0]
-                e = hist["Close"].iloc[-1]
-                yrs = len(hist) / 12
-                d["price_cagr_5y_pct"] = _cagr(s, e, yrs)
-                # 52W price change
-                recent = yf_obj.history(period="1y", interval="1mo")
-                if not recent.empty:
-                    d["price_return_1y_pct"] = _cagr(
-                        recent["Close"].iloc[0], recent["Close"].iloc[-1], 1
-                    )
-                else:
-                    d["price_return_1y_pct"] = None
-            else:
-                d["price_cagr_5y_pct"] = None
-                d["price_return_1y_pct"] = None
-        except Exception:
+        closes_5y = price_group.get("closes_5y")
+        closes_1y = price_group.get("closes_1y")
+        if closes_5y:
+            d["price_cagr_5y_pct"] = _cagr(closes_5y[0], closes_5y[-1], len(closes_5y) / 12)
+            # 52W price change
+            d["price_return_1y_pct"] = _cagr(closes_1y[0], closes_1y[-1], 1) if closes_1y else None
+        else:
             d["price_cagr_5y_pct"] = None
             d["price_return_1y_pct"] = None
 
-        # ── Annual financials: revenue, net income, EPS (last 4–5 years) ──
-        annual_fin: List[Dict] = []
-        annual_bs:  List[Dict] = []
-        annual_cf:  List[Dict] = []
-        try:
-            fin = yf_obj.financials
-            if fin is not None and not fin.empty:
-                rows = {r: fin.loc[r] for r in fin.index if r in {
-                    "Total Revenue", "Net Income", "EBIT", "EBITDA",
-                    "Gross Profit", "Interest Expense Non Operating",
-                }}
-                for col in fin.columns[:5]:
-                    yr = str(col)[:10]
-                    entry = {"year": yr}
-                    for label, row in rows.items():
-                        try:
-                            v = float(row[col])
-                            entry[label.lower().replace(" ", "_")] = round(v * fx_rate / 1e7, 2)
-                        except Exception:
-                            entry[label.lower().replace(" ", "_")] = None
-                    annual_fin.append(entry)
-        except Exception as exc:
-            logger.debug("Financials unavailable for %s: %s", ticker, exc)
+        # ── Annual statements: financials, balance sheet, cash flows (last 4–5 years) ──
+        statements = _cached_group(
+            ticker, "statements", lambda: _load_statements_group(ticker, yf_obj), force_refresh,
+            _statements_group_complete,
+        )
+        annual_fin = _statements_in_inr_cr(statements.get("financials") or [], fx_rate)
+        annual_bs  = _statements_in_inr_cr(statements.get("balance_sheet") or [], fx_rate)
+        annual_cf  = _statements_in_inr_cr(statements.get("cashflow") or [], fx_rate)
         d["annual_financials"] = annual_fin
 
         # Interest coverage from financials (EBIT / Interest Expense Non Operating)
@@ -785,49 +922,7 @@ def _fetch_ticker_data(ticker: str) -> Dict:
         else:
             d["interest_coverage"] = None
 
-        # ── Annual balance sheet: receivables, inventory, equity, debt ──
-        try:
-            bs = yf_obj.balance_sheet
-            if bs is not None and not bs.empty:
-                bs_rows = {r: bs.loc[r] for r in bs.index if r in {
-                    "Accounts Receivable", "Inventory", "Total Assets",
-                    "Stockholders Equity", "Long Term Debt", "Current Debt",
-                }}
-                for col in bs.columns[:5]:
-                    yr = str(col)[:10]
-                    entry = {"year": yr}
-                    for label, row in bs_rows.items():
-                        try:
-                            v = float(row[col])
-                            entry[label.lower().replace(" ", "_")] = round(v * fx_rate / 1e7, 2)
-                        except Exception:
-                            entry[label.lower().replace(" ", "_")] = None
-                    annual_bs.append(entry)
-        except Exception as exc:
-            logger.debug("Balance sheet unavailable for %s: %s", ticker, exc)
         d["annual_balance_sheet"] = annual_bs
-
-        # ── Annual cash flows: OCF, FCF, capex ──
-        try:
-            cf = yf_obj.cashflow
-            if cf is not None and not cf.empty:
-                cf_rows = {r: cf.loc[r] for r in cf.index if r in {
-                    "Operating Cash Flow", "Free Cash Flow",
-                    "Capital Expenditure", "Net Issuance Payments Of Debt",
-                    "Cash Dividends Paid",
-                }}
-                for col in cf.columns[:5]:
-                    yr = str(col)[:10]
-                    entry = {"year": yr}
-                    for label, row in cf_rows.items():
-                        try:
-                            v = float(row[col])
-                            entry[label.lower().replace(" ", "_")] = round(v * fx_rate / 1e7, 2)
-                        except Exception:
-                            entry[label.lower().replace(" ", "_")] = None
-                    annual_cf.append(entry)
-        except Exception as exc:
-            logger.debug("Cash flow unavailable for %s: %s", ticker, exc)
         d["annual_cashflows"] = annual_cf
 
         # ── Derived multi-year metrics ──
@@ -852,7 +947,7 @@ def _fetch_ticker_data(ticker: str) -> Dict:
         d["business_summary"] = (info.get("longBusinessSummary") or "")[:600]
 
         # Screener.in qualitative signals (pros/cons/about)
-        d["screener_data"] = _fetch_screener_data(ticker)
+        d["screener_data"] = _fetch_screener_data(ticker, force_refresh=force_refresh)
 
         d["valuation"] = _compute_valuation_profile(d)
         return d
@@ -1080,74 +1175,30 @@ def _compute_valuation_profile(td: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def _fetch_candidate_news(company_name: str, ticker: str) -> List[str]:
-    clean_ticker = re.sub(r"\.(NS|BO)$", "", ticker, flags=re.IGNORECASE)
-    query = urllib.parse.quote(f'"{company_name}" OR "{clean_ticker}" stock')
-    url = f"https://news.google.com/rss/search?q={query}&hl=en-IN&gl=IN&ceid=IN:en"
-    try:
-        resp = requests.get(
-            url,
-            timeout=10,
-            headers={"User-Agent": "Mozilla/5.0"},
-        )
-        resp.raise_for_status()
-        root = ET.fromstring(resp.content)
-        cutoff = datetime.now() - timedelta(hours=_CANDIDATE_NEWS_LOOKBACK_HOURS)
-        headlines: List[str] = []
-        for item in root.findall(".//item")[:20]:
-            title = (item.findtext("title") or "").strip()
-            if not title:
-                continue
-            pub_str = item.findtext("pubDate", "")
-            try:
-                pub_dt = parsedate_to_datetime(pub_str).replace(tzinfo=None)
-                if pub_dt < cutoff:
-                    continue
-            except Exception:
-                pass
-            headlines.append(title)
-        return headlines
-    except Exception as exc:
-        logger.debug("Candidate news fetch failed for %s: %s", ticker, exc)
+    items = fetch_news_items(company_name, ticker, lookback_hours=_CANDIDATE_NEWS_LOOKBACK_HOURS, limit=20)
+    if items is None:
+        logger.debug("Candidate news fetch failed for %s", ticker)
         return []
+    return [item["title"] for item in items]
 
 
 def _fetch_recent_headlines(company_name: str, ticker: str, lookback_hours: int = _CANDIDATE_NEWS_LOOKBACK_HOURS) -> List[str]:
-    clean_ticker = re.sub(r"\.(NS|BO)$", "", ticker, flags=re.IGNORECASE)
-    query = urllib.parse.quote(f'"{company_name}" OR "{clean_ticker}" stock')
-    url = f"https://news.google.com/rss/search?q={query}&hl=en-IN&gl=IN&ceid=IN:en"
-
-    try:
-        resp = requests.get(url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
-        resp.raise_for_status()
-        root = ET.fromstring(resp.content)
-        cutoff = datetime.now() - timedelta(hours=lookback_hours)
-        headlines: List[str] = []
-        for item in root.findall(".//item")[:12]:
-            title = (item.findtext("title") or "").strip()
-            if not title:
-                continue
-            pub_str = item.findtext("pubDate", "")
-            try:
-                pub_dt = parsedate_to_datetime(pub_str).replace(tzinfo=None)
-                if pub_dt < cutoff:
-                    continue
-            except Exception:
-                pass
-            headlines.append(title)
-        return headlines
-    except Exception as exc:
-        logger.debug("Recent headline fetch failed for %s: %s", ticker, exc)
+    items = fetch_news_items(company_name, ticker, lookback_hours=lookback_hours, limit=12)
+    if items is None:
+        logger.debug("Recent headline fetch failed for %s", ticker)
         return []
+    return [item["title"] for item in items]
 
 
 def _check_candidate_events_and_news(ticker: str) -> List[str]:
     risks: List[str] = []
     try:
         yf_ticker = yf.Ticker(ticker)
-        info = yf_ticker.info or {}
+        with _host_slot("yahoo"):
+            info = yf_ticker.info or {}
+            cal = yf_ticker.calendar
         today = date.today()
 
-        cal = yf_ticker.calendar
         if cal is not None:
             earnings_dates: List[date] = []
             if isinstance(cal, dict):
@@ -2569,16 +2620,20 @@ def _render_candidate_gate_table(rows: List[Dict[str, Any]], title: str) -> List
 
 def _evaluate_screened_candidates(
     screened_quotes: Dict[str, Dict[str, Any]],
+    force_refresh: bool = False,
 ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]], str, List[Dict[str, Any]]]:
     eligible_quotes: Dict[str, Dict[str, Any]] = {}
     eligible_ticker_data: Dict[str, Dict[str, Any]] = {}
     review_rows: List[Dict[str, Any]] = []
 
-    for symbol in sorted(screened_quotes):
-        quote = screened_quotes[symbol]
-        td = _fetch_ticker_data(symbol)
+    def _gate(symbol: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        td = _fetch_ticker_data(symbol, force_refresh=force_refresh)
         event_risks = _check_candidate_events_and_news(symbol)
-        assessment = _assess_forward_risk(symbol, quote, td, event_risks)
+        return td, _assess_forward_risk(symbol, screened_quotes[symbol], td, event_risks)
+
+    symbols = sorted(screened_quotes)
+    for symbol, (td, assessment) in zip(symbols, _map_concurrent(_gate, symbols)):
+        quote = screened_quotes[symbol]
         review_rows.append({
             "ticker": symbol,
             "quote": quote,
@@ -2817,10 +2872,12 @@ def _screen_fresh_portfolio_candidates() -> Tuple[str, Dict[str, Dict]]:
 def prepare_fresh_portfolio_analysis(
     amount: float,
     preferences: Optional[Dict] = None,
+    force_refresh: bool = False,
 ) -> Dict[str, Any]:
     """
     Build the fresh portfolio input prompt and write it to disk, without calling the LLM.
     preferences keys: risk_appetite, horizon, sector_focus, sector_avoid, stock_count
+    force_refresh bypasses the ticker data cache.
     """
     prefs = preferences or {}
     logger.info(
@@ -2833,7 +2890,9 @@ def prepare_fresh_portfolio_analysis(
     if not screened_quotes:
         return {"error": "📭 No candidates returned from screener — yfinance screen may be unavailable. Try again later."}
 
-    eligible_quotes, ticker_data, candidate_gate_section, candidate_rows = _evaluate_screened_candidates(screened_quotes)
+    eligible_quotes, ticker_data, candidate_gate_section, candidate_rows = _evaluate_screened_candidates(
+        screened_quotes, force_refresh=force_refresh
+    )
     if not eligible_quotes:
         return {"error": "📭 Candidates were screened, but all were rejected by the forward-risk and event gate. Review the watchlist manually or widen the search universe."}
 
@@ -3002,13 +3061,14 @@ def execute_fresh_portfolio_analysis(prepared: Dict[str, Any]) -> Tuple[Optional
 def run_fresh_portfolio_analysis(
     amount: float,
     preferences: Optional[Dict] = None,
+    force_refresh: bool = False,
 ) -> Tuple[Optional[str], Optional[str], str]:
     """
     Build and execute a fresh portfolio recommendation for direct callers.
     The Telegram flow uses prepare/execute separately so the user can review
     the input prompt before forwarding it to the LLM.
     """
-    prepared = prepare_fresh_portfolio_analysis(amount, preferences)
+    prepared = prepare_fresh_portfolio_analysis(amount, preferences, force_refresh=force_refresh)
     if prepared.get("error"):
         return None, None, prepared["error"]
     report_path, usage_msg = execute_fresh_portfolio_analysis(prepared)
@@ -3019,35 +3079,25 @@ def run_fresh_portfolio_analysis(
 # Screener.in qualitative data
 # ──────────────────────────────────────────────
 
-_SCREENER_CACHE_DIR  = Path(tempfile.gettempdir()) / "screener_cache"
-_SCREENER_CACHE_DAYS = 7
-
-
-def _fetch_screener_data(ticker: str) -> Dict:
+def _fetch_screener_data(ticker: str, force_refresh: bool = False) -> Dict:
     """
     Fetch Pros, Cons, and About from Screener.in for an NSE/BSE ticker.
     Strips .NS/.BO suffix. Tries consolidated view first, falls back to standalone.
-    Results cached for 7 days in /tmp/screener_cache/.
+    Results are kept in the ticker data cache ("qualitative" group, 7 days by default).
     Returns {"pros": [...], "cons": [...], "about": "...", "symbol": "..."}.
     """
+    symbol = re.sub(r"\.(NS|BO)$", "", ticker.upper())
+    data = _cached_group(ticker, "qualitative", lambda: _scrape_screener(symbol), force_refresh)
+    return data or {"pros": [], "cons": [], "about": "", "symbol": symbol}
+
+
+def _scrape_screener(symbol: str) -> Optional[Dict]:
+    """Scrape one Screener.in company page. Returns None when nothing could be fetched."""
     try:
         from bs4 import BeautifulSoup
     except ImportError:
         logger.warning("beautifulsoup4 not installed — Screener.in data unavailable. Run: pip install beautifulsoup4")
-        return {"pros": [], "cons": [], "about": "", "symbol": ticker}
-
-    symbol = re.sub(r"\.(NS|BO)$", "", ticker.upper())
-
-    _SCREENER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    cache_file = _SCREENER_CACHE_DIR / f"{symbol}.json"
-
-    if cache_file.exists():
-        age_days = (datetime.now() - datetime.fromtimestamp(cache_file.stat().st_mtime)).days
-        if age_days < _SCREENER_CACHE_DAYS:
-            try:
-                return json.loads(cache_file.read_text())
-            except Exception:
-                pass
+        return None
 
     headers = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36"}
     html = None
@@ -3056,7 +3106,8 @@ def _fetch_screener_data(ticker: str) -> Dict:
         f"https://www.screener.in/company/{symbol}/",
     ]:
         try:
-            resp = requests.get(url, headers=headers, timeout=12)
+            with _host_slot("screener.in"):
+                resp = requests.get(url, headers=headers, timeout=12)
             if resp.status_code == 200:
                 html = resp.text
                 break
@@ -3065,7 +3116,7 @@ def _fetch_screener_data(ticker: str) -> Dict:
 
     if not html:
         logger.warning("Screener.in: no response for %s", symbol)
-        return {"pros": [], "cons": [], "about": "", "symbol": symbol}
+        return None
 
     soup = BeautifulSoup(html, "html.parser")
 
@@ -3088,11 +3139,6 @@ def _fetch_screener_data(ticker: str) -> Dict:
             about = p.get_text(strip=True)[:600]
 
     result = {"pros": pros, "cons": cons, "about": about, "symbol": symbol}
-    try:
-        cache_file.write_text(json.dumps(result))
-    except Exception:
-        pass
-
     logger.info("Screener.in fetched for %s — %d pros, %d cons", symbol, len(pros), len(cons))
     return result
 
@@ -3101,15 +3147,19 @@ def _fetch_screener_data(ticker: str) -> Dict:
 # Main entry point
 # ──────────────────────────────────────────────
 
-def prepare_rebalance_analysis(transactions_model) -> Dict[str, Any]:
-    """Build rebalance input prompt and write it to disk, without calling the LLM."""
+def prepare_rebalance_analysis(transactions_model, force_refresh: bool = False) -> Dict[str, Any]:
+    """Build rebalance input prompt and write it to disk, without calling the LLM.
+
+    force_refresh bypasses the ticker data cache for holdings and candidates.
+    """
     logger.info("Preparing rebalance analysis — model: %s", _REBALANCE_MODEL)
     transactions = transactions_model.list()
     if not transactions:
         return {"error": "📭 No portfolio transactions found — nothing to analyse."}
 
-    positions_by_portfolio = _compute_positions_by_portfolio(transactions)
-    cash_by_portfolio      = _compute_cash_by_portfolio(transactions)
+    views = build_position_views(transactions, views=("positions_by_portfolio", "cash_by_portfolio"))
+    positions_by_portfolio = views["positions_by_portfolio"]
+    cash_by_portfolio      = views["cash_by_portfolio"]
 
     if not positions_by_portfolio:
         return {"error": "📭 No active (open) positions found."}
@@ -3121,9 +3171,10 @@ def prepare_rebalance_analysis(transactions_model) -> Dict[str, Any]:
     }
 
     logger.info("Fetching market data for %d tickers: %s", len(all_tickers), all_tickers)
-    ticker_data: Dict[str, Dict] = {}
-    for ticker in sorted(all_tickers):
-        ticker_data[ticker] = _fetch_ticker_data(ticker)
+    sorted_tickers = sorted(all_tickers)
+    fetched = _map_concurrent(lambda tk: _fetch_ticker_data(tk, force_refresh=force_refresh), sorted_tickers)
+    ticker_data: Dict[str, Dict] = dict(zip(sorted_tickers, fetched))
+    for ticker in sorted_tickers:
         logger.info(
             "Fetched %s — CMP: %s | Revenue CAGR 3Y: %s%% | Cash Conversion: %s | Flags: %d",
             ticker,
@@ -3159,7 +3210,9 @@ def prepare_rebalance_analysis(transactions_model) -> Dict[str, Any]:
 
     logger.info("Screening NSE candidates for new ENTER actions...")
     candidates_section, screened_quotes = _screen_nse_candidates(all_tickers)
-    eligible_quotes, candidate_ticker_data, candidate_gate_section, candidate_rows = _evaluate_screened_candidates(screened_quotes)
+    eligible_quotes, candidate_ticker_data, candidate_gate_section, candidate_rows = _evaluate_screened_candidates(
+        screened_quotes, force_refresh=force_refresh
+    )
     logger.info(
         "NSE screening complete. Eligible: %d / %d",
         len(eligible_quotes),
@@ -3174,7 +3227,7 @@ def prepare_rebalance_analysis(transactions_model) -> Dict[str, Any]:
     candidate_forward_outlook = _build_candidate_forward_outlook_section(candidate_rows)
 
     total_cash = sum(cash_by_portfolio.values())
-    user_message = (
+    header = (
         f"## Portfolio Rebalance Analysis Request — {today.strftime('%d %b %Y')}\n\n"
         f"**Grand Total Deployed (INR):** ₹{total_invested:,.0f}\n"
         f"**Grand Total Equity Current Value (INR):** ₹{total_current:,.0f}\n"
@@ -3183,23 +3236,36 @@ def prepare_rebalance_analysis(transactions_model) -> Dict[str, Any]:
         f"**Overall Unrealised P&L:** ₹{total_current - total_invested:,.0f} "
         f"({((total_current - total_invested) / total_invested * 100) if total_invested else 0:+.1f}%)\n"
         f"**Number of Portfolios:** {len(positions_by_portfolio)}\n"
-        f"**Number of Unique Tickers:** {len(all_tickers)}\n\n"
-        f"{sector_allocation}\n"
-        f"{positions_table}\n"
-        f"{duplicate_table}\n"
-        f"{sizing_violations}\n"
-        f"{recent_tx_review}\n"
-        f"{notes_context}\n"
-        f"{reconciliation}\n"
-        f"{forward_outlook}\n"
-        f"{market_data}\n"
-        f"{candidates_section}\n"
-        f"{candidate_gate_section}\n"
-        f"{candidate_forward_outlook}\n"
-        f"{candidate_market_data}\n"
-        "Only candidates in the Eligible section may be recommended as ENTER actions. "
-        "Watchlist names may be mentioned as monitor-only; Rejected names must not be recommended.\n"
-        f"{instructions}"
+        f"**Number of Unique Tickers:** {len(all_tickers)}\n"
+    )
+    # ── Fit the sections to the token budget; lower priority is cut first ──
+    user_message, budget_report = compile_prompt(
+        [
+            section("Summary", header, 100, required=True),
+            section("Sector allocation", sector_allocation, 80),
+            section("Positions", positions_table, 100, required=True),
+            section("Duplicate exposure", duplicate_table, 70),
+            section("Sizing violations", sizing_violations, 70),
+            section("Recent transactions", recent_tx_review, 60, TABLE_STEPS),
+            section("Transaction notes", notes_context, 40, ENTRY_STEPS),
+            section("Reconciliation checks", reconciliation, 30, TABLE_STEPS),
+            section("Forward outlook", forward_outlook, 60, ENTRY_STEPS),
+            section("Holdings deep-dive", market_data, 90, required=True),
+            section("Screened candidates", candidates_section, 20, TABLE_STEPS),
+            section("Candidate gate", candidate_gate_section, 50),
+            section("Candidate forward outlook", candidate_forward_outlook, 35, ENTRY_STEPS),
+            section("Candidate deep-dive", candidate_market_data, 25, ENTRY_STEPS),
+            section(
+                "Eligibility rule",
+                "Only candidates in the Eligible section may be recommended as ENTER actions. "
+                "Watchlist names may be mentioned as monitor-only; Rejected names must not be recommended.",
+                100,
+                required=True,
+            ),
+            section("Instructions", instructions, 100, required=True),
+        ],
+        _REBALANCE_PROMPT_TOKEN_BUDGET,
+        _REBALANCE_MODEL,
     )
 
     timestamp = datetime.now().strftime("%Y-%m-%d_%H%M")
@@ -3210,6 +3276,8 @@ def prepare_rebalance_analysis(transactions_model) -> Dict[str, Any]:
         f"**Generated:** {datetime.now().strftime('%d %b %Y, %I:%M %p')}  \n"
         f"**Model:** {_REBALANCE_MODEL}  \n\n"
         "---\n\n"
+        f"{budget_report_markdown(budget_report, _REBALANCE_PROMPT_TOKEN_BUDGET, _REBALANCE_MODEL)}\n"
+        "---\n\n"
         "## System Prompt (Investment Framework)\n\n"
         f"{_GRAHAM_SYSTEM_PROMPT.strip()}\n\n"
         "---\n\n"
@@ -3230,6 +3298,7 @@ def prepare_rebalance_analysis(transactions_model) -> Dict[str, Any]:
         "input_path": input_tmp.name,
         "input_md": input_md,
         "user_message": user_message,
+        "budget_report": budget_report,
         "timestamp": timestamp,
         "total_invested": total_invested,
         "total_current": total_current,
@@ -3298,12 +3367,12 @@ def execute_rebalance_analysis(prepared: Dict[str, Any]) -> Tuple[Optional[str],
         return None, f"❌ Rebalance analysis failed: {e}"
 
 
-def run_rebalance_analysis(transactions_model) -> str:
+def run_rebalance_analysis(transactions_model, force_refresh: bool = False) -> str:
     """
     Full Graham-style rebalance analysis across all portfolios.
     Returns (report_path, input_path, usage_msg).
     """
-    prepared = prepare_rebalance_analysis(transactions_model)
+    prepared = prepare_rebalance_analysis(transactions_model, force_refresh=force_refresh)
     if prepared.get("error"):
         return None, None, prepared["error"]
     report_path, usage_msg = execute_rebalance_analysis(prepared)
@@ -2,22 +2,34 @@ import asyncio
 import logging
 import os
 
-import yfinance as yf
 from apscheduler.triggers.cron import CronTrigger
-
-from bujo.base import CHAT_ID, portfolio_transactions_model, price_alerts_model, scheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+from bujo.base import (
+    CHAT_ID,
+    expense_rollups,
+    expense_search_index,
+    expenses_model,
+    mag_model,
+    nocodb_replica,
+    portfolio_transactions_model,
+    price_alerts_model,
+    scheduler,
+)
+from bujo import managers
 from bujo.handlers.system import send_mag_message
-from bujo.managers import portfolio_manager
-from bujo.portoflio.alerts import run_portfolio_alerts
-from bujo.portoflio.rebalance import run_rebalance_analysis
+from bujo.portoflio.alert_index import is_market_open, price_alert_index
 
 logger = logging.getLogger(__name__)
 
+# Alerts are checked against one batched quote call per poll, during market hours only.
+_PRICE_ALERT_POLL_SECONDS = float(os.environ.get("PRICE_ALERT_POLL_SECONDS", "60"))
+
 
 async def setup_scheduler(application):
     async def scheduled_update_cmp():
         try:
-            msg = portfolio_manager.update_cmp()
+            msg = await asyncio.to_thread(managers.portfolio_manager.update_cmp)
             await application.bot.send_message(chat_id=CHAT_ID, text=msg, parse_mode="markdown")
         except Exception as e:
             logger.error("Error in scheduled CMP update: %s", e)
@@ -34,7 +46,9 @@ async def setup_scheduler(application):
 
     async def scheduled_portfolio_alerts():
         try:
-            await asyncio.to_thread(portfolio_manager.update_cmp)
+            from bujo.portoflio.alerts import run_portfolio_alerts
+
+            await asyncio.to_thread(managers.portfolio_manager.update_cmp)
             msg = await asyncio.to_thread(run_portfolio_alerts, portfolio_transactions_model)
             if msg:
                 await application.bot.send_message(chat_id=CHAT_ID, text=msg, parse_mode="markdown")
@@ -47,40 +61,24 @@ async def setup_scheduler(application):
     )
 
     async def scheduled_price_alerts():
+        if not is_market_open():
+            return
         try:
-            alerts = price_alerts_model.list_active()
-            if not alerts:
-                return
+            from bujo.portoflio.quotes import fetch_quotes, last_price
 
-            tickers_list = list({a.get("Ticker", "") for a in alerts if a.get("Ticker")})
-            raw = await asyncio.to_thread(
-                yf.download, tickers_list, period="1d", progress=False, auto_adjust=True
-            )
-            close = raw["Close"]
+            if price_alert_index.needs_reload():
+                price_alert_index.load(await price_alerts_model.alist_active())
+            tickers = price_alert_index.tickers()
+            if not tickers:
+                return
 
-            def get_price(ticker: str) -> float:
-                try:
-                    col = close if len(tickers_list) == 1 else close[ticker]
-                    return float(col.dropna().iloc[-1])
-                except Exception:
-                    return 0.0
+            prices = await asyncio.to_thread(fetch_quotes, tickers)
+            fired = price_alert_index.observe({t: last_price(prices, t) for t in tickers})
 
-            for alert in alerts:
+            for alert, cmp in fired:
                 ticker = alert.get("Ticker", "")
                 direction = alert.get("Direction", "")
                 target = float(alert.get("TargetPrice") or 0)
-                cmp = get_price(ticker)
-                if not cmp:
-                    continue
-
-                triggered = (
-                    (direction == "above" and cmp >= target) or
-                    (direction == "below" and cmp <= target) or
-                    (direction == "both" and cmp != target)
-                )
-                if not triggered:
-                    continue
-
                 arrow = "📈" if cmp >= target else "📉"
                 action = (alert.get("Action") or "").strip()
                 action_line = f"\n📝 _{action}_" if action else ""
@@ -88,7 +86,7 @@ async def setup_scheduler(application):
                     chat_id=CHAT_ID,
                     text=(
                         f"🔔 *Price Alert — {ticker}*\n"
-                        f"{arrow} CMP ₹{cmp:,.2f} is {direction} target ₹{target:,.2f}"
+                        f"{arrow} CMP ₹{cmp:,.2f} crossed {direction} target ₹{target:,.2f}"
                         f"{action_line}"
                         f"\n\nUse /listAlerts to modify or cancel."
                     ),
@@ -99,11 +97,15 @@ async def setup_scheduler(application):
 
     scheduler.add_job(
         scheduled_price_alerts,
-        CronTrigger(hour="9,11,13,15", minute="0", day_of_week="0-4"),
+        IntervalTrigger(seconds=_PRICE_ALERT_POLL_SECONDS),
+        max_instances=1,
+        coalesce=True,
     )
 
     async def scheduled_rebalance():
         try:
+            from bujo.portoflio.rebalance import run_rebalance_analysis
+
             report_path, input_path, usage_msg = await asyncio.to_thread(
                 run_rebalance_analysis, portfolio_transactions_model
             )
@@ -129,5 +131,43 @@ async def setup_scheduler(application):
         CronTrigger(day=1, hour=9, minute=30),
     )
 
+    async def scheduled_expense_rollups():
+        try:
+            await asyncio.to_thread(lambda: expense_rollups.rebuild(expenses_model.iter_list()))
+        except Exception as e:
+            logger.error("Error rebuilding expense rollups: %s", e)
+
+    async def scheduled_expense_search_index():
+        try:
+            await asyncio.to_thread(lambda: expense_search_index.rebuild(expenses_model.iter_list()))
+        except Exception as e:
+            logger.error("Error rebuilding expense search index: %s", e)
+
+    # Both pick up edits made directly in NocoDB; the bot's own writes are applied as they happen.
+    if expense_rollups is not None:
+        scheduler.add_job(
+            scheduled_expense_rollups,
+            CronTrigger(hour=3, minute=0),
+        )
+    if expense_search_index is not None:
+        scheduler.add_job(
+            scheduled_expense_search_index,
+            CronTrigger(hour=3, minute=15),
+        )
+
+    async def scheduled_replica_sync():
+        for model in (portfolio_transactions_model, expenses_model, mag_model, price_alerts_model):
+            try:
+                await asyncio.to_thread(model.sync_replica)
+            except Exception as e:
+                logger.error("Error syncing NocoDB replica for %s: %s", model.table_id, e)
+
+    if nocodb_replica is not None:
+        # Half the staleness bound, so interactive reads almost never wait on a sync.
+        scheduler.add_job(
+            scheduled_replica_sync,
+            IntervalTrigger(seconds=max(nocodb_replica.max_age / 2, 30)),
+        )
+
     scheduler.start()
     logger.info("🕒 Scheduler started.")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""Measure bot start-up cost in fresh interpreters.
+
+Reports the median wall time of ``import bujo.app``, ``build_application()``
+and the first ``_get_agent()`` call, and lists which heavy dependencies are
+already loaded once the application is built. Needs the same ``.env`` as the
+bot, since ``bujo.base`` reads it on import.
+
+    python scripts/benchmark_startup.py --runs 5 --top 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = [
+    "langchain_openai",
+    "openai",
+    "langchain_core",
+    "langgraph",
+    "matplotlib",
+    "wolframalpha",
+    "yfinance",
+    "pandas",
+]
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import bujo.app
+t1 = time.perf_counter()
+bujo.app.build_application()
+t2 = time.perf_counter()
+loaded = [m for m in {heavy!r} if m in sys.modules]
+from bujo.agent import _get_agent
+_get_agent()
+t3 = time.perf_counter()
+print(json.dumps({{"import": t1 - t0, "build": t2 - t1, "first_agent": t3 - t2, "loaded": loaded}}))
+"""
+
+
+def _run_probe():
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", _PROBE.format(heavy=HEAVY_MODULES)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _import_profile(top):
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c", "import bujo.app"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="also print the N slowest imports (cumulative)")
+    args = parser.parse_args()
+
+    samples = [_run_probe() for _ in range(args.runs)]
+    for key, label in (("import", "import bujo.app"), ("build", "build_application()"), ("first_agent", "first _get_agent()")):
+        values = [s[key] for s in samples]
+        print(f"{label:<22} median {statistics.median(values) * 1000:8.1f} ms  "
+              f"(min {min(values) * 1000:.1f}, max {max(values) * 1000:.1f})")
+    print("heavy modules loaded before polling:", ", ".join(samples[-1]["loaded"]) or "none")
+
+    if args.top:
+        print()
+        for cumulative_us, name in _import_profile(args.top):
+            print(f"{cumulative_us / 1000:9.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from email.utils import formatdate
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+from bujo.models.base import _retry_after_seconds
+from bujo.models.price_alerts import PriceAlerts
+from bujo.models.replica import LocalReplica
+
+
+class TestAsyncNocoDB(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+        self.handler = None
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self._dispatch))
+        self.addAsyncCleanup(client.aclose)
+        patcher = patch("bujo.models.base.get_async_client", return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.model = PriceAlerts("https://example.com", "token", "alerts")
+
+    def _dispatch(self, request):
+        self.requests.append(request)
+        return self.handler(request)
+
+    async def test_pages_after_the_first_are_fetched_concurrently(self):
+        in_flight = []
+
+        def handler(request):
+            offset = int(request.url.params["offset"])
+            in_flight.append(offset)
+            rows = [{"Id": i} for i in range(offset, min(offset + 2, 5))]
+            return httpx.Response(200, json={"list": rows, "PageInfo": {"isLastPage": offset >= 4, "totalRows": 5}})
+
+        self.handler = handler
+        with patch("bujo.models.base.asyncio.gather", wraps=asyncio.gather) as gather:
+            rows = await self.model._apaginated_list({}, limit=2)
+
+        self.assertEqual([r["Id"] for r in rows], [0, 1, 2, 3, 4])
+        self.assertEqual(sorted(in_flight), [0, 2, 4])
+        gather.assert_called_once()
+
+    async def test_retries_idempotent_requests_but_not_posts(self):
+        statuses = iter([503, 200])
+        self.handler = lambda request: httpx.Response(next(statuses), json=[{"Id": 1}])
+        with patch("bujo.models.base._BACKOFF_FACTOR", 0):
+            self.assertTrue(await self.model.aupdate(1, TargetPrice=10))
+        self.assertEqual(len(self.requests), 2)
+
+        self.requests.clear()
+        self.handler = lambda request: httpx.Response(503, text="busy")
+        self.assertIsNone(await self.model.acreate("INFY.NS", "above", 1800))
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_failed_middle_pages_are_logged_with_their_offsets(self):
+        def handler(request):
+            offset = int(request.url.params["offset"])
+            if offset in (2, 6):
+                return httpx.Response(404, text="gone")
+            rows = [{"Id": i} for i in range(offset, min(offset + 2, 8))]
+            return httpx.Response(200, json={"list": rows, "PageInfo": {"isLastPage": offset >= 6, "totalRows": 8}})
+
+        self.handler = handler
+        with self.assertLogs("bujo.models.base", level="WARNING") as logs:
+            rows = await self.model._apaginated_list({}, limit=2)
+
+        self.assertEqual([r["Id"] for r in rows], [0, 1])
+        self.assertIn("offsets [2, 6] failed", logs.output[-1])
+
+    async def test_retry_after_http_date_is_honoured(self):
+        statuses = iter([429, 200])
+        retry_at = formatdate(1_700_000_030, usegmt=True)
+        self.handler = lambda request: httpx.Response(
+            next(statuses), headers={"Retry-After": retry_at}, json=[{"Id": 1}]
+        )
+        with patch("bujo.models.base.time.time", return_value=1_700_000_000), \
+                patch("bujo.models.base.asyncio.sleep", new_callable=AsyncMock) as sleep:
+            self.assertTrue(await self.model.aupdate(1, TargetPrice=10))
+
+        sleep.assert_awaited_once_with(30.0)
+
+    def test_retry_after_forms(self):
+        with patch("bujo.models.base.time.time", return_value=1_700_000_000):
+            self.assertEqual(_retry_after_seconds("7"), 7.0)
+            self.assertEqual(_retry_after_seconds(formatdate(1_699_999_000, usegmt=True)), 0.0)
+            self.assertIsNone(_retry_after_seconds(""))
+            self.assertIsNone(_retry_after_seconds("soon"))
+
+    async def test_writes_go_through_to_the_replica(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.model.replica = LocalReplica(Path(tmp.name) / "replica.sqlite3")
+        self.model.replica.replace_all("alerts", [{"Id": 1, "Ticker": "INFY.NS", "TargetPrice": 1500}])
+        self.model.replica.mark_synced("alerts")
+        self.handler = lambda request: httpx.Response(200, json={"Id": 2})
+
+        await self.model.acreate("TCS.NS", "below", 3000, "Add more")
+        await self.model.aupdate(1, TargetPrice=1600)
+        alerts = await self.model.alist_active()
+
+        self.assertEqual([json.loads(r.content) for r in self.requests], [
+            {"Ticker": "TCS.NS", "Direction": "below", "TargetPrice": 3000, "Action": "Add more"},
+            [{"Id": 1, "TargetPrice": 1600}],
+        ])
+        self.assertEqual([(a["Id"], a["TargetPrice"]) for a in alerts], [(1, 1600), (2, 3000)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from bujo.models.expenses import SEARCH_FIELDS, Expenses, search_where
+from bujo.models.replica import LocalReplica, parse_where
+
+ROWS = [
+    {"Id": 1, "Date": "2025-03-01", "Item": "Rent", "Amount": 25000},
+    {"Id": 2, "Date": "2025-03-02", "Item": "Coffee", "Category": "Food", "Amount": 120},
+    {"Id": 3, "Date": "2025-03-03", "Item": "Transfer", "Note": "house rent share", "Amount": 5000},
+    {"Id": 4, "Date": "2025-03-04", "Item": "Groceries", "Category": "Food", "Amount": 2400},
+    {"Id": 5, "Date": "2025-03-05", "Item": "Fuel", "Amount": 1500},
+]
+
+
+def _python_filter(rows, include, exclude):
+    def haystack(row):
+        return " ".join(str(row.get(f) or "") for f in SEARCH_FIELDS).lower()
+
+    return [
+        r["Id"] for r in rows
+        if (not include or any(t.lower() in haystack(r) for t in include))
+        and not any(t.lower() in haystack(r) for t in exclude)
+    ]
+
+
+class TestSearchWhere(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.replica = LocalReplica(Path(tmp.name) / "replica.sqlite3")
+        self.replica.replace_all("expenses", ROWS)
+
+    def test_clause_shape(self):
+        self.assertEqual(
+            search_where(["food"], ["rent"], ["Item", "Note"]),
+            "((Item,like,%food%)~or(Note,like,%food%))~and(Item,nlike,%rent%)~and(Note,nlike,%rent%)",
+        )
+
+    def test_pushed_down_filters_match_the_python_filter(self):
+        cases = [([], ["rent"]), (["food"], []), (["food", "fuel"], ["coffee"]), (["RENT"], ["house"])]
+        for include, exclude in cases:
+            with self.subTest(include=include, exclude=exclude):
+                where = "(Date,ge,exactDate,2025-03-01)~and" + search_where(include, exclude, list(SEARCH_FIELDS))
+                rows = self.replica.query("expenses", where)
+                self.assertEqual([r["Id"] for r in rows], _python_filter(ROWS, include, exclude))
+
+    def test_unsafe_terms_and_unsupported_groups_are_not_pushed_down(self):
+        self.assertIsNone(search_where(["a,b"], [], ["Item"]))
+        self.assertIsNone(search_where([], ["50%"], ["Item"]))
+        self.assertIsNone(search_where([], [], ["Item"]))
+        self.assertIsNone(search_where(["food"], [], []))
+        self.assertIsNone(parse_where("((Item,like,a)~and(Note,like,b))"))
+        self.assertIsNone(parse_where("((Item,like,a)~or(Note,like,b)"))
+
+
+class TestFieldProjection(unittest.TestCase):
+    def setUp(self):
+        self.model = Expenses("https://example.com", "token", "expenses", "link", MagicMock())
+
+    @patch("requests.Session.get")
+    def test_columns_are_fetched_once_and_fields_are_sent(self, mock_get):
+        meta = MagicMock(ok=True, **{"json.return_value": {"columns": [{"title": "Id"}, {"title": "Item"}]}})
+        page = MagicMock(ok=True, **{"json.return_value": {"list": [], "PageInfo": {"isLastPage": True}}})
+        mock_get.side_effect = [meta, page]
+
+        self.assertEqual(self.model.column_titles(), ["Id", "Item"])
+        self.assertEqual(self.model.column_titles(), ["Id", "Item"])
+        list(self.model.iter_list('{"filters": ["(Item,nlike,%rent%)"]}', fields=["Id", "Item"]))
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args.kwargs["params"]["fields"], "Id,Item")
+
+
+if __name__ == "__main__":
+    unittest.main()
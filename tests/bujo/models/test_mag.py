@@ -11,7 +11,7 @@ class TestMAG(unittest.TestCase):
         self.mag_table_id = "test_table_id"
         self.mag = MAG(self.base_url, self.api_token, self.mag_table_id)
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_create_success(self, mock_post):
         mock_response = MagicMock()
         mock_response.ok = True
@@ -26,9 +26,10 @@ class TestMAG(unittest.TestCase):
             f"{self.base_url}/api/v2/tables/{self.mag_table_id}/records",
             json=data,
             headers=self.mag.headers,
+            timeout=self.mag.timeout,
         )
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_read_success(self, mock_get):
         mock_response = MagicMock()
         mock_response.ok = True
@@ -42,10 +43,11 @@ class TestMAG(unittest.TestCase):
         mock_get.assert_called_once_with(
             f"{self.base_url}/api/v2/tables/{self.mag_table_id}/records/{record_id}",
             headers=self.mag.headers,
+            timeout=self.mag.timeout,
         )
 
     @patch.object(MAG, "find_by_date")
-    @patch("requests.patch")
+    @patch("requests.Session.patch")
     def test_update_success(self, mock_patch, mock_find_by_date):
         mock_response = MagicMock()
         mock_response.ok = True
@@ -63,9 +65,10 @@ class TestMAG(unittest.TestCase):
             f"{self.base_url}/api/v2/tables/{self.mag_table_id}/records",
             json={"Id": "123", "Exercise": False, "Note": "Updated"},
             headers=self.mag.headers,
+            timeout=self.mag.timeout,
         )
 
-    @patch("requests.delete")
+    @patch("requests.Session.delete")
     def test_delete_success(self, mock_delete):
         mock_response = MagicMock()
         mock_response.ok = True
@@ -79,9 +82,10 @@ class TestMAG(unittest.TestCase):
             f"{self.base_url}/api/v2/tables/{self.mag_table_id}/records",
             json=[{"Id": record_id}],
             headers=self.mag.headers,
+            timeout=self.mag.timeout,
         )
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_list_success(self, mock_get):
         mock_response = MagicMock()
         mock_response.ok = True
@@ -95,10 +99,11 @@ class TestMAG(unittest.TestCase):
             f"{self.base_url}/api/v2/tables/{self.mag_table_id}/records",
             headers=self.mag.headers,
             params={"limit": 1000, "offset": 0},
+            timeout=self.mag.timeout,
         )
 
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_list_joins_filter_arrays_with_nocodb_and(self, mock_get):
         mock_response = MagicMock()
         mock_response.ok = True
@@ -120,9 +125,10 @@ class TestMAG(unittest.TestCase):
                 "limit": 1000,
                 "offset": 0,
             },
+            timeout=self.mag.timeout,
         )
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_find_by_date_success(self, mock_get):
         mock_response = MagicMock()
         mock_response.ok = True
@@ -137,8 +143,50 @@ class TestMAG(unittest.TestCase):
             f"{self.base_url}/api/v2/tables/{self.mag_table_id}/records",
             headers=self.mag.headers,
             params={"where": f"(Date,eq,exactDate,{iso_date_str})"},
+            timeout=self.mag.timeout,
         )
 
+    @patch("requests.Session.get")
+    def test_iter_list_yields_rows_across_pages_with_prefetch(self, mock_get):
+        pages = [
+            {"list": [{"Id": 1}, {"Id": 2}], "PageInfo": {"isLastPage": False}},
+            {"list": [{"Id": 3}], "PageInfo": {"isLastPage": True}},
+        ]
+        responses = []
+        for page in pages:
+            response = MagicMock()
+            response.ok = True
+            response.json.return_value = page
+            responses.append(response)
+        mock_get.side_effect = responses
+
+        rows = self.mag.iter_list(limit=2)
+        self.assertEqual(next(rows), {"Id": 1})
+        self.assertEqual(list(rows), [{"Id": 2}, {"Id": 3}])
+
+        offsets = [c.kwargs["params"]["offset"] for c in mock_get.call_args_list]
+        self.assertEqual(offsets, [0, 2])
+
+    @patch("requests.Session.get")
+    def test_iter_list_stops_on_failed_page(self, mock_get):
+        first = MagicMock()
+        first.ok = True
+        first.json.return_value = {"list": [{"Id": 1}], "PageInfo": {"isLastPage": False}}
+        failed = MagicMock()
+        failed.ok = False
+        mock_get.side_effect = [first, failed]
+
+        self.assertEqual(list(self.mag.iter_list(limit=1, prefetch=False)), [{"Id": 1}])
+
+    def test_models_share_one_pooled_session(self):
+        other = MAG("https://other.example.com", "other_token", "other_table")
+
+        self.assertIs(self.mag.session, other.session)
+        adapter = self.mag.session.get_adapter(self.base_url)
+        self.assertIn(429, adapter.max_retries.status_forcelist)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+        self.assertNotIn("POST", adapter.max_retries.allowed_methods)
+
 
 if __name__ == "__main__":
     unittest.main()
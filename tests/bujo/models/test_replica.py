@@ -0,0 +1,141 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from bujo.models.portfolio_transactions import PortfolioTransactions
+from bujo.models.replica import LocalReplica, parse_where
+
+
+def _page(rows, total=None):
+    response = MagicMock()
+    response.ok = True
+    response.json.return_value = {
+        "list": rows,
+        "PageInfo": {"isLastPage": True, "totalRows": len(rows) if total is None else total},
+    }
+    return response
+
+
+class TestLocalReplicaQuery(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.replica = LocalReplica(Path(tmp.name) / "replica.sqlite3")
+        self.replica.replace_all("expenses", [
+            {"Id": 1, "Date": "2025-03-01", "Item": "Coffee", "Amount": 120},
+            {"Id": 2, "Date": "2025-03-15", "Item": "Groceries", "Amount": 2400},
+            {"Id": 3, "Date": "2025-04-02", "Item": "Iced coffee", "Amount": 180},
+        ])
+
+    def test_date_range_and_like_filters(self):
+        rows = self.replica.query(
+            "expenses",
+            "(Date,ge,exactDate,2025-03-01)~and(Date,lt,exactDate,2025-04-01)~and(Item,nlike,groc)",
+        )
+
+        self.assertEqual([r["Id"] for r in rows], [1])
+        self.assertEqual(
+            [r["Id"] for r in self.replica.query("expenses", "(Item,like,coffee)", sort="-Amount")],
+            [3, 1],
+        )
+
+    def test_unsupported_clause_is_not_evaluated_locally(self):
+        self.assertIsNone(parse_where("(Item,eq,Coffee)~or(Item,eq,Tea)"))
+        self.assertIsNone(self.replica.query("expenses", "(Date,ge,pastWeek,)"))
+
+    def test_merge_keeps_unsent_fields(self):
+        self.replica.merge("expenses", [{"Id": "2", "Amount": 2500}])
+
+        self.assertEqual(self.replica.get("expenses", 2), {"Id": 2, "Date": "2025-03-15", "Item": "Groceries", "Amount": 2500})
+
+
+class TestModelReplicaSync(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.replica = LocalReplica(Path(tmp.name) / "replica.sqlite3")
+        self.model = PortfolioTransactions("https://example.com", "token", "tx", replica=self.replica)
+        self.rows = [
+            {"Id": 1, "Ticker": "INFY.NS", "Date": "2025-01-02", "UpdatedAt": "2025-01-02 10:00:00"},
+            {"Id": 2, "Ticker": "TCS.NS", "Date": "2025-01-03", "UpdatedAt": "2025-01-03 10:00:00"},
+        ]
+
+    @patch("requests.Session.post")
+    @patch("requests.Session.get")
+    def test_reads_are_local_after_first_sync_and_writes_go_through(self, mock_get, mock_post):
+        mock_get.return_value = _page(self.rows)
+        mock_post.return_value = MagicMock(ok=True, **{"json.return_value": {"Id": 3}})
+
+        self.model.list()
+        self.model.create({"Ticker": "SBIN.NS", "Date": "2025-01-04"})
+        rows = self.model.list(where='{"filters": ["(Ticker,eq,SBIN.NS)"]}')
+
+        mock_get.assert_called_once()
+        self.assertEqual(rows, [{"Ticker": "SBIN.NS", "Date": "2025-01-04", "Id": 3}])
+
+    @patch("requests.Session.get")
+    def test_delta_sync_pulls_changes_since_high_water(self, mock_get):
+        mock_get.return_value = _page(self.rows)
+        self.model.sync_replica(full=True)
+
+        changed = {**self.rows[1], "Ticker": "TCS.BO", "UpdatedAt": "2025-01-05 09:00:00"}
+        mock_get.side_effect = [_page([changed]), _page([{"Id": 1}, {"Id": 2}])]
+        with patch.object(self.replica, "is_fresh", return_value=False):
+            self.assertTrue(self.model.sync_replica())
+
+        delta_params = mock_get.call_args_list[1].kwargs["params"]
+        self.assertEqual(delta_params["where"], "(UpdatedAt,ge,exactDate,2025-01-03)")
+        self.assertEqual(self.replica.get("tx", 2)["Ticker"], "TCS.BO")
+
+    @patch("requests.Session.get")
+    def test_outside_deletes_are_pruned_even_when_the_count_is_unchanged(self, mock_get):
+        mock_get.return_value = _page(self.rows)
+        self.model.sync_replica(full=True)
+
+        # Row 2 deleted in the NocoDB UI and row 3 added: the row count stays at two.
+        added = {"Id": 3, "Ticker": "SBIN.NS", "Date": "2025-01-06", "UpdatedAt": "2025-01-06 10:00:00"}
+        mock_get.side_effect = [_page([added]), _page([{"Id": 1}, {"Id": 3}])]
+        with patch.object(self.replica, "is_fresh", return_value=False):
+            self.assertTrue(self.model.sync_replica())
+
+        self.assertEqual(mock_get.call_args.kwargs["params"]["fields"], "Id")
+        self.assertIsNone(self.replica.get("tx", 2))
+        self.assertEqual([r["Id"] for r in self.replica.query("tx")], [1, 3])
+
+    def test_deleting_the_highest_id_row_is_pruned(self):
+        self.replica.replace_all("tx", [*self.rows, {"Id": 3, "Ticker": "SBIN.NS"}])
+
+        self.assertEqual(self.replica.prune("tx", [1, 2]), [3])
+        self.assertIsNone(self.replica.get("tx", 3))
+
+    @patch("requests.Session.post")
+    @patch("requests.Session.get")
+    def test_rows_written_through_during_a_sync_are_not_pruned(self, mock_get, mock_post):
+        mock_get.return_value = _page(self.rows)
+        self.model.sync_replica(full=True)
+        mock_post.return_value = MagicMock(ok=True, **{"json.return_value": {"Id": 3}})
+
+        def get(*args, params, **kwargs):
+            if params.get("fields") != "Id":
+                return _page([])
+            # Row 3 is created after NocoDB answered with the Id list.
+            self.model.create({"Ticker": "SBIN.NS", "Date": "2025-01-06"})
+            return _page([{"Id": 1}, {"Id": 2}])
+
+        mock_get.side_effect = get
+        with patch.object(self.replica, "is_fresh", return_value=False):
+            self.assertTrue(self.model.sync_replica())
+
+        self.assertEqual(self.replica.get("tx", 3)["Ticker"], "SBIN.NS")
+        self.assertEqual(self.replica.prune("tx", [1, 2]), [3])  # outside a sync it is fair game
+
+    def test_non_numeric_ids_are_treated_as_missing(self):
+        self.replica.replace_all("tx", self.rows)
+
+        self.assertIsNone(self.replica.get("tx", "abc"))
+        self.replica.delete("tx", ["abc", "1"])
+        self.assertEqual(self.replica.count("tx"), 1)
+
+if __name__ == "__main__":
+    unittest.main()
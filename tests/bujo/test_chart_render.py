@@ -0,0 +1,55 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from bujo.analytics import render
+
+ROWS = [
+    {"Id": 1, "Date": "2025-03-01", "Item": "Coffee", "Amount": 120, "Note": "ignored"},
+    {"Id": 2, "Date": "2025-03-02", "Item": "Groceries", "Amount": 2400},
+]
+
+
+class TestChartRender(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = Path(tmp.name)
+        for target, value in (
+            ("_CHART_CACHE_DIR", self.cache_dir),
+            ("_CHART_RENDER_WORKERS", 0),
+            ("_memory", render.OrderedDict()),
+        ):
+            patcher = patch.object(render, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_cache_key_tracks_chart_filters_and_plotted_data(self):
+        rows = render._slim(ROWS)
+        key = render.chart_cache_key("category_pie", "March", "", rows)
+
+        self.assertEqual(key, render.chart_cache_key("category_pie", "March", "", render._slim(ROWS)))
+        self.assertNotEqual(key, render.chart_cache_key("daily_bar", "March", "", rows))
+        self.assertNotEqual(key, render.chart_cache_key("category_pie", "March", "excluding: Coffee", rows))
+        self.assertNotEqual(key, render.chart_cache_key("category_pie", "March", "", rows[:1]))
+
+    async def test_repeat_request_is_served_from_memory_then_disk(self):
+        with patch.object(render, "_render_png", return_value=b"png-bytes") as render_png:
+            first = await render.render_chart("category_pie", ROWS, "March")
+            second = await render.render_chart("category_pie", ROWS, "March")
+            render._memory.clear()
+            third = await render.render_chart("category_pie", ROWS, "March")
+
+        self.assertEqual({first, second, third}, {b"png-bytes"})
+        render_png.assert_called_once()
+        self.assertEqual(render_png.call_args.args[1][0], {"Date": "2025-03-01", "Item": "Coffee", "Category": None, "Amount": 120})
+        self.assertEqual(len(list(self.cache_dir.glob("*.png"))), 1)
+
+    async def test_unknown_chart_type_is_rejected(self):
+        with self.assertRaises(ValueError):
+            await render.render_chart("scatter", ROWS, "March")
+
+
+if __name__ == "__main__":
+    unittest.main()
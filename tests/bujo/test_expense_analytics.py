@@ -1,12 +1,16 @@
 import sys
+import tempfile
 import types
 import unittest
+from pathlib import Path
 from unittest.mock import MagicMock
 
 
 fake_base = types.ModuleType("bujo.base")
 fake_base.WOLFRAM_APP_ID = "app"
 fake_base.expenses_model = MagicMock()
+fake_base.expense_rollups = None
+fake_base.expense_search_index = None
 fake_base.llm = MagicMock()
 sys.modules["bujo.base"] = fake_base
 
@@ -34,6 +38,10 @@ fake_messages.HumanMessage = object
 fake_messages.SystemMessage = object
 sys.modules.setdefault("langchain_core.messages", fake_messages)
 
+fake_runnables = types.ModuleType("langchain_core.runnables")
+fake_runnables.RunnableConfig = dict
+sys.modules.setdefault("langchain_core.runnables", fake_runnables)
+
 fake_tools = types.ModuleType("langchain_core.tools")
 fake_tools.Tool = MagicMock()
 sys.modules.setdefault("langchain_core.tools", fake_tools)
@@ -46,7 +54,8 @@ fake_prebuilt = types.ModuleType("langgraph.prebuilt")
 fake_prebuilt.create_react_agent = MagicMock()
 sys.modules.setdefault("langgraph.prebuilt", fake_prebuilt)
 
-from bujo.agent import _apply_expense_filters, _choose_chart_type, _extract_excluded_terms
+from bujo.agent import _apply_expense_filters, _choose_chart_type, _extract_excluded_terms, _indexed_expense_filters
+from bujo.expenses.search_index import ExpenseSearchIndex
 
 
 class TestExpenseAnalyticsFiltering(unittest.TestCase):
@@ -82,6 +91,43 @@ class TestExpenseAnalyticsFiltering(unittest.TestCase):
 
         self.assertEqual([e["Item"] for e in filtered], ["Home Loan"])
 
+    def test_filters_accept_streaming_rows(self):
+        rows = iter([
+            {"Item": "Swiggy", "Amount": 400},
+            {"Item": "Swiggy Instamart", "Amount": 900},
+            {"Item": "Fuel", "Amount": 1500},
+        ])
+
+        filtered, summary = _apply_expense_filters(
+            rows, {"include_terms": ["swiggy"], "exclude_terms": ["instamart"]}, ""
+        )
+
+        self.assertEqual([e["Amount"] for e in filtered], [400])
+        self.assertIn("included swiggy (3 -> 2)", summary)
+        self.assertIn("excluded instamart (2 -> 1)", summary)
+
+    def test_index_lookup_matches_the_streaming_filter(self):
+        rows = [
+            {"Id": 1, "Item": "Swiggy", "Amount": 400, "Date": "2026-05-01"},
+            {"Id": 2, "Item": "Swiggy Instamart", "Amount": 900, "Date": "2026-05-02"},
+            {"Id": 3, "Item": "Fuel", "Amount": 1500, "Date": "2026-05-03"},
+            {"Id": 4, "Item": "Swiggy", "Amount": 300, "Date": "2026-06-01"},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            index = ExpenseSearchIndex(Path(tmp) / "search.sqlite3")
+            index.rebuild(rows)
+
+            filtered, summary, seen = _indexed_expense_filters(
+                index, ["swiggy"], ["instamart"], "2026-05-01", "2026-06-01"
+            )
+
+        expected, expected_summary = _apply_expense_filters(
+            rows[:3], {"include_terms": ["swiggy"], "exclude_terms": ["instamart"]}, ""
+        )
+        self.assertEqual(filtered, expected)
+        self.assertEqual(summary, expected_summary)
+        self.assertEqual(seen, 3)
+
     def test_chart_type_honors_user_line_chart_request(self):
         chart_type = _choose_chart_type(
             {"chart_type": "pie"},
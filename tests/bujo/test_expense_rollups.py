@@ -0,0 +1,173 @@
+import random
+import tempfile
+import unittest
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from bujo.expenses.rollups import ExpenseRollups, bucket_of
+from bujo.models.expenses import Expenses
+from bujo.models.replica import LocalReplica
+
+
+def _expenses(n=300, seed=7):
+    rng = random.Random(seed)
+    start = date(2024, 12, 20)
+    return [
+        {
+            "Id": i,
+            "Date": (start + timedelta(days=rng.randint(0, 120))).isoformat(),
+            "Item": rng.choice(["Coffee", "Groceries", "Fuel", "", None]),
+            "Category": rng.choice(["Food", None]),
+            "Amount": rng.randint(10, 5000),
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def _naive(expenses, grain, start=None, end=None):
+    totals = defaultdict(float)
+    for exp in expenses:
+        if (start and exp["Date"] < start) or (end and exp["Date"] >= end):
+            continue
+        if grain == "item":
+            key = str(exp.get("Item") or exp.get("Category") or "Misc").strip() or "Misc"
+        else:
+            key = bucket_of(grain, date.fromisoformat(exp["Date"]))
+        totals[key] += exp["Amount"]
+    return dict(totals)
+
+
+class TestExpenseRollups(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.rollups = ExpenseRollups(Path(tmp.name) / "rollups.sqlite3")
+        self.expenses = _expenses()
+
+    def test_rebuild_matches_raw_aggregation_for_every_grain_and_window(self):
+        self.rollups.rebuild(self.expenses)
+
+        windows = [(None, None), ("2025-01-01", "2025-02-01"), ("2025-01-06", "2025-02-03"), ("2025-01-15", "2025-03-10")]
+        for grain in ("day", "week", "month", "item"):
+            for start, end in windows:
+                with self.subTest(grain=grain, start=start, end=end):
+                    got = self.rollups.totals(grain, start, end)
+                    self.assertEqual(got.keys(), _naive(self.expenses, grain, start, end).keys())
+                    for key, total in _naive(self.expenses, grain, start, end).items():
+                        self.assertAlmostEqual(got[key], total)
+        self.assertEqual(self.rollups.count("2025-01-01", "2025-02-01"),
+                         sum(1 for e in self.expenses if "2025-01-01" <= e["Date"] < "2025-02-01"))
+
+    def test_add_is_incremental_and_idempotent(self):
+        new = {"Id": 999, "Date": "2025-03-03", "Item": "Books", "Amount": 450}
+        self.assertFalse(self.rollups.add(new))  # not built yet; the first rebuild will count it
+
+        self.rollups.rebuild(self.expenses)
+        before = self.rollups.totals("month", "2025-03-01", "2025-04-01").get("2025-03", 0)
+        self.assertTrue(self.rollups.add(new))
+        self.assertFalse(self.rollups.add(new))
+
+        self.assertAlmostEqual(self.rollups.totals("month", "2025-03-01", "2025-04-01")["2025-03"], before + 450)
+        self.assertEqual(self.rollups.totals("item", "2025-03-03", "2025-03-04")["Books"], 450)
+        self.assertEqual(self.rollups.totals("week", "2025-03-03", "2025-03-10")["2025-W10"],
+                         _naive(self.expenses + [new], "week", "2025-03-03", "2025-03-10")["2025-W10"])
+
+    def test_updates_and_deletes_replace_the_counted_contribution(self):
+        self.rollups.rebuild(self.expenses)
+        target = next(e for e in self.expenses if e["Item"] == "Fuel")
+        edited = [dict(e) for e in self.expenses]
+        moved = next(e for e in edited if e["Id"] == target["Id"])
+
+        # A PATCH body carries only the changed fields; the rest comes from the counted copy.
+        self.rollups.upsert([{"Id": target["Id"], "Amount": 7777, "Item": "Books"}])
+        self.rollups.upsert([{"Id": target["Id"], "Amount": 7777}])  # repeating it changes nothing
+        moved.update(Amount=7777, Item="Books")
+        removed = edited.pop(0)
+        self.rollups.remove([removed["Id"], "not-an-id"])
+
+        for grain in ("day", "month", "item"):
+            with self.subTest(grain=grain):
+                got, expected = self.rollups.totals(grain), _naive(edited, grain)
+                self.assertEqual(got.keys(), expected.keys())
+                for key, total in expected.items():
+                    self.assertAlmostEqual(got[key], total)
+        self.assertEqual(self.rollups.count(), len(edited))
+
+    def test_writes_during_a_rebuild_survive_it(self):
+        new = {"Id": 999, "Date": "2025-03-03", "Item": "Books", "Amount": 450}
+        gone = self.expenses[-1]
+
+        def snapshot():
+            # The rows were read before these writes landed, as with a paginated fetch.
+            for i, expense in enumerate(self.expenses):
+                if i == 10:
+                    self.rollups.add(new)
+                    self.rollups.remove([gone["Id"]])
+                yield expense
+
+        self.rollups.rebuild(snapshot())
+
+        expected = _naive(self.expenses[:-1] + [new], "day")
+        got = self.rollups.totals("day")
+        self.assertEqual(got.keys(), expected.keys())
+        for key, total in expected.items():
+            self.assertAlmostEqual(got[key], total)
+        self.assertEqual(self.rollups.count(), len(self.expenses))
+
+    @patch("requests.Session.delete")
+    @patch("requests.Session.patch")
+    @patch("requests.Session.post")
+    def test_model_writes_go_through_to_the_rollups(self, mock_post, mock_patch, mock_delete):
+        model = Expenses("https://example.com", "token", "expenses", "link", MagicMock(), rollups=self.rollups)
+        self.rollups.rebuild([])
+        mock_post.return_value = MagicMock(ok=True, **{"json.return_value": {"Id": 1}})
+        mock_patch.return_value = MagicMock(ok=True, **{"json.return_value": {"Id": 1}})
+        mock_delete.return_value = MagicMock(ok=True)
+
+        model.create({"Date": "2025-03-03", "Item": "Books", "Amount": 450})
+        self.assertEqual(self.rollups.totals("month"), {"2025-03": 450})
+        model.update("1", {"Date": "2025-04-01"})
+        self.assertEqual(self.rollups.totals("month"), {"2025-04": 450})
+        model.delete(1)
+        self.assertEqual(self.rollups.totals("month"), {})
+
+    @patch("requests.Session.get")
+    def test_replica_syncs_carry_outside_edits_into_the_rollups(self, mock_get):
+        def page(rows):
+            return MagicMock(ok=True, **{"json.return_value": {"list": rows, "PageInfo": {"isLastPage": True}}})
+
+        replica = LocalReplica(Path(self.rollups.path).parent / "replica.sqlite3")
+        model = Expenses("https://example.com", "token", "expenses", "link", MagicMock(),
+                         replica=replica, rollups=self.rollups)
+        rows = [
+            {"Id": 1, "Date": "2025-03-01", "Item": "Rent", "Amount": 25000, "UpdatedAt": "2025-03-01 09:00:00"},
+            {"Id": 2, "Date": "2025-03-02", "Item": "Fuel", "Amount": 1500, "UpdatedAt": "2025-03-02 09:00:00"},
+        ]
+        mock_get.return_value = page(rows)
+        self.rollups.ensure_built(model)  # the first sync is a full pull, which builds the rollups
+        self.assertEqual(self.rollups.totals("month"), {"2025-03": 26500})
+        self.assertEqual(mock_get.call_count, 1)
+
+        # In the NocoDB UI: Fuel edited to 2000, Rent deleted.
+        edited = {**rows[1], "Amount": 2000, "UpdatedAt": "2025-03-05 09:00:00"}
+        mock_get.side_effect = [page([edited]), page([{"Id": 2}])]
+        with patch.object(replica, "is_fresh", return_value=False):
+            self.rollups.ensure_built(model)
+
+        self.assertEqual(self.rollups.totals("item"), {"Fuel": 2000})
+        self.assertEqual(self.rollups.count(), 1)
+
+    def test_expense_rows_are_one_per_bucket(self):
+        self.rollups.rebuild(self.expenses)
+
+        rows = self.rollups.as_expense_rows("week", "2025-01-06", "2025-01-20")
+
+        self.assertEqual([r["Date"] for r in rows], ["2025-01-06", "2025-01-13"])
+        self.assertAlmostEqual(sum(r["Amount"] for r in rows),
+                               sum(_naive(self.expenses, "day", "2025-01-06", "2025-01-20").values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
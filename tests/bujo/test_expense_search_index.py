@@ -0,0 +1,90 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from bujo.expenses.search_index import ExpenseSearchIndex, stem, tokenize
+
+ROWS = [
+    {"Id": 1, "Date": "2025-03-01", "Item": "Swiggy", "Category": "Food", "Amount": 420},
+    {"Id": 2, "Date": "2025-03-02", "Item": "Swiggy Instamart", "Note": "weekly groceries", "Amount": 1800},
+    {"Id": 3, "Date": "2025-03-03", "Item": "Home Loan", "Type": "EMI", "Amount": 50000},
+    {"Id": 4, "Date": "2025-03-04", "Item": "Grocery", "Description": "Big Basket orders", "Amount": 2300},
+    {"Id": 5, "Date": "2025-04-01", "Item": "Fuel", "Amount": 1500},
+]
+
+
+class TestTokenizer(unittest.TestCase):
+    def test_plurals_fold_to_the_same_token(self):
+        self.assertEqual(tokenize("Big-Basket ORDERS, groceries"), ["big", "basket", "order", "grocery"])
+        self.assertEqual(stem("bus"), "bus")
+        self.assertEqual(stem("glass"), "glass")
+        self.assertEqual(stem("fees"), "fee")
+
+
+class TestExpenseSearchIndex(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.index = ExpenseSearchIndex(Path(tmp.name) / "search.sqlite3")
+        self.index.rebuild(ROWS)
+
+    def test_prefix_stem_and_multi_word_matching(self):
+        self.assertEqual(self.index.match("swig"), {1, 2})
+        self.assertEqual(self.index.match("Groceries"), {2, 4})
+        self.assertEqual(self.index.match("order"), {4})
+        self.assertEqual(self.index.match("home loan"), {3})
+        self.assertEqual(self.index.match("loan home"), {3})
+        self.assertEqual(self.index.match("swiggy loan"), set())
+        self.assertEqual(self.index.match("  "), set())
+
+    def test_search_applies_terms_and_date_window(self):
+        found = self.index.search(["swiggy", "grocer"], ["instamart"], "2025-03-01", "2025-04-01")
+
+        self.assertEqual([r["Id"] for r in found], [1, 4])
+        self.assertEqual([r["Id"] for r in self.index.search(exclude_terms=["loan"])], [1, 2, 4, 5])
+        self.assertEqual(self.index.count("2025-03-01", "2025-04-01"), 4)
+
+    def test_writes_are_applied_in_place(self):
+        self.index.upsert([{"Id": 6, "Date": "2025-04-02", "Item": "Swiggy Dineout", "Amount": 900}])
+        self.index.upsert([{"Id": 3, "Item": "Car Loan"}])  # a PATCH body carries only the changed fields
+        self.index.remove([1])
+
+        self.assertEqual(self.index.match("swiggy"), {2, 6})
+        self.assertEqual(self.index.match("home"), set())
+        self.assertEqual(self.index.rows([3])[0]["Amount"], 50000)
+
+    def test_writes_during_a_rebuild_survive_it(self):
+        def snapshot():
+            # The rows were read before these writes landed, as with a paginated fetch.
+            for i, row in enumerate(ROWS):
+                if i == 2:
+                    self.index.upsert([{"Id": 6, "Date": "2025-04-02", "Item": "Swiggy Dineout", "Amount": 900}])
+                    self.index.remove([1])
+                yield row
+
+        self.index.rebuild(snapshot())
+
+        self.assertEqual(self.index.match("swiggy"), {2, 6})
+        self.assertEqual(self.index.count(), 5)
+
+    def test_large_index_agrees_with_a_scan(self):
+        rng = random.Random(3)
+        words = ["swiggy", "zomato", "uber", "rent", "fuel", "groceries", "medicine", "books"]
+        rows = [
+            {"Id": i, "Date": f"2025-01-{rng.randint(1, 28):02d}", "Item": " ".join(rng.sample(words, 2)), "Amount": 1}
+            for i in range(1, 2001)
+        ]
+        self.index.rebuild(rows)
+
+        for term in ("swig", "grocery", "uber rent"):
+            with self.subTest(term=term):
+                expected = {
+                    r["Id"] for r in rows
+                    if all(any(t.startswith(q) for t in tokenize(r["Item"])) for q in tokenize(term))
+                }
+                self.assertEqual(self.index.match(term), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
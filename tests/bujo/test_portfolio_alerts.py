@@ -1,7 +1,10 @@
 import json
 import os
 import sys
+import tempfile
+import time
 import types
+from pathlib import Path
 import unittest
 from unittest.mock import MagicMock, patch
 
@@ -52,7 +55,16 @@ fake_prebuilt = types.ModuleType("langgraph.prebuilt")
 fake_prebuilt.create_react_agent = MagicMock()
 sys.modules.setdefault("langgraph.prebuilt", fake_prebuilt)
 
-from bujo.portoflio.alerts import _check_thesis_note, _compute_open_positions
+from bujo.portoflio import alerts
+from bujo.portoflio.llm_cache import LLMResultCache
+from bujo.portoflio.alerts import (
+    _compute_open_positions,
+    _format_thesis_alerts,
+    _request_news_classification,
+    _request_thesis_check,
+    _review_news_and_thesis,
+    run_portfolio_alerts,
+)
 
 
 def _make_llm_response(items: list) -> MagicMock:
@@ -64,16 +76,22 @@ def _make_llm_response(items: list) -> MagicMock:
 class TestCheckThesisNote(unittest.TestCase):
     def setUp(self):
         fake_base.openai_model.chat.completions.create.reset_mock(side_effect=True, return_value=True)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = patch.object(alerts, "_LLM_CACHE", LLMResultCache(Path(tmp.name) / "cache.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
     # --- guard clauses ---
 
     def test_empty_note_returns_no_alerts(self):
-        result = _check_thesis_note("Acme Corp", "ACME.NS", "", [{"title": "Acme posts record profits"}])
+        alerts._LLM_CACHE.put(alerts._headline_key("ACME.NS", "Acme posts record profits"), {"priority": "LOW"})
+        _, result = _review_news_and_thesis("Acme Corp", "ACME.NS", "", [{"title": "Acme posts record profits"}])
         self.assertEqual(result, [])
         fake_base.openai_model.chat.completions.create.assert_not_called()
 
     def test_whitespace_only_note_returns_no_alerts(self):
-        result = _check_thesis_note("Acme Corp", "ACME.NS", "   ", [])
+        _, result = _review_news_and_thesis("Acme Corp", "ACME.NS", "   ", [])
         self.assertEqual(result, [])
         fake_base.openai_model.chat.completions.create.assert_not_called()
 
@@ -81,11 +99,11 @@ class TestCheckThesisNote(unittest.TestCase):
 
     def test_llm_returns_empty_array_produces_no_alerts(self):
         fake_base.openai_model.chat.completions.create.return_value = _make_llm_response([])
-        result = _check_thesis_note(
+        result = _format_thesis_alerts(_request_thesis_check(
             "MRF Ltd", "MRF.NS",
             "Exit on monsoon shock + tractor demand collapse.",
             [{"title": "MRF reports steady Q4 volumes"}],
-        )
+        ) or [])
         self.assertEqual(result, [])
 
     # --- LLM returns triggered conditions ---
@@ -94,11 +112,11 @@ class TestCheckThesisNote(unittest.TestCase):
         fake_base.openai_model.chat.completions.create.return_value = _make_llm_response([
             {"condition": "exit on RBI restrictive action", "evidence": "RBI issued circular restricting NBFC lending limits"}
         ])
-        result = _check_thesis_note(
+        result = _format_thesis_alerts(_request_thesis_check(
             "Shriram Finance", "SHRIRAMFIN.NS",
             "Trim if NIM falls below 9.0%; exit on RBI restrictive action.",
             [{"title": "RBI tightens NBFC lending norms"}],
-        )
+        ) or [])
         self.assertEqual(len(result), 1)
         self.assertIn("📋 *Thesis alert*", result[0])
         self.assertIn("exit on RBI restrictive action", result[0])
@@ -109,11 +127,11 @@ class TestCheckThesisNote(unittest.TestCase):
             {"condition": "Trim if order inflow growth <10%", "evidence": "Q4 order book grew only 7% YoY per management commentary"},
             {"condition": "exit if working capital exceeds 12% of sales", "evidence": "Working capital at 14% as per latest balance sheet"},
         ])
-        result = _check_thesis_note(
+        result = _format_thesis_alerts(_request_thesis_check(
             "L&T", "LT.NS",
             "Trim if order inflow growth <10% for two consecutive quarters; exit if working capital exceeds 12% of sales.",
             [{"title": "L&T Q4 results — order inflows disappoint"}, {"title": "L&T working capital rises sharply"}],
-        )
+        ) or [])
         self.assertEqual(len(result), 2)
 
     # --- LLM response robustness ---
@@ -122,11 +140,11 @@ class TestCheckThesisNote(unittest.TestCase):
         fake_base.openai_model.chat.completions.create.return_value = _make_llm_response([
             {"condition": "exit on governance shock"}
         ])
-        result = _check_thesis_note(
+        result = _format_thesis_alerts(_request_thesis_check(
             "Zee Entertainment", "ZEEL.NS",
             "Exit on governance shock.",
             [{"title": "Zee promoter arrested"}],
-        )
+        ) or [])
         self.assertEqual(len(result), 1)
         self.assertIn("exit on governance shock", result[0])
 
@@ -134,38 +152,38 @@ class TestCheckThesisNote(unittest.TestCase):
         fake_base.openai_model.chat.completions.create.return_value = _make_llm_response([
             {"evidence": "some evidence but no condition key"}
         ])
-        result = _check_thesis_note(
+        result = _format_thesis_alerts(_request_thesis_check(
             "Tata Motors", "TATAMOTORS.NS",
             "Trim if SUV market share drops 200 bps.",
             [{"title": "Tata Motors loses ground to Mahindra"}],
-        )
+        ) or [])
         self.assertEqual(result, [])
 
     def test_llm_returns_malformed_json_returns_no_alerts(self):
         resp = MagicMock()
         resp.choices[0].message.content = "Sorry, I cannot evaluate this."
         fake_base.openai_model.chat.completions.create.return_value = resp
-        result = _check_thesis_note(
+        result = _format_thesis_alerts(_request_thesis_check(
             "HDFC Bank", "HDFCBANK.NS",
             "Trim if NIM falls below 9.0%.",
             [{"title": "HDFC Bank Q3 NIM at 8.8%"}],
-        )
+        ) or [])
         self.assertEqual(result, [])
 
     def test_llm_raises_exception_returns_no_alerts(self):
         fake_base.openai_model.chat.completions.create.side_effect = RuntimeError("API timeout")
-        result = _check_thesis_note(
+        result = _format_thesis_alerts(_request_thesis_check(
             "Infosys", "INFY.NS",
             "Exit on governance shock or major client loss.",
             [{"title": "Infosys loses major US banking client"}],
-        )
+        ) or [])
         self.assertEqual(result, [])
 
     # --- no news case ---
 
     def test_no_news_items_still_calls_llm_with_placeholder(self):
         fake_base.openai_model.chat.completions.create.return_value = _make_llm_response([])
-        _check_thesis_note(
+        _request_thesis_check(
             "Mahindra & Mahindra", "M&M.NS",
             "Trim if SUV market share drops 200 bps.",
             [],
@@ -175,6 +193,26 @@ class TestCheckThesisNote(unittest.TestCase):
         self.assertIn("No recent news headlines available.", prompt)
 
 
+class TestRequestNewsClassification(unittest.TestCase):
+    def setUp(self):
+        fake_base.openai_model.chat.completions.create.reset_mock(side_effect=True, return_value=True)
+
+    def test_high_items_are_returned(self):
+        fake_base.openai_model.chat.completions.create.return_value = _make_llm_response([
+            {"headline": "Auditor resigns at Acme", "reason": "governance red flag"}
+        ])
+        result = _request_news_classification(
+            "Acme Corp", "ACME.NS", [{"title": "Auditor resigns at Acme"}, {"title": "Acme Q2 in line"}],
+        )
+        self.assertEqual(result, [{"headline": "Auditor resigns at Acme", "reason": "governance red flag"}])
+        prompt = fake_base.openai_model.chat.completions.create.call_args.kwargs["messages"][0]["content"]
+        self.assertIn("- Acme Q2 in line", prompt)
+
+    def test_failed_call_returns_none(self):
+        fake_base.openai_model.chat.completions.create.side_effect = RuntimeError("API timeout")
+        self.assertIsNone(_request_news_classification("Acme Corp", "ACME.NS", [{"title": "Acme news"}]))
+
+
 class TestComputeOpenPositionsNote(unittest.TestCase):
 
     def test_note_collected_from_buy_transaction(self):
@@ -274,5 +312,139 @@ class TestComputeOpenPositionsNote(unittest.TestCase):
         self.assertEqual(positions["RELIANCE.NS"]["note"], "Hold for jio spinoff.")
 
 
+class TestReviewNewsAndThesis(unittest.TestCase):
+    def setUp(self):
+        fake_base.openai_model.chat.completions.create.reset_mock(side_effect=True, return_value=True)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_path = Path(tmp.name) / "cache.json"
+        patcher = patch.object(alerts, "_LLM_CACHE", LLMResultCache(self.cache_path))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_single_request_returns_both_result_lists(self):
+        resp = MagicMock()
+        resp.choices[0].message.content = json.dumps({
+            "news": [{"headline": "Auditor resigns at Acme", "reason": "governance red flag"}],
+            "thesis": [{"condition": "exit on governance shock", "evidence": "auditor resigned"}],
+        })
+        fake_base.openai_model.chat.completions.create.return_value = resp
+
+        news, thesis = _review_news_and_thesis(
+            "Acme Corp", "ACME.NS", "Exit on governance shock.", [{"title": "Auditor resigns at Acme"}],
+        )
+
+        fake_base.openai_model.chat.completions.create.assert_called_once()
+        kwargs = fake_base.openai_model.chat.completions.create.call_args.kwargs
+        self.assertEqual(kwargs["response_format"], {"type": "json_object"})
+        self.assertEqual(len(news), 1)
+        self.assertIn("Auditor resigns at Acme", news[0])
+        self.assertEqual(len(thesis), 1)
+        self.assertIn("📋 *Thesis alert*", thesis[0])
+
+    def test_without_note_only_news_is_classified(self):
+        fake_base.openai_model.chat.completions.create.return_value = _make_llm_response([])
+
+        news, thesis = _review_news_and_thesis("Acme Corp", "ACME.NS", "", [{"title": "Acme wins order"}])
+
+        self.assertEqual((news, thesis), ([], []))
+        prompt = fake_base.openai_model.chat.completions.create.call_args.kwargs["messages"][0]["content"]
+        self.assertNotIn("thesis", prompt.lower())
+
+    def test_nothing_to_review_skips_the_model(self):
+        self.assertEqual(_review_news_and_thesis("Acme Corp", "ACME.NS", "", []), ([], []))
+        fake_base.openai_model.chat.completions.create.assert_not_called()
+
+    def test_malformed_response_returns_no_alerts(self):
+        resp = MagicMock()
+        resp.choices[0].message.content = "not json"
+        fake_base.openai_model.chat.completions.create.return_value = resp
+
+        result = _review_news_and_thesis("Acme Corp", "ACME.NS", "Exit on fraud.", [{"title": "Acme news"}])
+
+        self.assertEqual(result, ([], []))
+        fake_base.openai_model.chat.completions.create.return_value = _make_llm_response([])
+        _review_news_and_thesis("Acme Corp", "ACME.NS", "", [{"title": "Acme news"}])
+        fake_base.openai_model.chat.completions.create.assert_called()  # failures are not cached
+
+    def test_next_run_only_sends_unseen_headlines(self):
+        create = fake_base.openai_model.chat.completions.create
+        create.return_value = _make_llm_response([{"headline": "Acme CFO resigns", "reason": "leadership churn"}])
+        _review_news_and_thesis("Acme Corp", "ACME.NS", "", [{"title": "Acme CFO resigns"}, {"title": "Acme Q2 in line"}])
+        alerts._LLM_CACHE.save()
+
+        create.reset_mock()
+        create.return_value = _make_llm_response([])
+        with patch.object(alerts, "_LLM_CACHE", LLMResultCache(self.cache_path)):
+            news, _ = _review_news_and_thesis(
+                "Acme Corp", "ACME.NS", "",
+                [{"title": "Acme CFO resigns"}, {"title": "Acme Q2 in line"}, {"title": "Acme opens new plant"}],
+            )
+
+        create.assert_called_once()
+        prompt = create.call_args.kwargs["messages"][0]["content"]
+        self.assertIn("Acme opens new plant", prompt)
+        self.assertNotIn("Acme CFO resigns", prompt)
+        self.assertEqual(len(news), 1)
+        self.assertIn("leadership churn", news[0])
+
+    def test_repeat_reuses_headline_verdicts_but_rechecks_the_thesis(self):
+        create = fake_base.openai_model.chat.completions.create
+        resp = MagicMock()
+        resp.choices[0].message.content = json.dumps({
+            "news": [], "thesis": [{"condition": "exit on fraud", "evidence": "probe opened"}],
+        })
+        create.return_value = resp
+        items = [{"title": "Probe opened into Acme"}]
+        first = _review_news_and_thesis("Acme Corp", "ACME.NS", "Exit on fraud.", items)
+
+        create.return_value = _make_llm_response([{"condition": "exit on fraud", "evidence": "probe opened"}])
+        second = _review_news_and_thesis("Acme Corp", "ACME.NS", "Exit on fraud.", items)
+
+        self.assertEqual(create.call_count, 2)
+        prompt = create.call_args.kwargs["messages"][0]["content"]
+        self.assertNotIn("HIGH or LOW", prompt)  # the headline verdict came from the cache
+        self.assertEqual(first, second)
+
+
+class TestLLMResultCache(unittest.TestCase):
+    def test_entries_older_than_max_age_are_evicted_on_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "cache.json"
+            cache = LLMResultCache(path)
+            cache.put("fresh", {"priority": "LOW"})
+            cache.put("stale", {"priority": "HIGH"})
+            cache._entries["stale"]["t"] -= 30 * 86400
+            cache.save()
+
+            reloaded = LLMResultCache(path, max_age_days=7)
+            self.assertEqual(reloaded.get("fresh"), {"priority": "LOW"})
+            self.assertIsNone(reloaded.get("stale"))
+            self.assertNotIn("stale", json.loads(path.read_text()))
+
+
+class TestRunPortfolioAlerts(unittest.TestCase):
+    def test_parallel_run_reports_positions_in_ledger_order(self):
+        txs = [
+            {"Id": i, "Ticker": t, "TransactionType": "Buy", "NoOfShares": 1,
+             "CostPerShare": 100, "CMP": 110, "Date": f"2024-01-{i:02d}"}
+            for i, t in enumerate(["ZED.NS", "ABC.NS", "MID.NS", "QUIET.NS"], start=1)
+        ]
+        model = MagicMock()
+        model.list.return_value = txs
+
+        def fake_alerts(ticker, position):
+            time.sleep({"ZED.NS": 0.03, "ABC.NS": 0.0, "MID.NS": 0.01}.get(ticker, 0))
+            return [] if ticker == "QUIET.NS" else [f"alert for {ticker}"]
+
+        with patch.object(alerts, "_alerts_for_ticker", side_effect=fake_alerts) as mock_check:
+            message = run_portfolio_alerts(model, workers=4)
+
+        self.assertEqual(mock_check.call_count, 4)
+        order = [message.index(f"*{t}*") for t in ("ZED.NS", "ABC.NS", "MID.NS")]
+        self.assertEqual(order, sorted(order))
+        self.assertNotIn("QUIET.NS", message)
+
+
 if __name__ == "__main__":
     unittest.main()
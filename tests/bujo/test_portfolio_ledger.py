@@ -1,9 +1,12 @@
+import random
+import tempfile
 import unittest
+from pathlib import Path
 
 from bujo.portoflio.ledger import (
+    IncrementalLedger,
     build_portfolio_ledger,
-    compute_cash_by_portfolio,
-    compute_positions_by_portfolio,
+    build_position_views,
 )
 
 
@@ -81,11 +84,11 @@ class TestPortfolioLedger(unittest.TestCase):
         self.assertTrue(any("Oversold SBIN.NS" in warning for warning in ledger["warnings"]))
 
     def test_rebalance_helper_uses_only_open_lots_after_reentry(self):
-        positions = compute_positions_by_portfolio([
+        positions = build_position_views([
             {"Id": 1, "Ticker": "TCS.NS", "Date": "2025-10-31", "TransactionType": "Sell", "NoOfShares": 10, "CostPerShare": 3061.30, "Portfolio": "Ishaan"},
             {"Id": 2, "Ticker": "TCS.NS", "Date": "2024-06-10", "TransactionType": "Buy", "NoOfShares": 10, "CostPerShare": 3860, "Portfolio": "Ishaan"},
             {"Id": 3, "Ticker": "TCS.NS", "Date": "2026-06-09", "TransactionType": "Buy", "NoOfShares": 6, "CostPerShare": 2135.30, "Portfolio": "Ishaan"},
-        ])
+        ], views=("positions_by_portfolio",))["positions_by_portfolio"]
 
         pos = positions["Ishaan"]["TCS.NS"]
 
@@ -102,8 +105,8 @@ class TestPortfolioLedger(unittest.TestCase):
             {"Ticker": "INFY.NS", "TransactionType": "Sell", "NoOfShares": 1, "CostPerShare": 1100, "Date": "2026-01-03", "Portfolio": "Core"},
         ]
 
-        cash = compute_cash_by_portfolio(txs)
-        positions = compute_positions_by_portfolio(txs)
+        views = build_position_views(txs)
+        cash, positions = views["cash_by_portfolio"], views["positions_by_portfolio"]
 
         self.assertEqual(cash["Core"], 5000)
         self.assertEqual(positions["Core"]["INFY.NS"]["net_shares"], 2)
@@ -111,5 +114,183 @@ class TestPortfolioLedger(unittest.TestCase):
         self.assertEqual(positions["Core"]["INFY.NS"]["notes"][0]["note"], "Thesis")
 
 
+def _history():
+    return [
+        {"Id": 1, "Ticker": "CASH", "Date": "2025-01-01", "TransactionType": "Deposit", "NoOfShares": 1, "CostPerShare": 50000, "Portfolio": "Core"},
+        {"Id": 2, "Ticker": "INFY.NS", "Date": "2025-01-02", "TransactionType": "Buy", "NoOfShares": 10, "CostPerShare": 1500, "CMP": 1600, "Portfolio": "Core"},
+        {"Id": 3, "Ticker": "AAPL", "Date": "2025-01-03", "TransactionType": "Buy", "NoOfShares": 2, "CostPerShare": 100, "CMP": 120, "Portfolio": "Core"},
+        {"Id": 4, "Ticker": "INFY.NS", "Date": "2025-02-01", "TransactionType": "Sell", "NoOfShares": 4, "CostPerShare": 1700, "CMP": 1600, "Portfolio": "Core"},
+    ]
+
+
+class TestIncrementalLedger(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "snapshot.json"
+
+    def assertSameLedger(self, actual, expected):
+        self.assertEqual(actual["portfolios"].keys(), expected["portfolios"].keys())
+        for key in ("totals", "holdings", "closed_positions", "warnings"):
+            self.assertEqual(actual[key], expected[key])
+
+    def test_appended_rows_are_folded_onto_snapshot(self):
+        rows = _history()
+        engine = IncrementalLedger(self.path)
+        engine.build(rows[:2], fx_rates={"USD": 80})
+
+        rows_later = rows + [{"Id": 5, "Ticker": "AAPL", "Date": "2025-03-01", "TransactionType": "Sell", "NoOfShares": 1, "CostPerShare": 150, "CMP": 130, "Portfolio": "Core"}]
+        ledger = IncrementalLedger(self.path).build(rows_later, fx_rates={"USD": 80})
+
+        self.assertSameLedger(ledger, build_portfolio_ledger(rows_later, fx_rates={"USD": 80}))
+
+    def test_modes_follow_row_changes(self):
+        rows = _history()
+        engine = IncrementalLedger(self.path)
+
+        engine.build(rows[:3])
+        self.assertEqual(engine.last_mode, "full")
+        engine.build(rows)
+        self.assertEqual(engine.last_mode, "delta")
+        refreshed = [{**tx, "CMP": 1800} if tx["Ticker"] == "INFY.NS" else tx for tx in rows]
+        ledger = engine.build(refreshed)
+        self.assertEqual(engine.last_mode, "unchanged")
+        infy = next(h for h in ledger["holdings"] if h["ticker"] == "INFY.NS")
+        self.assertEqual(infy["cmp_inr"], 1800)
+
+        edited = [{**tx, "NoOfShares": 5} if tx["Id"] == 4 else tx for tx in rows]
+        ledger = engine.build(edited)
+        self.assertEqual(engine.last_mode, "full")
+        self.assertSameLedger(ledger, build_portfolio_ledger(edited))
+
+        engine.build(edited[1:])
+        self.assertEqual(engine.last_mode, "full")
+
+    def test_a_restart_refolds_deltas_the_disk_snapshot_lacks(self):
+        rows = _history()
+        IncrementalLedger(self.path).build(rows[:2])
+        engine = IncrementalLedger(self.path)
+        engine.build(rows[:3])  # a small delta stays in memory
+        self.assertEqual(engine.last_mode, "delta")
+
+        restarted = IncrementalLedger(self.path)
+        ledger = restarted.build(rows)
+
+        self.assertEqual(restarted.last_mode, "delta")
+        self.assertSameLedger(ledger, build_portfolio_ledger(rows))
+
+    def test_back_dated_insert_rebuilds(self):
+        rows = _history()
+        engine = IncrementalLedger(self.path)
+        engine.build(rows)
+
+        backdated = rows + [{"Id": 9, "Ticker": "INFY.NS", "Date": "2025-01-15", "TransactionType": "Buy", "NoOfShares": 2, "CostPerShare": 1000, "Portfolio": "Core"}]
+        ledger = engine.build(backdated)
+
+        self.assertEqual(engine.last_mode, "full")
+        self.assertSameLedger(ledger, build_portfolio_ledger(backdated))
+
+    def test_rows_without_id_are_replayed_without_snapshot(self):
+        rows = [{k: v for k, v in tx.items() if k != "Id"} for tx in _history()]
+        engine = IncrementalLedger(self.path)
+
+        ledger = engine.build(rows)
+
+        self.assertEqual(engine.last_mode, "full")
+        self.assertFalse(self.path.exists())
+        self.assertSameLedger(ledger, build_portfolio_ledger(rows))
+
+
+def _messy_history(count, seed):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(count):
+        rows.append({
+            "Id": rnd.choice([i + 1, str(i + 1), None]),
+            "Date": rnd.choice([f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}", "", None, "2025-01-05T10:00:00"]),
+            "Ticker": rnd.choice(["INFY.NS", "tcs.ns", "AAPL", "CASH", "cash", "", None]),
+            "TransactionType": rnd.choice(["Buy", "buy", "Sell", "sold", "Deposit", "withdrawal", "Split", None]),
+            "NoOfShares": rnd.choice([rnd.randint(1, 50), str(rnd.randint(1, 50)), "1,000", 0, -3, 2.5, None]),
+            "CostPerShare": rnd.choice([rnd.uniform(10, 3000), "₹1,234.5", "$12", "", "n/a", None]),
+            "CMP": rnd.choice([rnd.uniform(10, 3000), "1,500", 0, None]),
+            "Portfolio": rnd.choice(["Core", "LT", " ", None]),
+            "Note": rnd.choice(["thesis", "  padded  ", "", None]),
+        })
+    return rows
+
+
+class TestPositionViews(unittest.TestCase):
+    def test_views_match_the_standalone_ledger(self):
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                rows = _messy_history(200, seed)
+                views = build_position_views(rows)
+                ledger = build_portfolio_ledger(rows, fx_rates={"USD": 1.0}, default_usd_to_inr=1.0)
+
+                self.assertEqual(views["cash_by_portfolio"], {n: p["cash_inr"] for n, p in ledger["portfolios"].items()})
+                for name, portfolio in views["positions_by_portfolio"].items():
+                    self.assertEqual(
+                        {t: round(p["net_shares"], 6) for t, p in portfolio.items()},
+                        {h["ticker"]: round(h["net_shares"], 6) for h in ledger["portfolios"][name]["holdings"]},
+                    )
+
+    def test_only_the_requested_views_are_built(self):
+        rows = _messy_history(200, 0)
+        everything = build_position_views(rows)
+
+        for engine in ("python", "columnar"):
+            with self.subTest(engine=engine):
+                views = build_position_views(rows, engine, views=("open_positions", "cash_by_portfolio"))
+                self.assertEqual(views, {key: everything[key] for key in ("open_positions", "cash_by_portfolio")})
+        with self.assertRaises(ValueError):
+            build_position_views(rows, views=("holdings",))
+
+    def test_open_positions_consume_lots_across_portfolios(self):
+        positions = build_position_views([
+            {"Id": 1, "Date": "2024-01-10", "Ticker": "INFY.NS", "TransactionType": "Buy", "NoOfShares": 10, "CostPerShare": 100, "Portfolio": "Core", "Note": "first"},
+            {"Id": 2, "Date": "2024-03-10", "Ticker": "INFY.NS", "TransactionType": "Buy", "NoOfShares": 5, "CostPerShare": 160, "CMP": 170, "Portfolio": "LT", "Note": "re-entry"},
+            {"Id": 3, "Date": "2024-06-10", "Ticker": "INFY.NS", "TransactionType": "Sell", "NoOfShares": 10, "CostPerShare": 150, "Portfolio": "LT"},
+        ], views=("open_positions",))["open_positions"]
+
+        self.assertEqual(positions["INFY.NS"]["net_shares"], 5)
+        self.assertEqual(positions["INFY.NS"]["avg_cost"], 160)
+        self.assertEqual(positions["INFY.NS"]["cmp"], 170)
+        self.assertEqual(str(positions["INFY.NS"]["oldest_buy_date"]), "2024-03-10")
+        self.assertEqual(positions["INFY.NS"]["note"], "re-entry")
+
+
+class TestColumnarLedgerEngine(unittest.TestCase):
+    def assertEnginesAgree(self, rows):
+        expected = build_portfolio_ledger(rows, fx_rates={"USD": 83.0})
+        actual = build_portfolio_ledger(rows, fx_rates={"USD": 83.0}, engine="columnar")
+        expected.pop("as_of")
+        actual.pop("as_of")
+        self.assertEqual(actual, expected)
+        self.assertEqual(build_position_views(rows, engine="columnar"), build_position_views(rows))
+
+    def test_matches_python_engine_on_history(self):
+        self.assertEnginesAgree(_history())
+
+    def test_matches_python_engine_on_messy_rows(self):
+        for seed in range(10):
+            with self.subTest(seed=seed):
+                self.assertEnginesAgree(_messy_history(300, seed))
+
+    def test_empty_and_unknown_engine(self):
+        self.assertEnginesAgree([])
+        with self.assertRaises(ValueError):
+            build_portfolio_ledger([], engine="spark")
+
+    def test_incremental_ledger_can_rebuild_with_columnar_engine(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = IncrementalLedger(Path(tmp) / "snapshot.json", engine="columnar")
+            rows = _history()
+            engine.build(rows[:3])
+            ledger = engine.build(rows)
+
+        self.assertEqual(engine.last_mode, "delta")
+        self.assertEqual(ledger["totals"], build_portfolio_ledger(rows)["totals"])
+
+
 if __name__ == "__main__":
     unittest.main()
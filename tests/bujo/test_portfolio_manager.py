@@ -1,9 +1,12 @@
+import asyncio
 import json
 import os
 import sys
 import types
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pandas as pd
 
 
 os.environ.setdefault("TELEGRAM_USER_ID", "1")
@@ -57,7 +60,7 @@ from bujo.portoflio.manage import PortfolioManager
 
 
 class TestPortfolioTransactionsModel(unittest.TestCase):
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_list_joins_date_range_filters_with_nocodb_and(self, mock_get):
         mock_response = MagicMock()
         mock_response.ok = True
@@ -80,8 +83,25 @@ class TestPortfolioTransactionsModel(unittest.TestCase):
                 "limit": 1000,
                 "offset": 0,
             },
+            timeout=model.timeout,
         )
 
+    @patch("requests.Session.patch")
+    def test_bulk_update_sends_array_patches_in_chunks(self, mock_patch):
+        mock_response = MagicMock()
+        mock_response.ok = True
+        mock_patch.return_value = mock_response
+        model = PortfolioTransactions("https://example.com", "token", "transactions")
+        rows = [{"Id": i, "CMP": 10.0, "UpdatedAt": "ignored"} for i in range(1, 6)]
+
+        updated = model.bulk_update(rows, chunk_size=2)
+
+        self.assertEqual(updated, 5)
+        self.assertEqual(mock_patch.call_count, 3)
+        first_chunk = mock_patch.call_args_list[0].kwargs["json"]
+        self.assertEqual(first_chunk, [{"Id": 1, "CMP": 10.0}, {"Id": 2, "CMP": 10.0}])
+        self.assertEqual(mock_patch.call_args_list[2].kwargs["json"], [{"Id": 5, "CMP": 10.0}])
+
 
 class TestPortfolioManager(unittest.TestCase):
     @patch.object(PortfolioManager, "_build_agent", autospec=True)
@@ -150,6 +170,135 @@ class TestPortfolioManager(unittest.TestCase):
         self.assertEqual(dashboard["holdings"][0]["ticker"], "AAPL")
         self.assertEqual(dashboard["portfolios"]["Core"]["cash_inr"], 85000.0)
 
+    @patch.object(PortfolioManager, "_build_agent", autospec=True)
+    @patch.object(PortfolioManager, "_get_usd_to_inr", autospec=True, return_value=80.0)
+    def test_dashboard_snapshot_is_cached_per_user_until_a_write(self, mock_fx, _mock_build_agent):
+        transactions_model = MagicMock()
+        transactions_model.list.return_value = [
+            {"Id": 1, "Ticker": "CASH", "TransactionType": "Deposit", "NoOfShares": 1, "CostPerShare": 5000, "Portfolio": "Core"},
+        ]
+        transactions_model.create.return_value = {"Id": 2}
+        manager = PortfolioManager(transactions_model)
+
+        first = manager.get_dashboard_data(user_id=7)
+        self.assertIs(manager.get_dashboard_data(user_id=7), first)
+        self.assertEqual(transactions_model.list.call_count, 1)
+
+        manager.get_dashboard_data(user_id=8)
+        manager.get_dashboard_data(user_id=7, refresh=True)
+        self.assertEqual(transactions_model.list.call_count, 3)
+
+        manager.add_transaction(json.dumps({"Ticker": "CASH", "TransactionType": "Deposit", "NoOfShares": 1, "CostPerShare": 10}))
+        self.assertIsNot(manager.get_dashboard_data(user_id=7), first)
+        self.assertEqual(mock_fx.call_count, 4)
+
+        with patch("bujo.portoflio.manage._DASHBOARD_TTL_SECONDS", 0):
+            manager.get_dashboard_data(user_id=7)
+        self.assertEqual(transactions_model.list.call_count, 5)
+
+    @patch.object(PortfolioManager, "_build_agent", autospec=True)
+    @patch.object(PortfolioManager, "_get_usd_to_inr", autospec=True, return_value=80.0)
+    def test_dashboard_is_invalidated_after_the_cash_leg_is_written(self, _mock_fx, _mock_build_agent):
+        transactions_model = MagicMock()
+        transactions_model.list.return_value = []
+        manager = PortfolioManager(transactions_model)
+
+        def create(row):
+            if row["Ticker"] == "CASH":
+                # A dashboard read landing between the two writes caches a snapshot without the cash leg.
+                manager.get_dashboard_data(user_id=7)
+            return {"Id": 1}
+
+        transactions_model.create.side_effect = create
+        manager.add_transaction(json.dumps({
+            "Ticker": "INFY.NS", "TransactionType": "Buy", "NoOfShares": 10, "CostPerShare": 1500,
+            "Date": "2026-05-07", "Portfolio": "Core",
+        }))
+        manager.get_dashboard_data(user_id=7)
+
+        self.assertEqual(transactions_model.list.call_count, 2)
+
+    @patch.object(PortfolioManager, "_build_agent", autospec=True)
+    @patch.object(PortfolioManager, "_get_usd_to_inr", autospec=True, return_value=80.0)
+    def test_snapshot_built_across_an_invalidation_is_not_cached(self, _mock_fx, _mock_build_agent):
+        transactions_model = MagicMock()
+        manager = PortfolioManager(transactions_model)
+
+        def list_rows():
+            if transactions_model.list.call_count == 1:
+                # A write lands after the build read the transactions.
+                manager.invalidate_dashboards()
+            return []
+
+        transactions_model.list.side_effect = list_rows
+        manager.get_dashboard_data(user_id=7)
+        manager.get_dashboard_data(user_id=7)
+        manager.get_dashboard_data(user_id=7)
+
+        self.assertEqual(transactions_model.list.call_count, 2)
+
+    @patch.object(PortfolioManager, "_build_agent", autospec=True)
+    def test_async_agent_awaits_the_graph_and_resets_corrupt_history(self, mock_build_agent):
+        manager = PortfolioManager(MagicMock())
+        reply = MagicMock(content="✅ Transaction recorded")
+        manager.agent = MagicMock()
+        manager.agent.ainvoke = AsyncMock(side_effect=[ValueError("INVALID_CHAT_HISTORY"), {"messages": [reply]}])
+
+        with patch("bujo.portoflio.manage.HumanMessage", MagicMock()):
+            result = asyncio.run(manager.aagent_portfolio(" Bought 5 INFY.NS at 1500 "))
+
+        self.assertEqual(result, "✅ Transaction recorded")
+        self.assertEqual(manager.agent.ainvoke.await_count, 2)
+        manager.agent.invoke.assert_not_called()
+        self.assertEqual(mock_build_agent.call_count, 2)
+
+    @patch.object(PortfolioManager, "_build_agent", autospec=True)
+    def test_update_cmp_downloads_once_and_bulk_patches_changes(self, _mock_build_agent):
+        transactions_model = MagicMock()
+        transactions_model.list.return_value = [
+            {"Id": 1, "Ticker": "INFY.NS", "CMP": 1500},
+            {"Id": 2, "Ticker": "INFY.NS", "CMP": 1600},
+            {"Id": 3, "Ticker": "TCS.NS", "CMP": 3000},
+            {"Id": 4, "Ticker": "CASH", "CMP": None},
+            {"Id": 5, "Ticker": "DELISTED.NS", "CMP": 50},
+        ]
+        transactions_model.bulk_update.return_value = 2
+        prices = pd.Series({"DELISTED.NS": float("nan"), "INFY.NS": 1600.0, "TCS.NS": 3100.0})
+        manager = PortfolioManager(transactions_model)
+
+        with patch("bujo.portoflio.manage.fetch_quotes", return_value=prices) as mock_fetch:
+            result = manager.update_cmp()
+
+        self.assertIn("2 of 2 changed rows saved", result)
+        self.assertIn("No price for 1 of 3 tickers, left unchanged: DELISTED.NS.", result)
+        mock_fetch.assert_called_once()
+        self.assertEqual(set(mock_fetch.call_args.args[0]), {"INFY.NS", "TCS.NS", "DELISTED.NS"})
+        transactions_model.update.assert_not_called()
+        transactions_model.bulk_update.assert_called_once_with([
+            {"Id": 1, "CMP": 1600},
+            {"Id": 3, "CMP": 3100},
+        ])
+
+    @patch.object(PortfolioManager, "_build_agent", autospec=True)
+    def test_update_cmp_reports_rows_the_bulk_patch_did_not_save(self, _mock_build_agent):
+        transactions_model = MagicMock()
+        transactions_model.list.return_value = [
+            {"Id": 1, "Ticker": "INFY.NS", "CMP": 1500},
+            {"Id": 2, "Ticker": "TCS.NS", "CMP": 3000},
+        ]
+        prices = pd.Series({"INFY.NS": 1600.0, "TCS.NS": 3100.0})
+        manager = PortfolioManager(transactions_model)
+
+        with patch("bujo.portoflio.manage.fetch_quotes", return_value=prices):
+            transactions_model.bulk_update.return_value = 2
+            self.assertEqual(manager.update_cmp(), "✅ CMP values updated for all tickers.")
+            transactions_model.bulk_update.return_value = 1
+            result = manager.update_cmp()
+
+        self.assertTrue(result.startswith("⚠️ CMP update incomplete: 1 of 2 changed rows saved."))
+        self.assertIn("could not be saved", result)
+        self.assertNotIn("No price", result)
+
 
 if __name__ == "__main__":
     unittest.main()
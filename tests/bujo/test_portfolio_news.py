@@ -0,0 +1,91 @@
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from bujo.portoflio import news
+from bujo.portoflio.news import fetch_news_items
+
+
+def _rss(*items):
+    body = "".join(
+        f"<item><title>{title}</title><link>https://example.com/{i}</link>"
+        f"<pubDate>{format_datetime(published)}</pubDate></item>"
+        for i, (title, published) in enumerate(items)
+    )
+    return f"<rss><channel>{body}</channel></rss>".encode("utf-8")
+
+
+def _response(status=200, content=b"", headers=None):
+    resp = MagicMock()
+    resp.status_code = status
+    resp.content = content
+    resp.headers = headers or {}
+    resp.raise_for_status.side_effect = None if status < 400 else RuntimeError(status)
+    return resp
+
+
+class TestNewsFetcher(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.session = MagicMock()
+        for target, value in (
+            ("_NEWS_CACHE_DIR", Path(tmp.name)),
+            ("_memory", {}),
+            ("_get_session", lambda: self.session),
+        ):
+            patcher = patch.object(news, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        now = datetime.now()
+        self.feed = _rss(
+            ("Acme wins order - Reuters", now - timedelta(hours=1)),
+            ("Acme wins order - Mint", now - timedelta(hours=2)),
+            ("Acme AGM notice - BSE", now - timedelta(hours=60)),
+        )
+
+    def test_dedups_syndicated_titles_and_applies_lookback(self):
+        self.session.get.return_value = _response(content=self.feed)
+
+        recent = fetch_news_items("Acme", "ACME.NS", lookback_hours=48, limit=25)
+        wider = fetch_news_items("Acme", "ACME.NS", lookback_hours=72, limit=25)
+
+        self.assertEqual([i["title"] for i in recent], ["Acme wins order - Reuters"])
+        self.assertEqual(len(wider), 2)
+        self.session.get.assert_called_once()
+
+    def test_stale_entry_is_revalidated_with_conditional_headers(self):
+        self.session.get.return_value = _response(
+            content=self.feed, headers={"ETag": '"abc"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+        )
+        fetch_news_items("Acme", "ACME.NS", lookback_hours=48, limit=25)
+
+        self.session.get.return_value = _response(status=304)
+        with patch.object(news, "_NEWS_CACHE_TTL_SECONDS", 0):
+            items = fetch_news_items("Acme", "ACME.NS", lookback_hours=48, limit=25)
+
+        sent_headers = self.session.get.call_args.kwargs["headers"]
+        self.assertEqual(sent_headers["If-None-Match"], '"abc"')
+        self.assertEqual(sent_headers["If-Modified-Since"], "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.assertEqual([i["title"] for i in items], ["Acme wins order - Reuters"])
+
+    def test_disk_cache_survives_process_memory_reset(self):
+        self.session.get.return_value = _response(content=self.feed)
+        fetch_news_items("Acme", "ACME.NS", lookback_hours=48, limit=25)
+        news._memory.clear()
+
+        fetch_news_items("Acme", "ACME.NS", lookback_hours=48, limit=25)
+
+        self.session.get.assert_called_once()
+
+    def test_failure_without_cache_returns_none(self):
+        self.session.get.side_effect = RuntimeError("offline")
+
+        self.assertIsNone(fetch_news_items("Acme", "ACME.NS", lookback_hours=48, limit=25))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import math
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from bujo.portoflio import quotes
+from bujo.portoflio.quotes import fetch_quotes, fetch_usd_to_inr, last_price
+
+
+def _download_frame(closes):
+    columns = pd.MultiIndex.from_product([["Close", "Open"], list(closes)], names=["Price", "Ticker"])
+    rows = []
+    for day in range(2):
+        row = [closes[t][day] for t in closes] + [0.0] * len(closes)
+        rows.append(row)
+    return pd.DataFrame(rows, columns=columns)
+
+
+class TestQuotes(unittest.TestCase):
+    def test_fetch_quotes_uses_single_download_and_forward_fills(self):
+        frame = _download_frame({
+            "INFY.NS": [1500.0, 1510.0],
+            "TCS.NS": [3000.0, float("nan")],
+            "USDINR=X": [83.0, 83.5],
+        })
+        with patch.object(quotes.yf, "download", create=True, return_value=frame) as mock_download:
+            prices = fetch_quotes(["TCS.NS", "INFY.NS", "USDINR=X", "INFY.NS", ""])
+
+        mock_download.assert_called_once()
+        self.assertEqual(mock_download.call_args.args[0], ["INFY.NS", "TCS.NS", "USDINR=X"])
+        self.assertEqual(prices["INFY.NS"], 1510.0)
+        self.assertEqual(prices["TCS.NS"], 3000.0)
+        self.assertEqual(prices["USDINR=X"], 83.5)
+
+    def test_fetch_quotes_handles_flat_single_ticker_frame(self):
+        frame = pd.DataFrame({"Close": [10.0, 11.0], "Open": [9.0, 10.0]})
+        with patch.object(quotes.yf, "download", create=True, return_value=frame):
+            prices = fetch_quotes(["AAPL"])
+
+        self.assertEqual(prices["AAPL"], 11.0)
+
+    def test_missing_symbols_are_nan_and_fall_back(self):
+        frame = _download_frame({"INFY.NS": [1500.0, 1510.0]})
+        with patch.object(quotes.yf, "download", create=True, return_value=frame):
+            prices = fetch_quotes(["INFY.NS", "GONE.NS"])
+
+        self.assertTrue(math.isnan(prices["GONE.NS"]))
+        self.assertEqual(last_price(prices, "GONE.NS", default=7.0), 7.0)
+        self.assertEqual(last_price(prices, "UNKNOWN"), 0.0)
+
+    def test_download_failure_returns_default_fx(self):
+        with patch.object(quotes.yf, "download", create=True, side_effect=RuntimeError("boom")):
+            self.assertEqual(fetch_usd_to_inr(), quotes.DEFAULT_USD_TO_INR)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime
+
+from bujo.portoflio.alert_index import PriceAlertIndex, is_market_open
+
+
+def _alert(alert_id, ticker, direction, target):
+    return {"Id": alert_id, "Ticker": ticker, "Direction": direction, "TargetPrice": target}
+
+
+def _fired(pairs):
+    return [alert["Id"] for alert, _ in pairs]
+
+
+class TestPriceAlertIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = PriceAlertIndex()
+
+    def test_fires_once_per_crossing_and_rearms_after_crossing_back(self):
+        self.index.load([_alert(1, "INFY.NS", "above", 1800), _alert(2, "INFY.NS", "below", 1500)])
+
+        self.assertEqual(_fired(self.index.observe({"INFY.NS": 1700})), [])
+        self.assertEqual(_fired(self.index.observe({"INFY.NS": 1810})), [1])
+        self.assertEqual(_fired(self.index.observe({"INFY.NS": 1850})), [])
+        self.assertEqual(_fired(self.index.observe({"INFY.NS": 1400})), [2])
+        self.assertEqual(_fired(self.index.observe({"INFY.NS": 1800})), [1])
+
+    def test_both_fires_on_each_crossing_only(self):
+        self.index.load([_alert(1, "TCS.NS", "both", 3000)])
+
+        self.assertEqual(_fired(self.index.observe({"TCS.NS": 2900})), [])
+        self.assertEqual(_fired(self.index.observe({"TCS.NS": 2950})), [])
+        self.assertEqual(_fired(self.index.observe({"TCS.NS": 3100})), [1])
+        self.assertEqual(_fired(self.index.observe({"TCS.NS": 3200})), [])
+        self.assertEqual(_fired(self.index.observe({"TCS.NS": 2990})), [1])
+
+    def test_new_and_modified_alerts_are_checked_against_the_current_price(self):
+        self.index.load([_alert(1, "INFY.NS", "above", 1800)])
+        self.index.observe({"INFY.NS": 1700})
+
+        self.index.load([_alert(1, "INFY.NS", "above", 1650), _alert(2, "INFY.NS", "below", 1750)])
+        self.assertEqual(_fired(self.index.observe({"INFY.NS": 1700})), [1, 2])
+
+        self.index.load([_alert(1, "INFY.NS", "above", 1650), _alert(2, "INFY.NS", "below", 1750)])
+        self.assertEqual(_fired(self.index.observe({"INFY.NS": 1700})), [])
+
+    def test_only_alert_tickers_are_polled_and_missing_prices_are_skipped(self):
+        self.index.load([
+            _alert(1, "INFY.NS", "above", 1800),
+            _alert(2, "TCS.NS", "below", 3000),
+            {"Id": 3, "Ticker": "", "Direction": "above", "TargetPrice": 10},
+        ])
+
+        self.assertEqual(self.index.tickers(), ["INFY.NS", "TCS.NS"])
+        self.assertEqual(_fired(self.index.observe({"INFY.NS": 1900, "TCS.NS": 0})), [1])
+        self.assertEqual(_fired(self.index.observe({"TCS.NS": 2900})), [2])
+
+    def test_reload_schedule(self):
+        self.assertTrue(self.index.needs_reload())
+        self.index.load([])
+        self.assertFalse(self.index.needs_reload())
+        self.index.invalidate()
+        self.assertTrue(self.index.needs_reload())
+
+
+class TestMarketHours(unittest.TestCase):
+    def test_weekday_window(self):
+        self.assertTrue(is_market_open(datetime(2025, 3, 3, 9, 15), "09:15-15:30"))
+        self.assertTrue(is_market_open(datetime(2025, 3, 3, 15, 30), "09:15-15:30"))
+        self.assertFalse(is_market_open(datetime(2025, 3, 3, 9, 14), "09:15-15:30"))
+        self.assertFalse(is_market_open(datetime(2025, 3, 8, 11, 0), "09:15-15:30"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+from unittest.mock import patch
+
+from bujo.portoflio import prompt_budget
+from bujo.portoflio.prompt_budget import (
+    ENTRY_STEPS,
+    TABLE_STEPS,
+    budget_report_markdown,
+    compact_whitespace,
+    compile_prompt,
+    keep_table_rows,
+    section,
+)
+
+TABLE = "\n".join(
+    ["## Screened Candidates\n", "| Symbol  | P/E   |", "|---------|-------|"]
+    + [f"| SYM{i:02d}   | {10 + i}    |" for i in range(20)]
+) + "\n"
+ENTRIES = "## Candidate Deep-Dive\n\n" + "".join(f"### C{i}\n" + "detail " * 60 + "\n\n" for i in range(8))
+
+
+class TestPromptBudget(unittest.TestCase):
+    def setUp(self):
+        # Offline-safe: count with the 4-characters-per-token estimate instead of tiktoken's BPE files.
+        for target, value in (("_encoding", None), ("_encoding_name", "estimate (4 chars/token)")):
+            patcher = patch.object(prompt_budget, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _sections(self):
+        return [
+            section("Summary", "## Request\n**Tickers:** 3\n", 100, required=True),
+            section("Screened candidates", TABLE, 20, TABLE_STEPS),
+            section("Candidate deep-dive", ENTRIES, 25, ENTRY_STEPS),
+            section("Instructions", "Follow the framework. " * 20, 100, required=True),
+        ]
+
+    def test_under_budget_prompt_is_the_plain_join(self):
+        sections = self._sections()
+
+        text, report = compile_prompt(sections, 100_000, "gpt-test")
+
+        self.assertEqual(text, "\n".join(s["text"] for s in sections))
+        self.assertTrue(all(not row["actions"] and row["tokens"] == row["tokens_before"] for row in report))
+
+    def test_lowest_priority_is_cut_first_and_required_sections_survive(self):
+        sections = self._sections()
+        measured = sum(prompt_budget.count_tokens(s["text"], "gpt-test") for s in sections)
+        budget = measured - 50
+
+        text, report = compile_prompt(sections, budget, "gpt-test")
+        rows = {row["name"]: row for row in report}
+
+        self.assertLessEqual(sum(row["tokens"] for row in report), budget)
+        self.assertIn("kept top 50% of table rows", rows["Screened candidates"]["actions"])
+        self.assertEqual(rows["Candidate deep-dive"]["actions"], ["compacted"])
+        self.assertIn("SYM00", text)
+        self.assertNotIn("SYM19", text)
+        self.assertIn("Follow the framework.", text)
+
+    def test_sections_are_omitted_only_after_their_steps(self):
+        text, report = compile_prompt(self._sections(), 200, "gpt-test")
+        rows = {row["name"]: row for row in report}
+
+        self.assertEqual(rows["Screened candidates"]["actions"][-1], "omitted")
+        self.assertIn("kept first 25% of entries", rows["Candidate deep-dive"]["actions"])
+        self.assertIn("_Screened candidates: omitted to fit the prompt budget._", text)
+        self.assertEqual(rows["Instructions"]["tokens"], rows["Instructions"]["tokens_before"])
+
+    def test_table_compaction(self):
+        compacted = compact_whitespace(TABLE)
+        self.assertIn("|-|-|", compacted)
+        self.assertIn("| SYM03 | 13 |", compacted)
+
+        trimmed = keep_table_rows(0.25)(TABLE)
+        self.assertIn("| SYM04   | 14    |", trimmed)
+        self.assertNotIn("SYM05", trimmed)
+        self.assertIn("_15 lower-ranked rows omitted to fit the prompt budget._", trimmed)
+
+    def test_later_steps_cut_to_a_fraction_of_the_original(self):
+        table, entries = TABLE, ENTRIES
+        for (_, table_step), (_, entry_step) in zip(TABLE_STEPS, ENTRY_STEPS):
+            table, entries = table_step(table), entry_step(entries)
+
+        self.assertIn("SYM04", table)
+        self.assertNotIn("SYM05", table)
+        self.assertEqual(table.count("omitted to fit the prompt budget"), 1)
+        self.assertIn("_15 lower-ranked rows omitted to fit the prompt budget._", table)
+        self.assertEqual(entries.count("### "), 2)
+        self.assertEqual(entries.count("omitted to fit the prompt budget"), 1)
+        self.assertIn("_6 further entries omitted to fit the prompt budget._", entries)
+
+    def test_report_lists_every_section(self):
+        _, report = compile_prompt(self._sections(), 0, "gpt-test")
+
+        markdown = budget_report_markdown(report, 0, "gpt-test")
+
+        self.assertIn("**Budget:** unlimited", markdown)
+        self.assertIn("| Instructions | required |", markdown)
+        self.assertEqual(markdown.count("| kept |"), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
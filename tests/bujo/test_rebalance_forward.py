@@ -1,7 +1,13 @@
 import sys
+import tempfile
+import threading
+import time
 import types
 import unittest
-from unittest.mock import MagicMock
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
 
 
 fake_base = types.ModuleType("bujo.base")
@@ -30,8 +36,13 @@ fake_prebuilt = types.ModuleType("langgraph.prebuilt")
 fake_prebuilt.create_react_agent = MagicMock()
 sys.modules["langgraph.prebuilt"] = fake_prebuilt
 
+from bujo.portoflio import rebalance
 from bujo.portoflio.rebalance import (
+    _cached_group,
     _compute_valuation_profile,
+    _evaluate_screened_candidates,
+    _fetch_ticker_data,
+    _map_concurrent,
     _normalize_percent_value,
     _render_screener_table,
     _select_valuation_method,
@@ -161,6 +172,176 @@ class TestRebalanceForwardOutlook(unittest.TestCase):
         self.assertIn("P/E<55", table[2])
 
 
+class _FakeTicker:
+    def __init__(self):
+        self.info_calls = 0
+        self.financials = pd.DataFrame(
+            {"2025-03-31": [2_000_000_000.0, 300_000_000.0], "2024-03-31": [1_500_000_000.0, 200_000_000.0]},
+            index=["Total Revenue", "Net Income"],
+        )
+        self.balance_sheet = pd.DataFrame()
+        self.cashflow = pd.DataFrame()
+
+    @property
+    def info(self):
+        self.info_calls += 1
+        return {"shortName": "Test Co", "currency": "INR", "currentPrice": 120.0}
+
+    def history(self, period, interval):
+        return pd.DataFrame({"Close": [100.0, 110.0, 120.0]})
+
+
+class TestTickerDataCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = patch.object(rebalance, "_TICKER_CACHE_DIR", Path(self.tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cached_group_reuses_fresh_entries_and_honours_force_refresh(self):
+        loader = MagicMock(side_effect=[{"v": 1}, {"v": 2}])
+
+        self.assertEqual(_cached_group("INFY.NS", "statements", loader), {"v": 1})
+        self.assertEqual(_cached_group("INFY.NS", "statements", loader), {"v": 1})
+        self.assertEqual(_cached_group("INFY.NS", "statements", loader, force_refresh=True), {"v": 2})
+        self.assertEqual(loader.call_count, 2)
+
+    def test_cached_group_expires_per_group_ttl(self):
+        loader = MagicMock(side_effect=[{"v": 1}, {"v": 2}])
+        with patch.dict(rebalance._TICKER_CACHE_TTL_HOURS, {"price": 0}):
+            _cached_group("INFY.NS", "price", loader)
+            self.assertEqual(_cached_group("INFY.NS", "price", loader), {"v": 2})
+
+    def test_failed_loads_are_not_cached(self):
+        loader = MagicMock(side_effect=[None, {"pros": ["ok"]}])
+
+        self.assertIsNone(_cached_group("INFY.NS", "qualitative", loader))
+        self.assertEqual(_cached_group("INFY.NS", "qualitative", loader), {"pros": ["ok"]})
+
+    def test_price_group_without_history_is_used_but_not_cached(self):
+        fake = MagicMock(info={"currentPrice": 100})
+        fake.history.side_effect = [RuntimeError("rate limited"), *[pd.DataFrame({"Close": [90.0, 100.0]})] * 2]
+
+        def load():
+            return _cached_group(
+                "INFY.NS", "price", lambda: rebalance._load_price_group(fake), cacheable=rebalance._price_group_complete
+            )
+
+        first, second, third = load(), load(), load()
+
+        self.assertEqual(first, {"info": {"currentPrice": 100}, "closes_5y": None, "closes_1y": None})
+        self.assertEqual(second["closes_5y"], [90.0, 100.0])
+        self.assertEqual(third, second)
+        self.assertEqual(fake.history.call_count, 3)
+
+    def test_fetch_ticker_data_serves_second_run_from_cache(self):
+        fake = _FakeTicker()
+        screener = {"pros": [], "cons": [], "about": "", "symbol": "TEST"}
+        with patch.object(rebalance.yf, "Ticker", return_value=fake), \
+                patch.object(rebalance, "_scrape_screener", return_value=screener) as mock_scrape:
+            first = _fetch_ticker_data("TEST.NS")
+            second = _fetch_ticker_data("TEST.NS")
+
+        self.assertEqual(fake.info_calls, 1)
+        mock_scrape.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual(first["cmp"], 120.0)
+        self.assertEqual(first["annual_financials"][0]["total_revenue"], 200.0)
+        self.assertEqual(first["price_cagr_5y_pct"], second["price_cagr_5y_pct"])
+
+
+class TestConcurrentFetch(unittest.TestCase):
+    def test_map_concurrent_keeps_input_order_with_bounded_workers(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def work(n):
+            with lock:
+                active.append(n)
+                peak.append(len(active))
+            time.sleep(0.01 * (5 - n % 5))
+            with lock:
+                active.remove(n)
+            return n * n
+
+        self.assertEqual(_map_concurrent(work, range(10), workers=3), [n * n for n in range(10)])
+        self.assertLessEqual(max(peak), 3)
+
+    def test_candidate_gate_rows_follow_sorted_symbol_order(self):
+        quotes = {"ZED.NS": {}, "ABC.NS": {}, "MID.NS": {}}
+        verdict = {"ABC.NS": "eligible", "MID.NS": "rejected", "ZED.NS": "eligible"}
+
+        def assess(symbol, quote, td, event_risks):
+            return {"status": verdict[symbol], "all_reasons": []}
+
+        with patch.object(rebalance, "_fetch_ticker_data", side_effect=lambda t, force_refresh=False: {"cmp": 1}), \
+                patch.object(rebalance, "_check_candidate_events_and_news", return_value=[]), \
+                patch.object(rebalance, "_assess_forward_risk", side_effect=assess), \
+                patch.object(rebalance, "_render_candidate_gate_table", return_value=[]):
+            eligible, eligible_td, _, rows = _evaluate_screened_candidates(quotes)
+
+        self.assertEqual([row["ticker"] for row in rows], ["ABC.NS", "MID.NS", "ZED.NS"])
+        self.assertEqual(list(eligible), ["ABC.NS", "ZED.NS"])
+        self.assertEqual(set(eligible_td), {"ABC.NS", "ZED.NS"})
+
+
+class TestPreparedPrompts(unittest.TestCase):
+    def setUp(self):
+        # Token counting falls back to the character estimate; nothing is fetched for tiktoken.
+        from bujo.portoflio import prompt_budget
+
+        for target, value in (("_encoding", None), ("_encoding_name", "estimate (4 chars/token)")):
+            patcher = patch.object(prompt_budget, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _written(self, prepared):
+        self.addCleanup(Path(prepared["input_path"]).unlink, missing_ok=True)
+        return Path(prepared["input_path"]).read_text(encoding="utf-8")
+
+    def test_fresh_portfolio_prompt_is_prepared(self):
+        quotes = {"ABC.NS": {"symbol": "ABC.NS"}}
+        with patch.object(rebalance, "_screen_fresh_portfolio_candidates", return_value=("## Screen\n", quotes)), \
+                patch.object(rebalance, "_evaluate_screened_candidates",
+                             return_value=(quotes, {"ABC.NS": {}}, "## Gate\n", [])), \
+                patch.object(rebalance, "_build_market_data_section", return_value="## Deep-Dive\n"), \
+                patch.object(rebalance, "_build_candidate_forward_outlook_section", return_value="## Outlook\n"):
+            prepared = rebalance.prepare_fresh_portfolio_analysis(500000, {"risk_appetite": "Moderate"})
+
+        self.assertNotIn("error", prepared)
+        self.assertIn("## Deep-Dive", prepared["user_message"])
+        self.assertEqual(self._written(prepared), prepared["input_md"])
+
+    def test_rebalance_prompt_records_the_token_budget(self):
+        views = {
+            "positions_by_portfolio": {"Core": {"ABC.NS": {"net_shares": 10, "total_invested": 1000}}},
+            "cash_by_portfolio": {"Core": 500.0},
+        }
+        builders = {
+            name: MagicMock(return_value=f"## {name}\n")
+            for name in (
+                "_build_positions_table", "_build_duplicate_exposure_table", "_build_position_sizing_violations",
+                "_build_sector_allocation", "_build_market_data_section", "_build_recent_transaction_review",
+                "_build_position_notes_section", "_build_reconciliation_checks", "_build_analytical_instructions",
+                "_build_forward_outlook_section", "_build_candidate_forward_outlook_section",
+            )
+        }
+        transactions_model = MagicMock(**{"list.return_value": [{"Id": 1}]})
+        with patch.multiple(rebalance, **builders), \
+                patch.object(rebalance, "build_position_views", return_value=views), \
+                patch.object(rebalance, "_fetch_ticker_data", return_value={"cmp": 120.0}), \
+                patch.object(rebalance, "_screen_nse_candidates", return_value=("## Screen\n", {})), \
+                patch.object(rebalance, "_evaluate_screened_candidates", return_value=({}, {}, "## Gate\n", [])):
+            prepared = rebalance.prepare_rebalance_analysis(transactions_model)
+
+        self.assertEqual(
+            [row["name"] for row in prepared["budget_report"]][:3], ["Summary", "Sector allocation", "Positions"]
+        )
+        self.assertIn("## Prompt Token Budget", self._written(prepared))
+        self.assertIn("## _build_analytical_instructions", prepared["user_message"])
+
+
 if __name__ == "__main__":
     unittest.main()
-from unittest.mock import MagicMock